@@ -0,0 +1,41 @@
+"""add llm response cache
+
+Revision ID: 018
+Revises: 017
+Create Date: 2026-10-17 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "018"
+down_revision = "017"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "llm_response_cache",
+        sa.Column("cache_key", sa.String(length=64), nullable=False),
+        sa.Column("route_key", sa.String(length=255), nullable=False),
+        sa.Column("schema_name", sa.String(length=100), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=True),
+        sa.Column("hit_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("last_accessed_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("cache_key"),
+    )
+    op.create_index(op.f("ix_llm_response_cache_schema_name"), "llm_response_cache", ["schema_name"], unique=False)
+    op.create_index(op.f("ix_llm_response_cache_last_accessed_at"), "llm_response_cache", ["last_accessed_at"], unique=False)
+    op.create_index(op.f("ix_llm_response_cache_expires_at"), "llm_response_cache", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_llm_response_cache_expires_at"), table_name="llm_response_cache")
+    op.drop_index(op.f("ix_llm_response_cache_last_accessed_at"), table_name="llm_response_cache")
+    op.drop_index(op.f("ix_llm_response_cache_schema_name"), table_name="llm_response_cache")
+    op.drop_table("llm_response_cache")
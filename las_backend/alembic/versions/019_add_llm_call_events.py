@@ -0,0 +1,47 @@
+"""add llm call events
+
+Revision ID: 019
+Revises: 018
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "019"
+down_revision = "018"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "llm_call_events",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("operation", sa.String(length=50), nullable=False),
+        sa.Column("lane", sa.String(length=50), nullable=True),
+        sa.Column("provider_id", sa.Integer(), nullable=True),
+        sa.Column("provider_type", sa.String(length=50), nullable=True),
+        sa.Column("model_id", sa.String(length=100), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("error", sa.String(length=255), nullable=True),
+        sa.Column("cache_hit", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("fallback_reason", sa.String(length=100), nullable=True),
+        sa.Column("prompt_tokens", sa.Integer(), nullable=True),
+        sa.Column("completion_tokens", sa.Integer(), nullable=True),
+        sa.Column("time_to_first_token_ms", sa.Integer(), nullable=True),
+        sa.Column("latency_ms", sa.Integer(), nullable=False),
+        sa.Column("cost_usd", sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_llm_call_events_created_at"), "llm_call_events", ["created_at"], unique=False)
+    op.create_index(op.f("ix_llm_call_events_lane"), "llm_call_events", ["lane"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_llm_call_events_lane"), table_name="llm_call_events")
+    op.drop_index(op.f("ix_llm_call_events_created_at"), table_name="llm_call_events")
+    op.drop_table("llm_call_events")
@@ -0,0 +1,59 @@
+"""replace ivfflat embedding indexes with hnsw
+
+Revision ID: 020
+Revises: 019
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+
+
+revision = "020"
+down_revision = "019"
+branch_labels = None
+depends_on = None
+
+EMBEDDING_TABLES = ("model_cards", "problems", "resource_links")
+
+
+def upgrade():
+    # Small users are cheaper to scan exactly: let the planner prefilter by user.
+    for table in EMBEDDING_TABLES:
+        op.create_index(f"ix_{table}_user_id", table, ["user_id"], if_not_exists=True)
+
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    for table in EMBEDDING_TABLES:
+        # ivfflat lists were trained on empty tables and recall poorly; hnsw
+        # needs no training and supports iterative scans under the user filter.
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_embedding_ivfflat")
+        op.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS ix_{table}_embedding_hnsw
+            ON {table}
+            USING hnsw (embedding vector_cosine_ops)
+            WITH (m = 16, ef_construction = 64)
+            """
+        )
+
+
+def downgrade():
+    for table in EMBEDDING_TABLES:
+        op.drop_index(f"ix_{table}_user_id", table_name=table, if_exists=True)
+
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    for table in EMBEDDING_TABLES:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_embedding_hnsw")
+        op.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS ix_{table}_embedding_ivfflat
+            ON {table}
+            USING ivfflat (embedding vector_cosine_ops)
+            WITH (lists = 100)
+            """
+        )
@@ -0,0 +1,66 @@
+"""add lexical inverted index
+
+Revision ID: 021
+Revises: 020
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "021"
+down_revision = "020"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "lexical_documents",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.String(length=36), nullable=False),
+        sa.Column("entity_type", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.String(length=36), nullable=False),
+        sa.Column("length", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("entity_type", "entity_id", name="uq_lexical_documents_entity"),
+    )
+    op.create_index(
+        "ix_lexical_documents_user_entity_type",
+        "lexical_documents",
+        ["user_id", "entity_type"],
+        unique=False,
+    )
+    op.create_table(
+        "lexical_postings",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.String(length=36), nullable=False),
+        sa.Column("entity_type", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.String(length=36), nullable=False),
+        sa.Column("token", sa.String(length=64), nullable=False),
+        sa.Column("tf", sa.Integer(), nullable=False, server_default="1"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_lexical_postings_lookup",
+        "lexical_postings",
+        ["user_id", "entity_type", "token"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_lexical_postings_entity",
+        "lexical_postings",
+        ["entity_type", "entity_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lexical_postings_entity", table_name="lexical_postings")
+    op.drop_index("ix_lexical_postings_lookup", table_name="lexical_postings")
+    op.drop_table("lexical_postings")
+    op.drop_index("ix_lexical_documents_user_entity_type", table_name="lexical_documents")
+    op.drop_table("lexical_documents")
@@ -0,0 +1,74 @@
+"""track embedding model per row and resize vector columns
+
+Revision ID: 022
+Revises: 021
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "022"
+down_revision = "021"
+branch_labels = None
+depends_on = None
+
+EMBEDDING_TABLES = ("model_cards", "problems", "resource_links")
+# Pinned so the schema does not depend on the environment running alembic;
+# moving to another dimension takes its own revision that resizes the columns
+# the same way, followed by scripts/backfill_model_card_embeddings.py.
+EMBEDDING_DIMENSIONS = 64
+PREVIOUS_EMBEDDING_DIMENSIONS = 64  # vector(64) from 003/004
+
+
+def _vector_dimensions(bind, table: str):
+    return bind.execute(
+        sa.text(
+            """
+            SELECT atttypmod FROM pg_attribute
+            WHERE attrelid = CAST(:table AS regclass) AND attname = 'embedding'
+            """
+        ),
+        {"table": table},
+    ).scalar()
+
+
+def _resize_vectors(dimensions: int):
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    # Vectors from another dimension cannot be cast; clear them and let
+    # scripts/backfill_model_card_embeddings.py re-embed the rows.
+    for table in EMBEDDING_TABLES:
+        if _vector_dimensions(bind, table) == dimensions:
+            continue
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_embedding_hnsw")
+        op.execute(
+            f"""
+            ALTER TABLE {table}
+            ALTER COLUMN embedding TYPE vector({dimensions})
+            USING NULL::vector({dimensions})
+            """
+        )
+        op.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS ix_{table}_embedding_hnsw
+            ON {table}
+            USING hnsw (embedding vector_cosine_ops)
+            WITH (m = 16, ef_construction = 64)
+            """
+        )
+
+
+def upgrade():
+    for table in EMBEDDING_TABLES:
+        op.add_column(table, sa.Column("embedding_model", sa.String(length=120), nullable=True))
+    _resize_vectors(EMBEDDING_DIMENSIONS)
+
+
+def downgrade():
+    _resize_vectors(PREVIOUS_EMBEDDING_DIMENSIONS)
+    for table in EMBEDDING_TABLES:
+        op.drop_column(table, "embedding_model")
@@ -0,0 +1,37 @@
+"""add embedding job queue
+
+Revision ID: 023
+Revises: 022
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "023"
+down_revision = "022"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "embedding_jobs",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.String(length=36), nullable=False),
+        sa.Column("entity_type", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.String(length=36), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("available_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("entity_type", "entity_id", name="uq_embedding_jobs_entity"),
+    )
+    op.create_index("ix_embedding_jobs_available_at", "embedding_jobs", ["available_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_embedding_jobs_available_at", table_name="embedding_jobs")
+    op.drop_table("embedding_jobs")
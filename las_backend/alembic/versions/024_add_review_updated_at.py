@@ -0,0 +1,26 @@
+"""add reviews.updated_at
+
+Revision ID: 024
+Revises: 023
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "024"
+down_revision = "023"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("reviews", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE reviews SET updated_at = created_at")
+    op.create_index("ix_reviews_user_id", "reviews", ["user_id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reviews_user_id", table_name="reviews", if_exists=True)
+    op.drop_column("reviews", "updated_at")
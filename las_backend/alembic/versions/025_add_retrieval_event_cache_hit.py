@@ -0,0 +1,26 @@
+"""add retrieval_events.cache_hit
+
+Revision ID: 025
+Revises: 024
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "025"
+down_revision = "024"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "retrieval_events",
+        sa.Column("cache_hit", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("retrieval_events", "cache_hit")
@@ -0,0 +1,64 @@
+"""key revoked_tokens by jti
+
+Revision ID: 026
+Revises: 025
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+from jose import JWTError, jwt
+
+
+revision = "026"
+down_revision = "025"
+branch_labels = None
+depends_on = None
+
+
+def _revocation_key(token: str) -> str:
+    # Mirrors app.services.auth_cache.revocation_key.
+    try:
+        jti = jwt.get_unverified_claims(token).get("jti")
+    except JWTError:
+        jti = None
+    return str(jti)[:64] if jti else hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    op.add_column("revoked_tokens", sa.Column("jti", sa.String(length=64), nullable=True))
+
+    bind = op.get_bind()
+    revoked_tokens = sa.table(
+        "revoked_tokens",
+        sa.column("id", sa.String()),
+        sa.column("token", sa.String()),
+        sa.column("jti", sa.String()),
+    )
+    rows = bind.execute(sa.select(revoked_tokens.c.id, revoked_tokens.c.token)).all()
+    seen = set()
+    for row_id, token in rows:
+        key = _revocation_key(token)
+        if key in seen:
+            bind.execute(sa.delete(revoked_tokens).where(revoked_tokens.c.id == row_id))
+            continue
+        seen.add(key)
+        bind.execute(sa.update(revoked_tokens).where(revoked_tokens.c.id == row_id).values(jti=key))
+
+    with op.batch_alter_table("revoked_tokens") as batch_op:
+        batch_op.alter_column("jti", existing_type=sa.String(length=64), nullable=False)
+        batch_op.alter_column("token", existing_type=sa.String(length=2048), nullable=True)
+    op.create_index(op.f("ix_revoked_tokens_jti"), "revoked_tokens", ["jti"], unique=True)
+    op.create_index(op.f("ix_revoked_tokens_expires_at"), "revoked_tokens", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_revoked_tokens_expires_at"), table_name="revoked_tokens")
+    op.drop_index(op.f("ix_revoked_tokens_jti"), table_name="revoked_tokens")
+    # Rows revoked by jti alone cannot be restored to the token-keyed schema.
+    op.execute("DELETE FROM revoked_tokens WHERE token IS NULL")
+    with op.batch_alter_table("revoked_tokens") as batch_op:
+        batch_op.alter_column("token", existing_type=sa.String(length=2048), nullable=False)
+    op.drop_column("revoked_tokens", "jti")
@@ -0,0 +1,55 @@
+"""add lexical index completion markers
+
+Revision ID: 027
+Revises: 026
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "027"
+down_revision = "026"
+branch_labels = None
+depends_on = None
+
+
+INDEXED_TABLES = {
+    "model_card": "model_cards",
+    "problem": "problems",
+    "resource": "resource_links",
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "lexical_index_states",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.String(length=36), nullable=False),
+        sa.Column("entity_type", sa.String(length=20), nullable=False),
+        sa.Column("indexed_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "entity_type", name="uq_lexical_index_states_user_entity_type"),
+    )
+
+    # Users whose documents already cover every row were kept in sync by the
+    # flush hook since 021; everyone else needs scripts/backfill_lexical_index.py.
+    for kind, table in INDEXED_TABLES.items():
+        op.execute(
+            sa.text(
+                f"""
+                INSERT INTO lexical_index_states (user_id, entity_type, indexed_at)
+                SELECT users.id, :kind, CURRENT_TIMESTAMP FROM users
+                WHERE (SELECT COUNT(*) FROM {table} WHERE {table}.user_id = users.id)
+                    = (
+                        SELECT COUNT(*) FROM lexical_documents
+                        WHERE lexical_documents.user_id = users.id AND lexical_documents.entity_type = :kind
+                    )
+                """
+            ).bindparams(kind=kind)
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("lexical_index_states")
@@ -1,13 +1,15 @@
 from __future__ import annotations
 
-from fastapi import Depends, HTTPException, Query, status
-from sqlalchemy import select
+from typing import AsyncIterator
+
+from fastapi import Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import PRIMARY_READ_COOKIE, get_db, read_routing
 from app.core.security import decode_access_token
 from app.models.entities.user import User
 from app.api.routes.auth import get_current_user
+from app.services.auth_cache import auth_user_cache, revoked_tokens
 
 
 def require_admin(current_user: User = Depends(get_current_user)):
@@ -32,7 +34,7 @@ async def get_current_user_from_query(
     Authorization header.
     """
     payload = decode_access_token(token)
-    if payload is None:
+    if payload is None or await revoked_tokens.is_revoked(db, token, payload):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
@@ -45,12 +47,29 @@ async def get_current_user_from_query(
             detail="Token missing subject",
         )
 
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = await auth_user_cache.get(db, str(user_id))
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
         )
 
+    db.info["user_id"] = str(user.id)
     return user
+
+
+async def get_read_db(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> AsyncIterator[AsyncSession]:
+    """Session for read-only endpoints: the replica when configured, unless
+    this user wrote recently, otherwise the request's primary session."""
+    session_factory = read_routing.session_factory(
+        str(current_user.id), request.cookies.get(PRIMARY_READ_COOKIE)
+    )
+    if session_factory is None:
+        yield db
+        return
+    async with session_factory() as session:
+        yield session
@@ -1,16 +1,27 @@
 import asyncio
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from app.core.config import get_settings
-from app.core.database import get_db
+from app.core.database import get_db, pool_stats
 from app.models.entities.llm_provider import LLMProvider, LLMModel
 from app.models.entities.system_settings import SystemSettings
 from app.models.entities.user import User
 from app.api.deps import require_admin
+from app.services.embedding_providers import embedder
+from app.services.embedding_queue import embedding_queue
+from app.services.lexical_index import lexical_index
+from app.services.llm_call_metrics import llm_call_metrics
+from app.services.llm_circuit_breaker import llm_circuit_breakers
+from app.services.llm_client_pool import llm_client_pool
+from app.services.llm_concurrency import llm_concurrency
+from app.services.llm_context_budget import llm_context_budget
+from app.services.llm_hedging import llm_hedging
+from app.services.llm_response_cache import llm_response_cache
+from app.services.llm_route_cache import llm_route_cache
 from app.services.llm_service import DEFAULT_BASE_URLS, OPENAI_COMPATIBLE_PROVIDERS
 from app.services.model_os_service import LLM_TASK_ROUTES_KEY
 from pydantic import BaseModel, ConfigDict
@@ -184,6 +195,12 @@ async def _build_task_routes_response(
     return response
 
 
+async def _invalidate_llm_runtime_config(provider_id: Optional[int] = None) -> None:
+    llm_route_cache.invalidate()
+    if provider_id is not None:
+        await llm_client_pool.invalidate(provider_id)
+
+
 async def _cleanup_task_routes_for_provider(
     db: AsyncSession,
     provider_id: int,
@@ -256,6 +273,76 @@ async def get_task_routes(
     return await _build_task_routes_response(db, payload)
 
 
+@router.get("/routes/health")
+async def get_task_route_health(
+    admin: User = Depends(require_admin),
+):
+    return llm_circuit_breakers.snapshot()
+
+
+@router.get("/routes/hedging")
+async def get_task_route_hedging_stats(
+    admin: User = Depends(require_admin),
+):
+    return llm_hedging.stats()
+
+
+@router.get("/routes/concurrency")
+async def get_task_route_concurrency(
+    admin: User = Depends(require_admin),
+):
+    return llm_concurrency.snapshot()
+
+
+@router.get("/metrics/calls")
+async def get_llm_call_metrics(
+    hours: float = Query(default=24.0, gt=0, le=24 * 31),
+    admin: User = Depends(require_admin),
+):
+    return await llm_call_metrics.summarize(hours=hours)
+
+
+@router.get("/context-budget")
+async def get_llm_context_budget(admin: User = Depends(require_admin)):
+    return llm_context_budget.stats()
+
+
+@router.get("/embeddings")
+async def get_embedding_stats(admin: User = Depends(require_admin)):
+    return {
+        **embedder.stats(),
+        "queue": {**embedding_queue.stats(), "pending": await embedding_queue.pending()},
+        "lexical_index": lexical_index.stats(),
+    }
+
+
+@router.get("/database")
+async def get_database_pool_stats(admin: User = Depends(require_admin)):
+    return pool_stats()
+
+
+@router.get("/routes/cache")
+async def get_task_route_cache_stats(
+    admin: User = Depends(require_admin),
+):
+    return llm_route_cache.stats()
+
+
+@router.get("/response-cache")
+async def get_response_cache_stats(
+    admin: User = Depends(require_admin),
+):
+    return await llm_response_cache.stats()
+
+
+@router.delete("/response-cache")
+async def clear_response_cache(
+    admin: User = Depends(require_admin),
+):
+    await llm_response_cache.clear()
+    return {"status": "cleared"}
+
+
 @router.put("/routes")
 async def update_task_routes(
     routes: TaskRouteConfigUpdate,
@@ -265,6 +352,7 @@ async def update_task_routes(
     payload = routes.model_dump()
     normalized = await _validate_task_routes_payload(db, payload)
     await _save_task_routes_payload(db, normalized)
+    await _invalidate_llm_runtime_config()
     return await _build_task_routes_response(db, normalized)
 
 
@@ -285,6 +373,7 @@ async def create_provider(
     db.add(db_provider)
     await db.commit()
     await db.refresh(db_provider)
+    await _invalidate_llm_runtime_config()
     return {"id": db_provider.id, "name": db_provider.name}
 
 
@@ -317,6 +406,7 @@ async def update_provider(
     if provider.enabled is False:
         await _cleanup_task_routes_for_provider(db, db_provider.id)
     await db.commit()
+    await _invalidate_llm_runtime_config(db_provider.id)
     return {"status": "success"}
 
 
@@ -335,6 +425,7 @@ async def delete_provider(
     await _cleanup_task_routes_for_provider(db, db_provider.id)
     await db.delete(db_provider)
     await db.commit()
+    await _invalidate_llm_runtime_config(provider_id)
     return {"status": "deleted"}
 
 
@@ -365,6 +456,7 @@ async def create_model(
     db.add(db_model)
     await db.commit()
     await db.refresh(db_model)
+    await _invalidate_llm_runtime_config()
     return {"id": db_model.id, "model_id": db_model.model_id}
 
 
@@ -405,6 +497,7 @@ async def update_model(
     if model.enabled is False:
         await _cleanup_task_routes_for_model(db, db_model.id)
     await db.commit()
+    await _invalidate_llm_runtime_config()
     return {"status": "success"}
 
 
@@ -423,6 +516,7 @@ async def delete_model(
     await _cleanup_task_routes_for_model(db, db_model.id)
     await db.delete(db_model)
     await db.commit()
+    await _invalidate_llm_runtime_config()
     return {"status": "deleted"}
 
 
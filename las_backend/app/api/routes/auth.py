@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy import delete, func, select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import Optional
@@ -15,7 +15,9 @@ from app.core.security import (
     get_password_hash,
     verify_password,
 )
-from app.models.entities.user import LoginThrottle, Problem, RevokedToken, User
+from app.models.entities.user import Problem, RevokedToken, User
+from app.services.auth_cache import auth_user_cache, revocation_key, revoked_tokens
+from app.services.login_throttle import login_throttle
 from app.schemas.problem import ProblemCreate, ProblemResponse, ProblemUpdate
 from app.schemas.user import (
     LogoutRequest,
@@ -33,13 +35,10 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
-async def _is_token_revoked(db: AsyncSession, token: Optional[str]) -> bool:
+async def _is_token_revoked(db: AsyncSession, token: Optional[str], payload: Optional[dict] = None) -> bool:
     if not token:
         return False
-    result = await db.execute(
-        select(RevokedToken.id).where(RevokedToken.token == token)
-    )
-    return result.scalar_one_or_none() is not None
+    return await revoked_tokens.is_revoked(db, token, payload)
 
 
 def _extract_token_expiry(payload: Optional[dict]) -> Optional[datetime]:
@@ -57,16 +56,18 @@ async def _revoke_token(
     token_type: str,
     payload: Optional[dict] = None,
 ) -> None:
-    if not token or await _is_token_revoked(db, token):
+    if not token or await _is_token_revoked(db, token, payload):
         return
 
+    jti = revocation_key(token, payload)
     db.add(
         RevokedToken(
-            token=token,
+            jti=jti,
             token_type=token_type,
             expires_at=_extract_token_expiry(payload),
         )
     )
+    revoked_tokens.add(jti)
 
 
 async def get_current_user(
@@ -80,29 +81,22 @@ async def get_current_user(
     )
 
     payload = decode_access_token(token)
-    if payload is None or await _is_token_revoked(db, token):
+    if payload is None or await _is_token_revoked(db, token, payload):
         raise credentials_exception
 
     user_id: str = payload.get("sub")
     if user_id is None:
         raise credentials_exception
 
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = await auth_user_cache.get(db, str(user_id))
     if user is None:
         raise credentials_exception
 
+    # Commits on this session keep the user's reads on the primary for a while.
+    db.info["user_id"] = str(user.id)
     return user
 
 
-def _login_rate_limit_enabled() -> bool:
-    return (
-        settings.LOGIN_RATE_LIMIT_ATTEMPTS > 0
-        and settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS > 0
-        and settings.LOGIN_RATE_LIMIT_BLOCK_SECONDS > 0
-    )
-
-
 def _extract_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
@@ -117,71 +111,32 @@ def _login_limit_keys(username: str, request: Request) -> list[str]:
     ]
 
 
-async def _get_login_throttle(db: AsyncSession, key: str) -> Optional[LoginThrottle]:
-    result = await db.execute(
-        select(LoginThrottle).where(LoginThrottle.scope_key == key)
-    )
-    return result.scalar_one_or_none()
-
-
-async def _ensure_login_allowed(username: str, request: Request, db: AsyncSession) -> None:
-    if not _login_rate_limit_enabled():
+def _ensure_login_allowed(username: str, request: Request) -> None:
+    if not login_throttle.enabled:
         return
 
-    now = datetime.utcnow()
-    for key in _login_limit_keys(username, request):
-        throttle = await _get_login_throttle(db, key)
-        if throttle and throttle.blocked_until and throttle.blocked_until > now:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many login attempts. Please try again later.",
-            )
+    if login_throttle.is_blocked(_login_limit_keys(username, request)):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts. Please try again later.",
+        )
 
 
-async def _register_failed_login(username: str, request: Request, db: AsyncSession) -> None:
-    if not _login_rate_limit_enabled():
+def _register_failed_login(username: str, request: Request) -> None:
+    if not login_throttle.enabled:
         return
 
-    now = datetime.utcnow()
-    client_ip = _extract_client_ip(request)
-    window_start = now - timedelta(seconds=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS)
-    normalized_username = (username or "").strip().lower() or None
-
-    for key in _login_limit_keys(username, request):
-        throttle = await _get_login_throttle(db, key)
-        if throttle is None:
-            throttle = LoginThrottle(
-                scope_key=key,
-                username=normalized_username,
-                client_ip=client_ip,
-                failed_count=0,
-                window_started_at=now,
-            )
-            db.add(throttle)
-
-        if throttle.window_started_at < window_start:
-            throttle.failed_count = 0
-            throttle.window_started_at = now
-            throttle.blocked_until = None
-
-        throttle.username = normalized_username
-        throttle.client_ip = client_ip
-        throttle.failed_count += 1
-
-        if throttle.failed_count >= settings.LOGIN_RATE_LIMIT_ATTEMPTS:
-            throttle.blocked_until = now + timedelta(
-                seconds=settings.LOGIN_RATE_LIMIT_BLOCK_SECONDS
-            )
-
-
-async def _clear_login_attempts(username: str, request: Request, db: AsyncSession) -> None:
-    await db.execute(
-        delete(LoginThrottle).where(
-            LoginThrottle.scope_key.in_(_login_limit_keys(username, request))
-        )
+    login_throttle.register_failure(
+        _login_limit_keys(username, request),
+        username=(username or "").strip().lower() or None,
+        client_ip=_extract_client_ip(request),
     )
 
 
+def _clear_login_attempts(username: str, request: Request) -> None:
+    login_throttle.clear(_login_limit_keys(username, request))
+
+
 def _issue_auth_tokens(user_id: str) -> dict:
     access_token = create_access_token(
         data={"sub": user_id},
@@ -237,14 +192,13 @@ async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
 ):
-    await _ensure_login_allowed(form_data.username, request, db)
+    _ensure_login_allowed(form_data.username, request)
 
     result = await db.execute(select(User).where(User.username == form_data.username))
     user = result.scalar_one_or_none()
 
     if not user or not verify_password(form_data.password, user.hashed_password):
-        await _register_failed_login(form_data.username, request, db)
-        await db.commit()
+        _register_failed_login(form_data.username, request)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -257,8 +211,7 @@ async def login(
             detail="Inactive user"
         )
 
-    await _clear_login_attempts(form_data.username, request, db)
-    await db.commit()
+    _clear_login_attempts(form_data.username, request)
 
     return _issue_auth_tokens(str(user.id))
 
@@ -306,12 +259,11 @@ async def refresh_token(
     db: AsyncSession = Depends(get_db),
 ):
     refresh_token_value = payload.refresh_token
-    if await _is_token_revoked(db, refresh_token_value):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token revoked")
-
     token_payload = decode_refresh_token(refresh_token_value)
     if token_payload is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    if await _is_token_revoked(db, refresh_token_value, token_payload):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token revoked")
 
     user_id = token_payload.get("sub")
     result = await db.execute(select(User).where(User.id == user_id))
@@ -329,20 +281,19 @@ async def logout(
     payload: LogoutRequest,
     db: AsyncSession = Depends(get_db),
 ):
-    if payload.access_token:
-        await _revoke_token(
-            db,
-            payload.access_token,
-            "access",
-            decode_access_token(payload.access_token),
-        )
-    if payload.refresh_token:
-        await _revoke_token(
-            db,
-            payload.refresh_token,
-            "refresh",
-            decode_refresh_token(payload.refresh_token),
-        )
+    for token, token_type, decode in (
+        (payload.access_token, "access", decode_access_token),
+        (payload.refresh_token, "refresh", decode_refresh_token),
+    ):
+        if not token:
+            continue
+        token_payload = decode(token)
+        # A token that does not verify cannot authenticate, and its claims
+        # (jti included) are attacker-controlled: nothing to revoke.
+        if token_payload is None:
+            continue
+        await _revoke_token(db, token, token_type, token_payload)
+        auth_user_cache.invalidate((token_payload or {}).get("sub"))
     await db.commit()
     return {"message": "Logged out successfully"}
 
@@ -18,64 +18,32 @@ from app.schemas.model_card import (
     EvolutionLogResponse,
 )
 from app.api.routes.auth import get_current_user
+from app.api.deps import get_read_db
 from app.api.routes.srs import _load_review_origins, _serialize_schedule
+from app.api.routes.vector_search_support import rank_with_vector_backend
 from app.services.model_os_service import model_os_service
 
 router = APIRouter(prefix="/model-cards", tags=["Model Cards"])
 
 
-def merge_ranked_cards(primary_cards: List[ModelCard], fallback_cards: List[ModelCard]) -> List[ModelCard]:
-    merged: List[ModelCard] = []
-    seen: set[str] = set()
-    for card in primary_cards + fallback_cards:
-        card_id = str(card.id)
-        if card_id in seen:
-            continue
-        seen.add(card_id)
-        merged.append(card)
-    return merged
-
-
 async def rank_model_cards_with_backend(
     db: AsyncSession,
     current_user: User,
-    cards: List[ModelCard],
+    statement,
     query: str,
+    *,
+    limit: int,
 ) -> List[ModelCard]:
-    bind = db.get_bind()
-    fallback_ranked_cards = model_os_service.rank_model_cards(cards, query)
-
-    if not (bind and bind.dialect.name == "postgresql" and cards):
-        return fallback_ranked_cards
-
-    query_embedding = model_os_service.generate_embedding(query)
-    embedding_param = model_os_service.serialize_embedding_for_pgvector(query_embedding)
-    native_rank_result = await db.execute(
-        text(
-            """
-            SELECT mc.id
-            FROM model_cards mc
-            WHERE mc.user_id = :user_id
-              AND mc.embedding IS NOT NULL
-              AND mc.id = ANY(:card_ids)
-            ORDER BY mc.embedding <=> CAST(:embedding AS vector)
-            LIMIT :limit
-            """
-        ),
-        {
-            "user_id": str(current_user.id),
-            "card_ids": [str(card.id) for card in cards],
-            "embedding": embedding_param,
-            "limit": max(len(cards), 1),
-        },
+    return await rank_with_vector_backend(
+        db,
+        statement,
+        ModelCard,
+        kind="model_card",
+        user_id=str(current_user.id),
+        query=query,
+        limit=limit,
+        rank_fallback=model_os_service.rank_model_cards,
     )
-    card_map = {str(card.id): card for card in cards}
-    native_ranked_cards = [
-        card_map[row[0]]
-        for row in native_rank_result.all()
-        if row[0] in card_map
-    ]
-    return merge_ranked_cards(native_ranked_cards, fallback_ranked_cards)
 
 
 def _normalize_model_card_sort(raw_sort: Optional[str]) -> str:
@@ -123,17 +91,13 @@ async def create_model_card(
         user_notes=card_data.user_notes,
         examples=examples,
         counter_examples=counter_examples,
-        embedding=model_os_service.generate_card_embedding(
-            title=card_data.title,
-            user_notes=card_data.user_notes,
-            examples=examples,
-            counter_examples=counter_examples,
-        ),
     )
+    await model_os_service.refresh_card_embedding(db_card)
     
     db.add(db_card)
     await db.commit()
     await db.refresh(db_card)
+    model_os_service.index_item(str(current_user.id), "model_card", db_card)
 
     await model_os_service.log_evolution(
         db=db,
@@ -157,7 +121,7 @@ async def list_model_cards(
     limit: int = Query(default=12, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     current_user_id = str(current_user.id)
     normalized_origin_type = origin_type if origin_type in {"manual", "problem_concept_candidate"} else None
@@ -203,9 +167,13 @@ async def list_model_cards(
         )
 
     if q:
-        result = await db.execute(query.order_by(*_model_card_sort_clauses(normalized_sort)))
-        cards = list(result.scalars().all())
-        cards = await rank_model_cards_with_backend(db, current_user, cards, q)
+        cards = await rank_model_cards_with_backend(
+            db,
+            current_user,
+            query.order_by(*_model_card_sort_clauses(normalized_sort)),
+            q,
+            limit=offset + limit,
+        )
         page_cards = cards[offset:offset + limit]
     else:
         result = await db.execute(
@@ -273,7 +241,7 @@ async def list_similar_model_cards(
     if not card:
         raise HTTPException(status_code=404, detail="Model card not found")
 
-    all_cards_result = await db.execute(
+    candidates = (
         select(ModelCard)
         .where(
             ModelCard.user_id == str(current_user.id),
@@ -281,14 +249,13 @@ async def list_similar_model_cards(
         )
         .order_by(ModelCard.updated_at.desc())
     )
-    candidate_cards = list(all_cards_result.scalars().all())
     query = model_os_service.build_embedding_text(
         title=card.title,
         user_notes=card.user_notes,
         examples=card.examples,
         counter_examples=card.counter_examples,
     )
-    ranked_cards = await rank_model_cards_with_backend(db, current_user, candidate_cards, query)
+    ranked_cards = await rank_model_cards_with_backend(db, current_user, candidates, query, limit=limit)
     return ranked_cards[:limit]
 
 
@@ -344,7 +311,7 @@ async def update_model_card(
         card.migration_attempts = card_data.migration_attempts
 
     card.version += 1
-    model_os_service.refresh_card_embedding(card)
+    await model_os_service.refresh_card_embedding(card)
 
     await model_os_service.log_evolution(
         db=db,
@@ -357,6 +324,7 @@ async def update_model_card(
 
     await db.commit()
     await db.refresh(card)
+    model_os_service.index_item(str(current_user.id), "model_card", card)
 
     return card
 
@@ -389,7 +357,7 @@ async def activate_model_card(
     if card.lifecycle_stage != "active":
         card.lifecycle_stage = "active"
         card.version += 1
-        model_os_service.refresh_card_embedding(card)
+        await model_os_service.refresh_card_embedding(card)
 
         await model_os_service.log_evolution(
             db=db,
@@ -402,6 +370,7 @@ async def activate_model_card(
 
         await db.commit()
         await db.refresh(card)
+        model_os_service.index_item(str(current_user.id), "model_card", card)
 
     return card
 
@@ -425,6 +394,7 @@ async def delete_model_card(
     
     await db.delete(card)
     await db.commit()
+    model_os_service.unindex_item(str(current_user.id), "model_card", str(card_id))
     
     return None
 
@@ -454,7 +424,7 @@ async def generate_counter_examples(
     
     card.counter_examples = counter_examples
     card.version += 1
-    model_os_service.refresh_card_embedding(card)
+    await model_os_service.refresh_card_embedding(card)
 
     await model_os_service.log_evolution(
         db=db,
@@ -467,6 +437,7 @@ async def generate_counter_examples(
 
     await db.commit()
     await db.refresh(card)
+    model_os_service.index_item(str(current_user.id), "model_card", card)
 
     return {"counter_examples": counter_examples}
 
@@ -501,7 +472,7 @@ async def suggest_migration(
     if not card.migration_attempts:
         card.migration_attempts = []
     card.migration_attempts.append(migration_record)
-    model_os_service.refresh_card_embedding(card)
+    await model_os_service.refresh_card_embedding(card)
 
     await model_os_service.log_evolution(
         db=db,
@@ -514,6 +485,7 @@ async def suggest_migration(
 
     await db.commit()
     await db.refresh(card)
+    model_os_service.index_item(str(current_user.id), "model_card", card)
 
     return {"migrations": migrations}
 
@@ -113,13 +113,8 @@ async def ensure_model_card_for_candidate(
         examples=examples,
         counter_examples=[],
         concept_maps=None,
-        embedding=model_os_service.generate_card_embedding(
-            title=target_title,
-            user_notes=notes,
-            examples=examples,
-            counter_examples=[],
-        ),
     )
+    await model_os_service.refresh_card_embedding(model_card)
     db.add(model_card)
     await db.flush()
 
@@ -87,7 +87,7 @@ async def accept_problem_concept_candidate(
     accepted_concepts: list[str] = []
     if merged != existing:
         problem.associated_concepts = merged
-        model_os_service.refresh_problem_embedding(problem)
+        await model_os_service.refresh_problem_embedding(problem)
         accepted_concepts = [candidate.concept_text]
 
     anchor_concept = (
@@ -278,7 +278,7 @@ async def merge_problem_concept_candidate(
     )
     if merged_problem_concepts != canonical_existing:
         problem.associated_concepts = merged_problem_concepts
-        model_os_service.refresh_problem_embedding(problem)
+        await model_os_service.refresh_problem_embedding(problem)
 
     candidate.status = "merged"
     candidate.merged_into_concept = target_concept.canonical_name
@@ -352,7 +352,7 @@ async def rollback_problem_concept(
     removed = len(kept) != len(existing)
     if removed:
         problem.associated_concepts = kept
-        model_os_service.refresh_problem_embedding(problem)
+        await model_os_service.refresh_problem_embedding(problem)
 
     await db.execute(
         text(
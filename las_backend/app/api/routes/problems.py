@@ -9,10 +9,10 @@ from fastapi.encoders import jsonable_encoder
 from fastapi.responses import Response
 from sse_starlette.sse import EventSourceResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, text, desc
+from sqlalchemy import select, desc
 from sqlalchemy.orm import selectinload
 from uuid import UUID
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from app.core.config import get_settings
 from app.core.database import get_db
@@ -48,6 +48,7 @@ from app.schemas.problem import (
     ProblemConceptRollbackResponse,
 )
 from app.api.routes.auth import get_current_user
+from app.api.deps import get_read_db
 from app.api.routes.problem_exploration_support import (
     _build_exploration_next_actions,
     _build_exploration_path_suggestions,
@@ -105,6 +106,8 @@ from app.api.routes.problem_socratic_response_support import (
     build_socratic_response_stream,
     complete_socratic_response,
 )
+from app.api.routes.vector_search_support import rank_with_vector_backend
+from app.services.event_sink import learning_event_sink
 from app.services.model_os_service import model_os_service
 
 router = APIRouter(prefix="/problems", tags=["Problems"])
@@ -763,16 +766,18 @@ async def _log_learning_event(
     trace_id: Optional[str],
     payload: dict,
 ) -> None:
-    db.add(
-        LearningEvent(
-            user_id=user_id,
-            problem_id=problem_id,
-            event_type=event_type,
-            learning_mode=learning_mode,
-            trace_id=trace_id,
-            payload_json=payload or {},
-        )
-    )
+    row = {
+        "user_id": user_id,
+        "problem_id": problem_id,
+        "event_type": event_type,
+        "learning_mode": learning_mode,
+        "trace_id": trace_id,
+        "payload_json": payload or {},
+    }
+    if learning_event_sink.enabled:
+        learning_event_sink.submit_after_commit(db, row)
+    else:
+        db.add(LearningEvent(**row))
 
 
 def _build_socratic_response_support_deps() -> SocraticResponseSupportDeps:
@@ -833,21 +838,40 @@ async def create_problem(
         description=problem_data.description,
         associated_concepts=associated_concepts,
         learning_mode=_normalize_learning_mode(problem_data.learning_mode, "socratic"),
-        embedding=model_os_service.generate_embedding(
-            model_os_service.build_problem_embedding_text(
-                title=problem_data.title,
-                description=problem_data.description,
-                associated_concepts=associated_concepts,
-            )
-        ),
     )
+    await model_os_service.refresh_problem_embedding(db_problem)
     
     db.add(db_problem)
     await db.commit()
     await db.refresh(db_problem)
+    model_os_service.index_item(str(current_user.id), "problem", db_problem)
     
     existing_knowledge = []
     path_timeout = _problem_create_path_timeout_seconds()
+    db_learning_path: Optional[LearningPath] = None
+
+    async def persist_partial_learning_path(steps: List[Dict[str, Any]]) -> None:
+        # The last streamed step may still be growing, so only the steps before
+        # it are committed, once per new finished step; readers see the path
+        # fill in while generation runs. The commit below stores the final path.
+        nonlocal db_learning_path
+        finished = steps[:-1]
+        if not finished or (db_learning_path is not None and len(db_learning_path.path_data or []) >= len(finished)):
+            return
+        if db_learning_path is None:
+            db_learning_path = LearningPath(
+                problem_id=db_problem.id,
+                title=problem_data.title,
+                kind="main",
+                is_active=True,
+                path_data=finished,
+                current_step=0,
+            )
+            db.add(db_learning_path)
+        else:
+            db_learning_path.path_data = finished
+        await db.commit()
+
     try:
         learning_path_data = await asyncio.wait_for(
             model_os_service.generate_learning_path_resilient(
@@ -856,6 +880,7 @@ async def create_problem(
                 existing_knowledge=existing_knowledge,
                 associated_concepts=associated_concepts,
                 timeout_seconds=path_timeout,
+                on_partial=persist_partial_learning_path,
             ),
             timeout=max(path_timeout + 1, 5),
         )
@@ -881,16 +906,18 @@ async def create_problem(
             associated_concepts=associated_concepts,
         )
     
-    db_learning_path = LearningPath(
-        problem_id=db_problem.id,
-        title=problem_data.title,
-        kind="main",
-        is_active=True,
-        path_data=learning_path_data,
-        current_step=0,
-    )
-    
-    db.add(db_learning_path)
+    if db_learning_path is None:
+        db_learning_path = LearningPath(
+            problem_id=db_problem.id,
+            title=problem_data.title,
+            kind="main",
+            is_active=True,
+            path_data=learning_path_data,
+            current_step=0,
+        )
+        db.add(db_learning_path)
+    else:
+        db_learning_path.path_data = learning_path_data
     await db.commit()
     
     return db_problem
@@ -918,48 +945,16 @@ async def list_problems(
         query = query.where(Problem.status == normalized_status)
 
     if q:
-        result = await db.execute(query.order_by(*_problem_sort_clauses(normalized_sort)))
-        problems = list(result.scalars().all())
-        problems = list(problems)
-        bind = db.get_bind()
-        fallback_ranked = model_os_service.rank_problems(problems, q)
-        if bind and bind.dialect.name == "postgresql" and problems:
-            query_embedding = model_os_service.generate_embedding(q)
-            embedding_param = model_os_service.serialize_embedding_for_pgvector(query_embedding)
-            native_result = await db.execute(
-                text(
-                    """
-                    SELECT p.id
-                    FROM problems p
-                    WHERE p.user_id = :user_id
-                      AND p.embedding IS NOT NULL
-                    ORDER BY p.embedding <=> CAST(:embedding AS vector)
-                    LIMIT :limit
-                    """
-                ),
-                {
-                    "user_id": str(current_user.id),
-                    "embedding": embedding_param,
-                    "limit": max(len(problems), 1),
-                },
-            )
-            problem_map = {str(problem.id): problem for problem in problems}
-            native_ranked = [
-                problem_map[row[0]]
-                for row in native_result.all()
-                if row[0] in problem_map
-            ]
-            seen = set()
-            merged = []
-            for problem in native_ranked + fallback_ranked:
-                pid = str(problem.id)
-                if pid in seen:
-                    continue
-                seen.add(pid)
-                merged.append(problem)
-            problems = merged
-        else:
-            problems = fallback_ranked
+        problems = await rank_with_vector_backend(
+            db,
+            query.order_by(*_problem_sort_clauses(normalized_sort)),
+            Problem,
+            kind="problem",
+            user_id=str(current_user.id),
+            query=q,
+            limit=offset + limit,
+            rank_fallback=model_os_service.rank_problems,
+        )
         return list(problems)[offset:offset + limit]
 
     result = await db.execute(
@@ -1019,10 +1014,11 @@ async def update_problem(
         problem.learning_mode = _normalize_learning_mode(problem_data.learning_mode, problem.learning_mode or "socratic")
     if problem_data.status:
         problem.status = problem_data.status
-    model_os_service.refresh_problem_embedding(problem)
+    await model_os_service.refresh_problem_embedding(problem)
     
     await db.commit()
     await db.refresh(problem)
+    model_os_service.index_item(str(current_user.id), "problem", problem)
     
     return problem
 
@@ -1046,6 +1042,7 @@ async def delete_problem(
     
     await db.delete(problem)
     await db.commit()
+    model_os_service.unindex_item(str(current_user.id), "problem", str(problem_id))
     
     return None
 
@@ -1226,7 +1223,7 @@ async def list_problem_turns(
 async def export_problem_learning_record(
     problem_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     problem_result = await db.execute(
         select(Problem).where(
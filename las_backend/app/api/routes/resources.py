@@ -1,17 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, text
+from sqlalchemy import select
 from typing import List, Optional
 from uuid import UUID
 
+from app.core.config import get_settings
 from app.core.database import get_db
 from app.models.entities.user import User, Problem, ProblemTurn, ResourceLink
 from app.schemas.resource_link import ResourceLinkCreate, ResourceLinkUpdate, ResourceLinkResponse
 from app.api.routes.auth import get_current_user
+from app.api.routes.vector_search_support import rank_with_vector_backend
 from app.services.llm_service import llm_service
 from app.services.model_os_service import model_os_service
 
 router = APIRouter(prefix="/resources", tags=["Resources"])
+settings = get_settings()
 
 
 @router.post("/", response_model=ResourceLinkResponse, status_code=201)
@@ -54,17 +57,12 @@ async def create_resource(
         url=data.url,
         title=data.title,
         link_type=data.link_type,
-        embedding=model_os_service.generate_embedding(
-            model_os_service.build_resource_embedding_text(
-                title=data.title,
-                url=data.url,
-                link_type=data.link_type,
-            )
-        ),
     )
+    await model_os_service.refresh_resource_embedding(resource)
     db.add(resource)
     await db.commit()
     await db.refresh(resource)
+    model_os_service.index_item(str(current_user.id), "resource", resource)
     return resource
 
 
@@ -82,53 +80,20 @@ async def list_resources(
     if source_turn_id:
         filters.append(ResourceLink.source_turn_id == str(source_turn_id))
 
-    result = await db.execute(
-        select(ResourceLink)
-        .where(*filters)
-        .order_by(ResourceLink.created_at.desc())
-    )
-    resources = list(result.scalars().all())
+    statement = select(ResourceLink).where(*filters).order_by(ResourceLink.created_at.desc())
     if q:
-        bind = db.get_bind()
-        fallback_ranked = model_os_service.rank_resources(resources, q)
-        if bind and bind.dialect.name == "postgresql" and resources:
-            query_embedding = model_os_service.generate_embedding(q)
-            embedding_param = model_os_service.serialize_embedding_for_pgvector(query_embedding)
-            native_result = await db.execute(
-                text(
-                    """
-                    SELECT r.id
-                    FROM resource_links r
-                    WHERE r.user_id = :user_id
-                      AND r.embedding IS NOT NULL
-                    ORDER BY r.embedding <=> CAST(:embedding AS vector)
-                    LIMIT :limit
-                    """
-                ),
-                {
-                    "user_id": str(current_user.id),
-                    "embedding": embedding_param,
-                    "limit": max(len(resources), 1),
-                },
-            )
-            resource_map = {str(resource.id): resource for resource in resources}
-            native_ranked = [
-                resource_map[row[0]]
-                for row in native_result.all()
-                if row[0] in resource_map
-            ]
-            seen = set()
-            merged = []
-            for resource in native_ranked + fallback_ranked:
-                rid = str(resource.id)
-                if rid in seen:
-                    continue
-                seen.add(rid)
-                merged.append(resource)
-            resources = merged
-        else:
-            resources = fallback_ranked
-    return resources
+        return await rank_with_vector_backend(
+            db,
+            statement,
+            ResourceLink,
+            kind="resource",
+            user_id=str(current_user.id),
+            query=q,
+            limit=settings.VECTOR_INDEX_CANDIDATES,
+            rank_fallback=model_os_service.rank_resources,
+        )
+    result = await db.execute(statement)
+    return list(result.scalars().all())
 
 
 @router.put("/{resource_id}", response_model=ResourceLinkResponse)
@@ -151,9 +116,10 @@ async def update_resource(
         resource.title = data.title
     if data.status is not None:
         resource.status = data.status
-    model_os_service.refresh_resource_embedding(resource)
+    await model_os_service.refresh_resource_embedding(resource)
     await db.commit()
     await db.refresh(resource)
+    model_os_service.index_item(str(current_user.id), "resource", resource)
     return resource
 
 
@@ -174,6 +140,7 @@ async def delete_resource(
         raise HTTPException(status_code=404, detail="Resource not found")
     await db.delete(resource)
     await db.commit()
+    model_os_service.unindex_item(str(current_user.id), "resource", str(resource_id))
 
 
 @router.post("/{resource_id}/interpret", response_model=ResourceLinkResponse)
@@ -199,7 +166,8 @@ async def interpret_resource(
         "and how it might be useful for learning. Respond in the same language as the title if provided."
     )
     resource.ai_summary = await llm_service.generate(prompt)
-    model_os_service.refresh_resource_embedding(resource)
+    await model_os_service.refresh_resource_embedding(resource)
     await db.commit()
     await db.refresh(resource)
+    model_os_service.index_item(str(current_user.id), "resource", resource)
     return resource
@@ -5,9 +5,11 @@ from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.routes.auth import get_current_user
+from app.api.deps import get_read_db
 from app.core.database import get_db
 from app.models.entities.user import RetrievalEvent, User
 from app.schemas.retrieval import RetrievalEventResponse, RetrievalSummaryResponse
+from app.services.event_sink import retrieval_event_sink
 
 
 router = APIRouter(prefix="/retrieval", tags=["Retrieval"])
@@ -20,6 +22,9 @@ async def list_retrieval_logs(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    # Write out this worker's buffered events so its own recent searches show
+    # up; events buffered by other workers appear after their next flush.
+    await retrieval_event_sink.flush()
     query = (
         select(RetrievalEvent)
         .where(RetrievalEvent.user_id == str(current_user.id))
@@ -36,8 +41,9 @@ async def list_retrieval_logs(
 @router.get("/summary", response_model=RetrievalSummaryResponse)
 async def get_retrieval_summary(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
+    await retrieval_event_sink.flush()
     user_id = str(current_user.id)
 
     totals = await db.execute(
@@ -69,6 +75,13 @@ async def get_retrieval_summary(
         )
     )
     zero_hit_rate = round((zero_hit_events / total_events), 2) if total_events else 0.0
+    cache_hits = await db.scalar(
+        select(func.count(RetrievalEvent.id)).where(
+            RetrievalEvent.user_id == user_id,
+            RetrievalEvent.cache_hit.is_(True),
+        )
+    )
+    cache_hit_rate = round((cache_hits / total_events), 2) if total_events else 0.0
     health_status = "needs_attention" if zero_hit_events or average_hits < 1.5 else "healthy"
 
     return {
@@ -78,6 +91,8 @@ async def get_retrieval_summary(
         "zero_hit_events": zero_hit_events or 0,
         "poor_hit_events": poor_hit_events or 0,
         "zero_hit_rate": zero_hit_rate,
+        "cache_hits": cache_hits or 0,
+        "cache_hit_rate": cache_hit_rate,
         "health_status": health_status,
         "source_breakdown": source_breakdown,
     }
@@ -7,6 +7,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.routes.auth import get_current_user
+from app.api.deps import get_read_db
 from app.core.database import get_db
 from app.models.entities.user import Review, User
 from app.schemas.review import (
@@ -134,7 +135,7 @@ async def get_review(
 async def export_review(
     review_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(
         select(Review).where(
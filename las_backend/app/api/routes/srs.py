@@ -9,6 +9,7 @@ from sqlalchemy.orm import selectinload
 from app.core.database import get_db
 from app.models.entities.user import ModelCard, ProblemConceptCandidate, ProblemTurn, ReviewSchedule, User
 from app.api.routes.auth import get_current_user
+from app.api.deps import get_read_db
 from app.services.model_os_service import model_os_service
 from app.services.srs_service import srs_service
 
@@ -264,7 +265,7 @@ def _serialize_schedule(schedule: ReviewSchedule, card: ModelCard | None, origin
 @router.get("/due")
 async def get_due_reviews(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get model cards due for review."""
     schedules = await srs_service.get_due_cards(db, str(current_user.id))
@@ -13,6 +13,7 @@ from app.models.entities.user import (
     Concept, ConceptRelation, ConceptEvidence,
 )
 from app.api.routes.auth import get_current_user
+from app.api.deps import get_read_db
 
 router = APIRouter(prefix="/statistics", tags=["Statistics"])
 
@@ -59,7 +60,7 @@ async def get_overview(
 async def get_heatmap(
     days: int = 90,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get learning activity heatmap data (like GitHub contributions)."""
     uid = str(current_user.id)
@@ -98,7 +99,7 @@ async def get_heatmap(
 @router.get("/knowledge-graph")
 async def get_knowledge_graph(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get knowledge graph data from model cards and problem learning paths."""
     uid = str(current_user.id)
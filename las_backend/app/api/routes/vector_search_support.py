@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List
+
+from sqlalchemy import or_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.services.model_os_service import model_os_service
+
+
+RankFn = Callable[[List[Any], str], Awaitable[List[Any]]]
+ITERATIVE_SCAN_MODES = {"off", "strict_order", "relaxed_order"}
+# Per database URL: whether the installed pgvector (0.8+) has iterative scans.
+_iterative_scan_support: Dict[str, bool] = {}
+
+
+def is_postgres(db: AsyncSession) -> bool:
+    bind = db.get_bind()
+    return bool(bind and bind.dialect.name == "postgresql")
+
+
+def merge_ranked_items(primary_items: List[Any], fallback_items: List[Any]) -> List[Any]:
+    merged: List[Any] = []
+    seen: set[str] = set()
+    for item in primary_items + fallback_items:
+        item_id = str(item.id)
+        if item_id in seen:
+            continue
+        seen.add(item_id)
+        merged.append(item)
+    return merged
+
+
+async def _configure_ann_scan(db: AsyncSession, limit: int) -> None:
+    # HNSW only returns up to ef_search rows per scan; with the user_id filter
+    # applied after the scan, iterative scans keep going until LIMIT is met.
+    settings = get_settings()
+    ef_search = max(int(settings.PGVECTOR_HNSW_EF_SEARCH), limit)
+    await db.execute(text(f"SET LOCAL hnsw.ef_search = {ef_search}"))
+    mode = str(settings.PGVECTOR_ITERATIVE_SCAN or "").strip().lower()
+    if mode in ITERATIVE_SCAN_MODES and await _supports_iterative_scan(db):
+        await db.execute(text(f"SET LOCAL hnsw.iterative_scan = {mode}"))
+
+
+async def _supports_iterative_scan(db: AsyncSession) -> bool:
+    key = str(getattr(db.get_bind(), "url", ""))
+    if key not in _iterative_scan_support:
+        version = (
+            await db.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'"))
+        ).scalar()
+        try:
+            parts = tuple(int(part) for part in str(version or "0").split(".")[:2])
+        except ValueError:
+            parts = (0,)
+        _iterative_scan_support[key] = parts >= (0, 8)
+    return _iterative_scan_support[key]
+
+
+async def rank_with_vector_backend(
+    db: AsyncSession,
+    statement,
+    entity,
+    *,
+    kind: str,
+    user_id: str,
+    query: str,
+    limit: int,
+    rank_fallback: RankFn,
+) -> List[Any]:
+    """Rank the rows selected by ``statement`` for ``query``.
+
+    Candidates are the nearest rows by embedding plus the best lexical
+    matches from the inverted index. On Postgres the nearest ``limit`` rows
+    come from the pgvector index and only that shortlist (plus rows without
+    an embedding) is ranked. Elsewhere every row is loaded and narrowed by the
+    in-process vector index. When the lexical index cannot answer for this
+    user, rows are scored lexically by rescanning their text.
+    """
+    lexical_scores = await model_os_service.lexical_index.search(db, user_id, kind, query)
+    rank = rank_fallback if lexical_scores is None else partial(rank_fallback, lexical_scores=lexical_scores)
+    lexical_ids = model_os_service.top_lexical_ids(lexical_scores)
+
+    if not is_postgres(db):
+        result = await db.execute(statement)
+        items = list(result.scalars().all())
+        shortlisted = {
+            str(item.id)
+            for item in await model_os_service.shortlist_for_ranking(user_id, kind, items, query)
+        }
+        shortlisted.update(lexical_ids)
+        return await rank([item for item in items if str(item.id) in shortlisted], query)
+
+    limit = max(1, limit)
+    await _configure_ann_scan(db, limit)
+    embedding_param = model_os_service.serialize_embedding_for_pgvector(
+        await model_os_service.generate_embedding(query)
+    )
+    distance = text(f"{entity.__tablename__}.embedding <=> CAST(:query_embedding AS vector)").bindparams(
+        query_embedding=embedding_param
+    )
+    native_result = await db.execute(
+        statement
+        .where(entity.embedding.is_not(None))
+        .order_by(None)
+        .order_by(distance)
+        .limit(limit)
+    )
+    native_ranked = list(native_result.scalars().all())
+    extra_filter = entity.embedding.is_(None)
+    if lexical_ids:
+        extra_filter = or_(extra_filter, entity.id.in_(lexical_ids))
+    extra_result = await db.execute(statement.where(extra_filter))
+    native_ids = {str(item.id) for item in native_ranked}
+    extra = [item for item in extra_result.scalars().all() if str(item.id) not in native_ids]
+    fallback_ranked = await rank(native_ranked + extra, query)
+    return merge_ranked_items(native_ranked, fallback_ranked)
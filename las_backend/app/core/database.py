@@ -1,14 +1,118 @@
+import hashlib
+import hmac
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import get_settings
 
 settings = get_settings()
 DATABASE_URL = settings.effective_database_url
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-)
+
+class PoolMetrics:
+    """How long sessions wait for a pooled connection."""
+
+    def __init__(self, sample_size: int = 1000):
+        self._waits_ms: Deque[float] = deque(maxlen=sample_size)
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def observe(self, wait_ms: float) -> None:
+        with self._lock:
+            self._waits_ms.append(wait_ms)
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ordered = sorted(self._waits_ms)
+
+        def quantile(value: float):
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(round(value * (len(ordered) - 1))))], 3)
+
+        return {
+            "checkouts": self.checkouts,
+            "wait_ms": {
+                "avg": round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else None,
+                "p50": quantile(0.50),
+                "p95": quantile(0.95),
+                "p99": quantile(0.99),
+                "max": round(self.max_wait_ms, 3),
+            },
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._waits_ms.clear()
+            self.checkouts = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredAsyncQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.observe((time.perf_counter() - started) * 1000)
+
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    backend = make_url(url).get_backend_name()
+    options: Dict[str, Any] = {"echo": False}
+    if backend == "sqlite" and (make_url(url).database or ":memory:") == ":memory:":
+        # In-memory databases live and die with their one connection.
+        return options
+    options.update(
+        poolclass=MeteredAsyncQueuePool,
+        pool_size=max(1, settings.DATABASE_POOL_SIZE),
+        max_overflow=max(0, settings.DATABASE_MAX_OVERFLOW),
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+    )
+    if backend == "postgresql":
+        options["connect_args"] = {
+            "prepared_statement_cache_size": max(0, settings.DATABASE_STATEMENT_CACHE_SIZE),
+        }
+    return options
+
+
+def configure_sqlite_connection(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        if settings.DATABASE_SQLITE_WAL:
+            # WAL lets readers run alongside the single writer; NORMAL sync is
+            # durable across application crashes in WAL mode.
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={max(0, int(settings.DATABASE_SQLITE_BUSY_TIMEOUT_MS))}")
+        cursor.execute(f"PRAGMA mmap_size={max(0, int(settings.DATABASE_SQLITE_MMAP_SIZE))}")
+    finally:
+        cursor.close()
+
+
+engine = create_async_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+if engine.dialect.name == "sqlite":
+    event.listen(engine.sync_engine, "connect", configure_sqlite_connection)
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -18,6 +122,141 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+# Optional replica for read-only endpoints; without one they share the primary.
+DATABASE_READ_URL = settings.DATABASE_READ_URL or None
+read_engine = create_async_engine(DATABASE_READ_URL, **_engine_options(DATABASE_READ_URL)) if DATABASE_READ_URL else None
+ReadSessionLocal: Optional[async_sessionmaker] = (
+    async_sessionmaker(
+        read_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+    if read_engine is not None
+    else None
+)
+if read_engine is not None and read_engine.dialect.name == "sqlite":
+    event.listen(read_engine.sync_engine, "connect", configure_sqlite_connection)
+
+
+PRIMARY_READ_COOKIE = "las_primary_reads"
+_request_writers: ContextVar[Optional[Set[str]]] = ContextVar("request_writers", default=None)
+
+
+class ReadRouting:
+    """Read-your-writes for replica reads.
+
+    A user whose request committed a write stays on the primary for
+    ``DATABASE_READ_STICKINESS_SECONDS`` so replica lag never hides it.
+    Request sessions carry the user in ``session.info["user_id"]``.
+
+    The pin is kept in this process and also handed back to the client as a
+    short-lived signed cookie, so whichever worker serves the next request
+    honours it. Responses whose headers are already sent when the write
+    commits (streams) and clients that do not send cookies only get the
+    per-process pin.
+    """
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        self._sticky_until: Dict[str, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return ReadSessionLocal is not None
+
+    @property
+    def stickiness_seconds(self) -> float:
+        return max(0.0, float(settings.DATABASE_READ_STICKINESS_SECONDS))
+
+    def mark_write(self, user_id: str) -> None:
+        now = time.monotonic()
+        if len(self._sticky_until) >= self.max_users:
+            self._sticky_until = {key: until for key, until in self._sticky_until.items() if until > now}
+        self._sticky_until[str(user_id)] = now + self.stickiness_seconds
+        writers = _request_writers.get()
+        if writers is not None:
+            writers.add(str(user_id))
+
+    def is_sticky(self, user_id: str) -> bool:
+        return self._sticky_until.get(str(user_id), 0.0) > time.monotonic()
+
+    @contextmanager
+    def track_request(self) -> Iterator[Set[str]]:
+        """Collect the users whose writes commit while handling one request."""
+        token = _request_writers.set(set())
+        try:
+            yield _request_writers.get()
+        finally:
+            _request_writers.reset(token)
+
+    @staticmethod
+    def _sign(payload: str) -> str:
+        return hmac.new(settings.SECRET_KEY.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+    def issue_cookie(self, user_id: str) -> str:
+        # Wall clock, not monotonic: another worker or host checks it.
+        payload = f"{user_id}:{time.time() + self.stickiness_seconds:.3f}"
+        return f"{payload}:{self._sign(payload)}"
+
+    def cookie_is_sticky(self, value: Optional[str], user_id: str) -> bool:
+        payload, _, signature = (value or "").rpartition(":")
+        cookie_user, _, until = payload.rpartition(":")
+        if not signature or cookie_user != str(user_id) or not hmac.compare_digest(signature, self._sign(payload)):
+            return False
+        try:
+            return float(until) > time.time()
+        except ValueError:
+            return False
+
+    def session_factory(self, user_id: str, cookie: Optional[str] = None) -> Optional[async_sessionmaker]:
+        """The replica session factory, or None when the primary must serve the read."""
+        if ReadSessionLocal is None or self.is_sticky(user_id) or self.cookie_is_sticky(cookie, user_id):
+            return None
+        return ReadSessionLocal
+
+    def reset(self) -> None:
+        self._sticky_until.clear()
+
+
+read_routing = ReadRouting()
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flush(session: Session, flush_context) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_bulk_write(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _stick_writer_to_primary(session: Session) -> None:
+    if session.info.pop("wrote", False) and session.info.get("user_id"):
+        read_routing.mark_write(session.info["user_id"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_writes(session: Session) -> None:
+    session.info.pop("wrote", None)
+
+
+def pool_stats() -> Dict[str, Any]:
+    pool = engine.pool
+    status: Dict[str, Any] = {"dialect": engine.dialect.name, "pool": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            checked_in=pool.checkedin(),
+        )
+    return {**status, **pool_metrics.stats(), "read_replica": read_engine is not None}
+
 
 class Base(DeclarativeBase):
     pass
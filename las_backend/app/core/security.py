@@ -56,3 +56,11 @@ def decode_access_token(token: str) -> Optional[dict]:
 
 def decode_refresh_token(token: str) -> Optional[dict]:
     return decode_token(token, expected_type="refresh")
+
+
+def token_jti(token: str) -> Optional[str]:
+    """The ``jti`` claim without verifying the signature (for indexing only)."""
+    try:
+        return jwt.get_unverified_claims(token).get("jti")
+    except JWTError:
+        return None
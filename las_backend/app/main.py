@@ -1,10 +1,18 @@
-from fastapi import FastAPI
+import math
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.core.config import get_settings
-from app.core.database import engine, Base
+from app.core.database import PRIMARY_READ_COOKIE, engine, Base, read_routing
 from app.api import api_router
+from app.services.auth_cache import revoked_tokens
+from app.services.embedding_queue import embedding_queue
+from app.services.event_sink import learning_event_sink, retrieval_event_sink
+from app.services.llm_call_metrics import llm_call_metrics
+from app.services.llm_client_pool import llm_client_pool
+from app.services.login_throttle import login_throttle
 
 settings = get_settings()
 
@@ -15,7 +23,20 @@ async def lifespan(app: FastAPI):
     if settings.AUTO_CREATE_TABLES:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+    llm_call_metrics.start()
+    embedding_queue.start()
+    retrieval_event_sink.start()
+    learning_event_sink.start()
+    revoked_tokens.start()
+    login_throttle.start()
     yield
+    await login_throttle.stop()
+    await revoked_tokens.stop()
+    await learning_event_sink.stop()
+    await retrieval_event_sink.stop()
+    await embedding_queue.stop()
+    await llm_call_metrics.stop()
+    await llm_client_pool.aclose()
 
 
 app = FastAPI(
@@ -33,6 +54,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def pin_writers_to_primary(request: Request, call_next):
+    with read_routing.track_request() as writers:
+        response = await call_next(request)
+    if read_routing.enabled:
+        for user_id in writers:
+            response.set_cookie(
+                PRIMARY_READ_COOKIE,
+                read_routing.issue_cookie(user_id),
+                max_age=max(1, math.ceil(read_routing.stickiness_seconds)),
+                httponly=True,
+                samesite="lax",
+                secure=settings.is_production,
+            )
+    return response
+
+
 app.include_router(api_router)
 
 
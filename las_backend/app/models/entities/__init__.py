@@ -19,7 +19,7 @@ from app.models.entities.user import (
 )
 from app.models.entities.email_config import EmailConfig
 from app.models.entities.system_settings import SystemSettings
-from app.models.entities.llm_provider import LLMProvider, LLMModel
+from app.models.entities.llm_provider import LLMProvider, LLMModel, LLMResponseCacheEntry, LLMCallEvent
 
 __all__ = [
     "User",
@@ -43,4 +43,6 @@ __all__ = [
     "SystemSettings",
     "LLMProvider",
     "LLMModel",
+    "LLMResponseCacheEntry",
+    "LLMCallEvent",
 ]
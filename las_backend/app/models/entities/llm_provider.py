@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, DateTime, JSON, Float
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -32,3 +32,37 @@ class LLMModel(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     provider = relationship("LLMProvider", back_populates="models")
+
+
+class LLMResponseCacheEntry(Base):
+    __tablename__ = "llm_response_cache"
+
+    cache_key = Column(String(64), primary_key=True)
+    route_key = Column(String(255), nullable=False)
+    schema_name = Column(String(100), nullable=False, index=True)
+    payload = Column(JSON, nullable=True)
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class LLMCallEvent(Base):
+    __tablename__ = "llm_call_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    operation = Column(String(50), nullable=False)
+    lane = Column(String(50), nullable=True, index=True)
+    provider_id = Column(Integer, nullable=True)
+    provider_type = Column(String(50), nullable=True)
+    model_id = Column(String(100), nullable=True)
+    status = Column(String(20), nullable=False)
+    error = Column(String(255), nullable=True)
+    cache_hit = Column(Boolean, default=False, nullable=False)
+    fallback_reason = Column(String(100), nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    time_to_first_token_ms = Column(Integer, nullable=True)
+    latency_ms = Column(Integer, nullable=False)
+    cost_usd = Column(Float, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, Integer, ForeignKey, JSON, Boolean, Float
+from sqlalchemy import Column, String, DateTime, Text, Integer, ForeignKey, JSON, Boolean, Float, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 import uuid
 from datetime import datetime
@@ -50,13 +50,14 @@ class Problem(Base):
     __tablename__ = "problems"
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
     title = Column(String(500), nullable=False)
     description = Column(Text)
     associated_concepts = Column(JSON, default=list)
     learning_mode = Column(String(20), default="socratic")
     status = Column(String(50), default="new")
     embedding = Column(EmbeddingVector(settings.MODEL_CARD_EMBEDDING_DIMENSIONS))
+    embedding_model = Column(String(120), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -276,7 +277,7 @@ class ModelCard(Base):
     __tablename__ = "model_cards"
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
     title = Column(String(500), nullable=False)
     lifecycle_stage = Column(String(20), nullable=False, default="active", index=True)
     origin_type = Column(String(40), nullable=False, default="manual", index=True)
@@ -295,6 +296,7 @@ class ModelCard(Base):
     version = Column(Integer, default=1)
     parent_id = Column(String(36), ForeignKey("model_cards.id"))
     embedding = Column(EmbeddingVector(settings.MODEL_CARD_EMBEDDING_DIMENSIONS))
+    embedding_model = Column(String(120), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -380,11 +382,12 @@ class Review(Base):
     __tablename__ = "reviews"
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
     review_type = Column(String(50))
     period = Column(String(50))
     content = Column(JSON)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     user = relationship("User", back_populates="reviews")
 
@@ -428,7 +431,7 @@ class ResourceLink(Base):
     __tablename__ = "resource_links"
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
     problem_id = Column(String(36), ForeignKey("problems.id"), nullable=True, index=True)
     source_turn_id = Column(String(36), ForeignKey("problem_turns.id"), nullable=True, index=True)
     url = Column(Text, nullable=False)
@@ -437,6 +440,7 @@ class ResourceLink(Base):
     ai_summary = Column(Text)
     status = Column(String(20), default="unread")  # unread, reading, completed
     embedding = Column(EmbeddingVector(settings.MODEL_CARD_EMBEDDING_DIMENSIONS))
+    embedding_model = Column(String(120), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -477,9 +481,11 @@ class RevokedToken(Base):
     __tablename__ = "revoked_tokens"
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    token = Column(String(2048), unique=True, nullable=False, index=True)
+    jti = Column(String(64), unique=True, nullable=False, index=True)
+    # Raw token, only present on rows revoked before jti keys (migration 026).
+    token = Column(String(2048), unique=True, nullable=True, index=True)
     token_type = Column(String(20), nullable=False)
-    expires_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
@@ -507,11 +513,72 @@ class RetrievalEvent(Base):
     retrieval_context = Column(Text)
     items = Column(JSON, default=list)
     result_count = Column(Integer, default=0, nullable=False)
+    cache_hit = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
     user = relationship("User", backref="retrieval_events")
 
 
+class LexicalDocument(Base):
+    __tablename__ = "lexical_documents"
+    __table_args__ = (
+        UniqueConstraint("entity_type", "entity_id", name="uq_lexical_documents_entity"),
+        Index("ix_lexical_documents_user_entity_type", "user_id", "entity_type"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(36), nullable=False)
+    entity_type = Column(String(20), nullable=False)
+    entity_id = Column(String(36), nullable=False)
+    length = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class LexicalPosting(Base):
+    __tablename__ = "lexical_postings"
+    __table_args__ = (
+        Index("ix_lexical_postings_lookup", "user_id", "entity_type", "token"),
+        Index("ix_lexical_postings_entity", "entity_type", "entity_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(36), nullable=False)
+    entity_type = Column(String(20), nullable=False)
+    entity_id = Column(String(36), nullable=False)
+    token = Column(String(64), nullable=False)
+    tf = Column(Integer, nullable=False, default=1)
+
+
+class LexicalIndexState(Base):
+    """Marks a user's rows of one kind as fully covered by the lexical index."""
+
+    __tablename__ = "lexical_index_states"
+    __table_args__ = (
+        UniqueConstraint("user_id", "entity_type", name="uq_lexical_index_states_user_entity_type"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(36), nullable=False)
+    entity_type = Column(String(20), nullable=False)
+    indexed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class EmbeddingJob(Base):
+    __tablename__ = "embedding_jobs"
+    __table_args__ = (
+        UniqueConstraint("entity_type", "entity_id", name="uq_embedding_jobs_entity"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(36), nullable=False)
+    entity_type = Column(String(20), nullable=False)
+    entity_id = Column(String(36), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class CogTestSession(Base):
     __tablename__ = "cog_test_sessions"
 
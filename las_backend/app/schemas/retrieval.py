@@ -23,6 +23,7 @@ class RetrievalEventResponse(BaseModel):
     retrieval_context: Optional[str]
     items: List[RetrievalItemResponse] = Field(default_factory=list)
     result_count: int
+    cache_hit: bool = False
     created_at: datetime
 
 
@@ -33,5 +34,7 @@ class RetrievalSummaryResponse(BaseModel):
     zero_hit_events: int
     poor_hit_events: int
     zero_hit_rate: float
+    cache_hits: int = 0
+    cache_hit_rate: float = 0.0
     health_status: str
     source_breakdown: Dict[str, int] = Field(default_factory=dict)
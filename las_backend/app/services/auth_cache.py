@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, event, inspect, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.models.entities.user import RevokedToken, User
+
+
+logger = logging.getLogger(__name__)
+
+# Rows committed by other workers may carry a created_at slightly before the
+# last refresh; re-reading this overlap is cheap and idempotent.
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        error_rate = min(max(error_rate, 1e-6), 0.5)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:16], "big") | 1
+        return ((first + index * second) % self.size for index in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        # Refreshes re-add the rows in their overlap; only keys that set a new
+        # bit count towards capacity (false positives are not counted).
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self._bits[position >> 3] & mask:
+                self._bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def revocation_key(token: str, payload: Optional[dict] = None) -> str:
+    """Tokens are revoked by the ``jti`` of their verified ``payload``; anything
+    else by a SHA-256 of the raw string, so an unsigned token can never name
+    another token's ``jti``."""
+    jti = (payload or {}).get("jti")
+    return str(jti)[:64] if jti else hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class RevokedTokenFilter:
+    """In-memory Bloom filter over revoked tokens.
+
+    A miss proves a token was never revoked, so the common case costs no
+    query; a hit is confirmed against ``revoked_tokens``. The filter is
+    topped up from rows created since the last refresh (revocations made
+    by other workers) at most every ``REVOKED_TOKEN_REFRESH_SECONDS``, and
+    rebuilt from unexpired rows once it reaches its capacity. A background
+    loop purges rows whose token has expired, since those can no longer
+    authenticate anyway.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.settings = get_settings()
+        self.session_factory = session_factory
+        self._filter = self._new_filter()
+        self._loaded_until: Optional[datetime] = None
+        self._next_refresh = 0.0
+        self._purge_task: Optional[asyncio.Task] = None
+        self.negatives = 0
+        self.confirmations = 0
+        self.refreshes = 0
+        self.purged = 0
+
+    def _new_filter(self) -> BloomFilter:
+        return BloomFilter(
+            int(self.settings.REVOKED_TOKEN_BLOOM_CAPACITY),
+            float(self.settings.REVOKED_TOKEN_BLOOM_ERROR_RATE),
+        )
+
+    def add(self, key: str) -> None:
+        self._filter.add(key)
+
+    async def refresh(self, db, *, force: bool = False) -> None:
+        if not force and time.monotonic() < self._next_refresh:
+            return
+        now = datetime.utcnow()
+        statement = select(RevokedToken.jti)
+        rebuild = self._loaded_until is None or self._filter.count >= self._filter.capacity
+        if rebuild:
+            statement = statement.where((RevokedToken.expires_at.is_(None)) | (RevokedToken.expires_at > now))
+        else:
+            statement = statement.where(RevokedToken.created_at >= self._loaded_until - REFRESH_OVERLAP)
+        rows = (await db.execute(statement)).all()
+        target = self._new_filter() if rebuild else self._filter
+        for (jti,) in rows:
+            target.add(jti)
+        self._filter = target
+        self._loaded_until = now
+        self._next_refresh = time.monotonic() + max(0.0, float(self.settings.REVOKED_TOKEN_REFRESH_SECONDS))
+        self.refreshes += 1
+
+    async def is_revoked(self, db, token: str, payload: Optional[dict] = None) -> bool:
+        await self.refresh(db)
+        key = revocation_key(token, payload)
+        if key not in self._filter:
+            self.negatives += 1
+            return False
+        self.confirmations += 1
+        result = await db.execute(select(RevokedToken.id).where(RevokedToken.jti == key))
+        return result.scalar_one_or_none() is not None
+
+    async def purge_expired(self) -> int:
+        """Delete revoked rows past ``expires_at`` in bounded batches."""
+        now = datetime.utcnow()
+        # Rows without an expiry (undecodable tokens) go once no token
+        # issued before them could still be alive.
+        lifetime_cutoff = now - timedelta(
+            days=max(1, int(self.settings.REFRESH_TOKEN_EXPIRE_DAYS)),
+            minutes=max(0, int(self.settings.ACCESS_TOKEN_EXPIRE_MINUTES)),
+        )
+        expired = (RevokedToken.expires_at < now) | (
+            RevokedToken.expires_at.is_(None) & (RevokedToken.created_at < lifetime_cutoff)
+        )
+        batch_size = max(1, int(self.settings.REVOKED_TOKEN_PURGE_BATCH_SIZE))
+        total = 0
+        while True:
+            async with self.session_factory() as db:
+                ids = list((await db.scalars(select(RevokedToken.id).where(expired).limit(batch_size))).all())
+                if ids:
+                    await db.execute(delete(RevokedToken).where(RevokedToken.id.in_(ids)))
+                    await db.commit()
+            total += len(ids)
+            if len(ids) < batch_size:
+                break
+        self.purged += total
+        return total
+
+    async def _purge_loop(self) -> None:
+        while True:
+            try:
+                await self.purge_expired()
+            except Exception:
+                logger.exception("Purging expired revoked tokens failed")
+            await asyncio.sleep(max(1.0, float(self.settings.REVOKED_TOKEN_PURGE_INTERVAL_SECONDS)))
+
+    def start(self) -> None:
+        if self._purge_task is None or self._purge_task.done():
+            self._purge_task = asyncio.create_task(self._purge_loop())
+
+    async def stop(self) -> None:
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+            try:
+                await self._purge_task
+            except asyncio.CancelledError:
+                pass
+            self._purge_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": self._filter.count,
+            "capacity": self._filter.capacity,
+            "negatives": self.negatives,
+            "confirmations": self.confirmations,
+            "refreshes": self.refreshes,
+            "purged": self.purged,
+        }
+
+    def reset(self) -> None:
+        self._filter = self._new_filter()
+        self._loaded_until = None
+        self._next_refresh = 0.0
+        self.negatives = 0
+        self.confirmations = 0
+        self.refreshes = 0
+        self.purged = 0
+
+
+def _detached_copy(user: User) -> User:
+    copy = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+class AuthUserCache:
+    """Short-TTL cache of user rows for ``get_current_user``, keyed by ``sub``.
+
+    Entries are detached copies merged into the request session without a
+    query, so routes still get a persistent ``User`` they can modify. Any
+    flush that updates or deletes a user evicts it in this process, and the
+    commit evicts it again so a request that re-cached the old row between
+    flush and commit cannot keep it; other workers see the change within
+    the TTL.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._entries: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return float(self.settings.AUTH_USER_CACHE_TTL_SECONDS) > 0
+
+    async def get(self, db, user_id: str) -> Optional[User]:
+        entry = self._entries.get(user_id) if self.enabled else None
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return await db.merge(entry[1], load=False)
+        self.misses += 1
+        user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+        if user is not None and self.enabled:
+            self._entries[user_id] = (
+                time.monotonic() + float(self.settings.AUTH_USER_CACHE_TTL_SECONDS),
+                _detached_copy(user),
+            )
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > max(1, int(self.settings.AUTH_USER_CACHE_MAX_ENTRIES)):
+                self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id: Optional[str]) -> None:
+        if user_id:
+            self._entries.pop(str(user_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def reset(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+revoked_tokens = RevokedTokenFilter()
+auth_user_cache = AuthUserCache()
+
+
+@event.listens_for(Session, "after_flush")
+def _evict_changed_users(session: Session, flush_context) -> None:
+    for item in (*session.dirty, *session.deleted):
+        if isinstance(item, User):
+            auth_user_cache.invalidate(item.id)
+            session.info.setdefault("changed_users", set()).add(str(item.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed_users(session: Session) -> None:
+    for user_id in session.info.pop("changed_users", ()):
+        auth_user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop("changed_users", None)
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.vector import normalize_embedding
+from app.services import model_os_embedding_support as embedding_support
+from app.services.llm_client_pool import llm_client_pool
+from app.services.model_os_structured_support import tokenize_embedding_text
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # pragma: no cover - optional local backend
+    SentenceTransformer = None
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+DEFAULT_LOCAL_EMBEDDING_MODEL = "BAAI/bge-small-zh-v1.5"
+HASHING_EMBEDDING_VERSION = "v2"
+
+
+class EmbeddingProviderError(RuntimeError):
+    pass
+
+
+def _unit(vector: Sequence[float], dimensions: int) -> List[float]:
+    values = normalize_embedding(vector, dimensions) or [0.0] * dimensions
+    norm = sum(value * value for value in values) ** 0.5
+    if norm == 0:
+        return values
+    return [round(value / norm, 8) for value in values]
+
+
+class EmbeddingProvider:
+    """Turns texts into fixed-size unit vectors.
+
+    ``signature`` identifies the vector space (backend, model, dimensions);
+    rows embedded under a different signature are stale and get re-embedded.
+    """
+
+    name = "base"
+
+    def __init__(self, dimensions: int, batch_size: int = 64):
+        self.dimensions = dimensions
+        self.batch_size = max(1, batch_size)
+
+    @property
+    def signature(self) -> str:
+        return f"{self.name}:{self.dimensions}"
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    async def _aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        # Blocking backends run in a worker thread so the event loop keeps serving.
+        return await asyncio.to_thread(self._embed_batch, texts)
+
+    def _checked(self, batch: List[str], encoded: List[List[float]]) -> List[List[float]]:
+        if len(encoded) != len(batch):
+            raise EmbeddingProviderError(
+                f"{self.name} returned {len(encoded)} embeddings for {len(batch)} texts"
+            )
+        return [_unit(vector, self.dimensions) for vector in encoded]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            vectors.extend(self._checked(batch, self._embed_batch(batch)))
+        return vectors
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            vectors.extend(self._checked(batch, await self._aembed_batch(batch)))
+        return vectors
+
+    def close(self) -> None:
+        return None
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """The original feature-hashing embedder; local, deterministic and free."""
+
+    name = "hashing"
+
+    @property
+    def signature(self) -> str:
+        return f"{self.name}-{HASHING_EMBEDDING_VERSION}:{self.dimensions}"
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return [
+            embedding_support.generate_embedding(
+                text,
+                embedding_dimensions=self.dimensions,
+                tokenize_text=tokenize_embedding_text,
+            )
+            for text in texts
+        ]
+
+    async def _aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_batch(texts)
+
+
+class OpenAICompatibleEmbeddingProvider(EmbeddingProvider):
+    """``POST {base_url}/embeddings`` with many inputs per request."""
+
+    name = "openai"
+
+    def __init__(
+        self,
+        dimensions: int,
+        *,
+        base_url: str,
+        api_key: str,
+        model: str,
+        batch_size: int = 64,
+        timeout_seconds: float = 20.0,
+        send_dimensions: bool = True,
+    ):
+        super().__init__(dimensions, batch_size)
+        self.base_url = (base_url or "").rstrip("/")
+        self.api_key = api_key
+        self.model = model or DEFAULT_OPENAI_EMBEDDING_MODEL
+        self.send_dimensions = send_dimensions
+        self.timeout_seconds = timeout_seconds
+        self._client: Optional[httpx.Client] = None
+
+    @property
+    def signature(self) -> str:
+        return f"{self.name}:{self.model}:{self.dimensions}"
+
+    def _http(self) -> httpx.Client:
+        if self._client is None:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.Client(
+                headers=headers,
+                timeout=httpx.Timeout(self.timeout_seconds, connect=5.0),
+            )
+        return self._client
+
+    def _payload(self, texts: List[str]) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"model": self.model, "input": texts}
+        if self.send_dimensions:
+            payload["dimensions"] = self.dimensions
+        return payload
+
+    @staticmethod
+    def _parse(response: httpx.Response) -> List[List[float]]:
+        response.raise_for_status()
+        data = response.json().get("data") or []
+        ordered = sorted(data, key=lambda item: item.get("index", 0))
+        return [item.get("embedding") or [] for item in ordered]
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        try:
+            return self._parse(self._http().post(f"{self.base_url}/embeddings", json=self._payload(texts)))
+        except (httpx.HTTPError, ValueError) as exc:
+            raise EmbeddingProviderError(f"Embedding request failed: {exc}") from exc
+
+    async def _aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        client = llm_client_pool.get_embedding_client(self.base_url, self.api_key, self.timeout_seconds)
+        try:
+            return self._parse(await client.post(f"{self.base_url}/embeddings", json=self._payload(texts)))
+        except (httpx.HTTPError, ValueError) as exc:
+            raise EmbeddingProviderError(f"Embedding request failed: {exc}") from exc
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+class LocalModelEmbeddingProvider(EmbeddingProvider):
+    """sentence-transformers model on CPU, loaded on first use."""
+
+    name = "local"
+
+    def __init__(self, dimensions: int, *, model: str, batch_size: int = 64):
+        super().__init__(dimensions, batch_size)
+        self.model_name = model or DEFAULT_LOCAL_EMBEDDING_MODEL
+        self._model = None
+
+    @property
+    def signature(self) -> str:
+        return f"{self.name}:{self.model_name}:{self.dimensions}"
+
+    def _load(self):
+        if self._model is None:
+            if SentenceTransformer is None:
+                raise EmbeddingProviderError("EMBEDDING_PROVIDER=local requires sentence-transformers")
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+        return self._model
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        encoded = self._load().encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return [list(map(float, vector)) for vector in encoded]
+
+
+class EmbeddingCache:
+    """LRU of embeddings keyed by provider signature + SHA-256 of the text."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(0, max_entries)
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        # Queue workers encode in a thread while requests read the cache.
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(signature: str, text: str) -> str:
+        return f"{signature}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: str, vector: List[float]) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def build_embedding_provider(settings) -> EmbeddingProvider:
+    kind = str(settings.EMBEDDING_PROVIDER or "hashing").strip().lower()
+    dimensions = int(settings.MODEL_CARD_EMBEDDING_DIMENSIONS)
+    batch_size = int(settings.EMBEDDING_BATCH_SIZE)
+    if kind == "openai":
+        return OpenAICompatibleEmbeddingProvider(
+            dimensions,
+            base_url=settings.EMBEDDING_API_BASE_URL,
+            api_key=settings.EMBEDDING_API_KEY or settings.OPENAI_API_KEY,
+            model=settings.EMBEDDING_MODEL,
+            batch_size=batch_size,
+            timeout_seconds=float(settings.EMBEDDING_REQUEST_TIMEOUT_SECONDS),
+            send_dimensions=bool(settings.EMBEDDING_API_SEND_DIMENSIONS),
+        )
+    if kind == "local":
+        return LocalModelEmbeddingProvider(dimensions, model=settings.EMBEDDING_MODEL, batch_size=batch_size)
+    if kind != "hashing":
+        logger.warning("Unknown EMBEDDING_PROVIDER %r, using hashing embeddings", kind)
+    return HashingEmbeddingProvider(dimensions, batch_size)
+
+
+class Embedder:
+    """Cached, batched front for the configured ``EmbeddingProvider``."""
+
+    def __init__(self, provider: Optional[EmbeddingProvider] = None):
+        self.settings = get_settings()
+        self.provider = provider or build_embedding_provider(self.settings)
+        self.cache = EmbeddingCache(int(self.settings.EMBEDDING_CACHE_MAX_ENTRIES))
+        self.failures = 0
+
+    @property
+    def signature(self) -> str:
+        return self.provider.signature
+
+    @property
+    def dimensions(self) -> int:
+        return self.provider.dimensions
+
+    def _lookup(self, texts: List[str]):
+        signature = self.provider.signature
+        keys = [EmbeddingCache.key(signature, text) for text in texts]
+        vectors: Dict[str, List[float]] = {}
+        pending: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in vectors or key in pending:
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                vectors[key] = cached
+            else:
+                pending[key] = text
+        return keys, vectors, pending
+
+    def _store(self, vectors: Dict[str, List[float]], pending: Dict[str, str], encoded: List[List[float]]) -> None:
+        for key, vector in zip(pending, encoded):
+            self.cache.put(key, vector)
+            vectors[key] = vector
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed ``texts`` in order, encoding each distinct uncached text once."""
+        keys, vectors, pending = self._lookup(texts)
+        if pending:
+            try:
+                encoded = self.provider.embed(list(pending.values()))
+            except EmbeddingProviderError:
+                self.failures += 1
+                raise
+            self._store(vectors, pending, encoded)
+        return [vectors[key] for key in keys]
+
+    async def aembed_many(self, texts: List[str]) -> List[List[float]]:
+        """``embed_many`` for request handlers: provider calls never block the event loop."""
+        keys, vectors, pending = self._lookup(texts)
+        if pending:
+            try:
+                encoded = await self.provider.aembed(list(pending.values()))
+            except EmbeddingProviderError:
+                self.failures += 1
+                raise
+            self._store(vectors, pending, encoded)
+        return [vectors[key] for key in keys]
+
+    def embed(self, text: str) -> List[float]:
+        return self.embed_many([text])[0]
+
+    async def aembed(self, text: str) -> List[float]:
+        return (await self.aembed_many([text]))[0]
+
+    def use(self, provider: EmbeddingProvider) -> None:
+        self.provider.close()
+        self.provider = provider
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider.name,
+            "signature": self.provider.signature,
+            "dimensions": self.provider.dimensions,
+            "batch_size": self.provider.batch_size,
+            "failures": self.failures,
+            "cache": self.cache.stats(),
+        }
+
+    def reset(self) -> None:
+        self.cache.clear()
+        self.failures = 0
+
+
+embedder = Embedder()
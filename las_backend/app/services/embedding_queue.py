@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.models.entities.user import EmbeddingJob
+from app.services.embedding_providers import EmbeddingProviderError, embedder
+from app.services.lexical_index import INDEXED_ENTITIES, text_changed
+
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY_SECONDS = 300
+_KIND_BY_ENTITY = {entity: kind for kind, (entity, _, _) in INDEXED_ENTITIES.items()}
+
+
+@dataclass
+class _ClaimedJob:
+    job_id: int
+    kind: str
+    entity_id: str
+    text: str
+
+
+def _build_text(kind: str, item: Any) -> str:
+    return INDEXED_ENTITIES[kind][2](item)
+
+
+class EmbeddingQueue:
+    """DB-backed queue that moves embedding work off the write path.
+
+    Flushing a card, problem or resource with changed text upserts one job
+    per entity, pushing its ``available_at`` out by the debounce window so a
+    burst of edits is embedded once. Workers claim due jobs under a lease,
+    encode them in one batched provider call off the event loop, and only
+    write vectors for rows whose text has not changed since the claim. A job
+    that fails ``EMBEDDING_QUEUE_MAX_ATTEMPTS`` times is dropped; the row stays
+    unembedded and is ranked lexically until its text changes again.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.settings = get_settings()
+        self.session_factory = session_factory
+        self.embedder = embedder
+        self._task: Optional[asyncio.Task] = None
+        self.processed = 0
+        self.skipped = 0
+        self.failures = 0
+        self.abandoned = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.EMBEDDING_QUEUE_ENABLED)
+
+    @property
+    def max_attempts(self) -> int:
+        return max(1, int(self.settings.EMBEDDING_QUEUE_MAX_ATTEMPTS))
+
+    def enqueue_session(self, session: Session) -> None:
+        pending: Dict[Tuple[str, str], str] = {}
+        for item in session.new:
+            kind = _KIND_BY_ENTITY.get(type(item))
+            if kind is not None:
+                pending[(kind, str(item.id))] = str(item.user_id)
+        for item in session.dirty:
+            kind = _KIND_BY_ENTITY.get(type(item))
+            if kind is not None and text_changed(item, INDEXED_ENTITIES[kind][1]):
+                pending[(kind, str(item.id))] = str(item.user_id)
+        removed: List[Tuple[str, str]] = []
+        for item in session.deleted:
+            kind = _KIND_BY_ENTITY.get(type(item))
+            if kind is not None:
+                removed.append((kind, str(item.id)))
+        if not pending and not removed:
+            return
+
+        connection = session.connection()
+        by_kind: Dict[str, List[str]] = {}
+        for kind, entity_id in [*pending, *removed]:
+            by_kind.setdefault(kind, []).append(entity_id)
+        for kind, entity_ids in by_kind.items():
+            connection.execute(
+                delete(EmbeddingJob).where(
+                    EmbeddingJob.entity_type == kind,
+                    EmbeddingJob.entity_id.in_(entity_ids),
+                )
+            )
+        if pending:
+            available_at = datetime.utcnow() + timedelta(
+                seconds=max(0.0, float(self.settings.EMBEDDING_QUEUE_DEBOUNCE_SECONDS))
+            )
+            connection.execute(
+                insert(EmbeddingJob),
+                [
+                    {
+                        "user_id": user_id,
+                        "entity_type": kind,
+                        "entity_id": entity_id,
+                        "attempts": 0,
+                        "available_at": available_at,
+                    }
+                    for (kind, entity_id), user_id in pending.items()
+                ],
+            )
+
+    async def _load_items(self, db, entity_ids: Dict[str, List[str]]) -> Dict[Tuple[str, str], Any]:
+        items: Dict[Tuple[str, str], Any] = {}
+        for kind, ids in entity_ids.items():
+            entity = INDEXED_ENTITIES[kind][0]
+            result = await db.execute(select(entity).where(entity.id.in_(ids)))
+            for item in result.scalars().all():
+                items[(kind, str(item.id))] = item
+        return items
+
+    async def _claim(self) -> List[_ClaimedJob]:
+        now = datetime.utcnow()
+        claim_size = max(1, int(self.settings.EMBEDDING_QUEUE_CLAIM_SIZE))
+        async with self.session_factory() as db:
+            statement = (
+                select(EmbeddingJob)
+                .where(EmbeddingJob.available_at <= now)
+                .order_by(EmbeddingJob.available_at, EmbeddingJob.id)
+                .limit(claim_size)
+            )
+            bind = db.get_bind()
+            if bind.dialect.name == "postgresql":
+                statement = statement.with_for_update(skip_locked=True)
+            jobs = list((await db.execute(statement)).scalars().all())
+            if not jobs:
+                return []
+
+            entity_ids: Dict[str, List[str]] = {}
+            for job in jobs:
+                entity_ids.setdefault(job.entity_type, []).append(job.entity_id)
+            items = await self._load_items(db, entity_ids)
+
+            # The lease hides claimed jobs from other workers; a worker that
+            # dies mid-batch just lets it expire.
+            lease_until = now + timedelta(seconds=max(1, int(self.settings.EMBEDDING_QUEUE_LEASE_SECONDS)))
+            claimed: List[_ClaimedJob] = []
+            for job in jobs:
+                item = items.get((job.entity_type, job.entity_id))
+                if item is None:
+                    await db.delete(job)
+                    continue
+                if job.attempts >= self.max_attempts:
+                    # Leases that keep expiring mean the batch kills its worker.
+                    self._abandon(job)
+                    await db.delete(job)
+                    continue
+                job.available_at = lease_until
+                job.attempts += 1
+                claimed.append(_ClaimedJob(job.id, job.entity_type, job.entity_id, _build_text(job.entity_type, item)))
+            await db.commit()
+        return claimed
+
+    async def _retry_later(self, claimed: List[_ClaimedJob], error: str) -> None:
+        async with self.session_factory() as db:
+            jobs = (
+                await db.execute(select(EmbeddingJob).where(EmbeddingJob.id.in_([job.job_id for job in claimed])))
+            ).scalars().all()
+            now = datetime.utcnow()
+            for job in jobs:
+                job.last_error = error[:1000]
+                if job.attempts >= self.max_attempts:
+                    self._abandon(job)
+                    await db.delete(job)
+                    continue
+                job.available_at = now + timedelta(seconds=min(MAX_RETRY_DELAY_SECONDS, 2 ** job.attempts))
+            await db.commit()
+
+    def _abandon(self, job: EmbeddingJob) -> None:
+        self.abandoned += 1
+        logger.warning(
+            "Dropping embedding job for %s %s after %s attempts: %s",
+            job.entity_type,
+            job.entity_id,
+            job.attempts,
+            job.last_error,
+        )
+
+    async def process_once(self) -> int:
+        """Claim, encode and store one batch of due jobs; returns jobs completed."""
+        claimed = await self._claim()
+        if not claimed:
+            return 0
+        try:
+            vectors = await self.embedder.aembed_many([job.text for job in claimed])
+        except EmbeddingProviderError as exc:
+            self.failures += 1
+            logger.warning("Embedding queue batch failed: %s", exc)
+            await self._retry_later(claimed, str(exc))
+            return 0
+
+        signature = self.embedder.signature
+        written = 0
+        async with self.session_factory() as db:
+            entity_ids: Dict[str, List[str]] = {}
+            for job in claimed:
+                entity_ids.setdefault(job.kind, []).append(job.entity_id)
+            items = await self._load_items(db, entity_ids)
+            for job, vector in zip(claimed, vectors):
+                item = items.get((job.kind, job.entity_id))
+                # Text edited after the claim has re-queued the entity under a
+                # new job; that job will embed the newer text.
+                if item is None or _build_text(job.kind, item) != job.text:
+                    self.skipped += 1
+                    continue
+                # A Core UPDATE keeps updated_at: embedding is not a user edit.
+                entity = INDEXED_ENTITIES[job.kind][0]
+                await db.execute(
+                    update(entity)
+                    .where(entity.id == item.id)
+                    .values(embedding=vector, embedding_model=signature, updated_at=entity.updated_at)
+                    .execution_options(synchronize_session=False)
+                )
+                written += 1
+            await db.execute(delete(EmbeddingJob).where(EmbeddingJob.id.in_([job.job_id for job in claimed])))
+            await db.commit()
+        self.processed += written
+        return len(claimed)
+
+    async def drain(self) -> int:
+        """Process batches until no job is due."""
+        total = 0
+        while True:
+            completed = await self.process_once()
+            total += completed
+            if not completed:
+                return total
+
+    async def pending(self) -> int:
+        async with self.session_factory() as db:
+            return int(await db.scalar(select(func.count()).select_from(EmbeddingJob)) or 0)
+
+    async def _run_loop(self) -> None:
+        interval = max(0.1, float(self.settings.EMBEDDING_QUEUE_POLL_INTERVAL_SECONDS))
+        while True:
+            try:
+                completed = await self.process_once()
+            except Exception:
+                logger.exception("Embedding queue worker failed")
+                completed = 0
+            if not completed:
+                await asyncio.sleep(interval)
+
+    def start(self) -> None:
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None and not self._task.done(),
+            "processed": self.processed,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "abandoned": self.abandoned,
+        }
+
+    def reset(self) -> None:
+        self.processed = 0
+        self.skipped = 0
+        self.failures = 0
+        self.abandoned = 0
+
+
+embedding_queue = EmbeddingQueue()
+
+
+@event.listens_for(Session, "after_flush")
+def _queue_embeddings(session: Session, flush_context) -> None:
+    if embedding_queue.enabled:
+        embedding_queue.enqueue_session(session)
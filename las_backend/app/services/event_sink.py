@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import event, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.models.entities.user import LearningEvent, RetrievalEvent
+
+
+logger = logging.getLogger(__name__)
+
+
+class EventSink:
+    """Buffered writer for an append-only event table.
+
+    Requests hand rows to ``submit_after_commit`` and return without
+    touching the database: rows reach the queue when the request's own
+    transaction commits and are discarded if it rolls back. A background
+    loop (or a full batch) flushes them with one executemany INSERT per batch. The queue is bounded: once it holds
+    ``EVENT_SINK_MAX_PENDING`` rows new events are dropped and counted
+    rather than slowing requests down. Rows rejected by the database (e.g.
+    an event for a problem deleted before the flush) are skipped one by one
+    so they cannot wedge the rest of their batch.
+    """
+
+    def __init__(self, model, session_factory=AsyncSessionLocal):
+        self.settings = get_settings()
+        self.model = model
+        self.session_factory = session_factory
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._eager_flush: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.rejected = 0
+        self.flush_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.EVENT_SINK_ENABLED)
+
+    @property
+    def running(self) -> bool:
+        return self._flush_task is not None and not self._flush_task.done()
+
+    def submit(self, row: Dict[str, Any], *, sample_rate: float = 1.0) -> bool:
+        """Queue one row; returns False when it was sampled out or dropped."""
+        if sample_rate < 1.0 and random.random() >= sample_rate:
+            self.sampled_out += 1
+            return False
+        if len(self._pending) >= max(1, int(self.settings.EVENT_SINK_MAX_PENDING)):
+            self.dropped += 1
+            return False
+        row.setdefault("created_at", datetime.utcnow())
+        self._pending.append(row)
+        self.submitted += 1
+        if self.running and len(self._pending) >= self._batch_size():
+            if self._eager_flush is None or self._eager_flush.done():
+                self._eager_flush = asyncio.get_running_loop().create_task(self.flush())
+        return True
+
+    def submit_after_commit(self, db, row: Dict[str, Any], *, sample_rate: float = 1.0) -> None:
+        """Queue ``row`` once ``db`` commits; a rollback discards it."""
+        db.info.setdefault("pending_events", []).append((self, row, sample_rate))
+
+    def _batch_size(self) -> int:
+        return max(1, int(self.settings.EVENT_SINK_FLUSH_BATCH_SIZE))
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> None:
+        async with self.session_factory() as db:
+            await db.execute(insert(self.model), rows)
+            await db.commit()
+
+    async def _write_each(self, rows: List[Dict[str, Any]]) -> int:
+        written = 0
+        for row in rows:
+            try:
+                await self._write([row])
+            except IntegrityError as exc:
+                self.rejected += 1
+                logger.warning("Dropping %s row rejected by the database: %s", self.model.__tablename__, exc)
+                continue
+            written += 1
+        return written
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            written = 0
+            batch_size = self._batch_size()
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(min(batch_size, len(self._pending)))]
+                try:
+                    await self._write(batch)
+                    count = len(batch)
+                except IntegrityError:
+                    count = await self._write_each(batch)
+                except Exception:
+                    self.flush_errors += 1
+                    logger.exception("Flushing %s failed", self.model.__tablename__)
+                    self._pending.extendleft(reversed(batch))
+                    break
+                written += count
+                self.flushed += count
+            return written
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(0.1, float(self.settings.EVENT_SINK_FLUSH_INTERVAL_SECONDS)))
+            await self.flush()
+
+    def start(self) -> None:
+        if self.enabled and not self.running:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        for task in (self._flush_task, self._eager_flush):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._flush_task = None
+        self._eager_flush = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "pending": len(self._pending),
+            "submitted": self.submitted,
+            "sampled_out": self.sampled_out,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "rejected": self.rejected,
+            "flush_errors": self.flush_errors,
+        }
+
+    def reset(self) -> None:
+        self._pending.clear()
+        self.submitted = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.rejected = 0
+        self.flush_errors = 0
+
+
+retrieval_event_sink = EventSink(RetrievalEvent)
+learning_event_sink = EventSink(LearningEvent)
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_committed_events(session: Session) -> None:
+    for sink, row, sample_rate in session.info.pop("pending_events", ()):
+        sink.submit(row, sample_rate=sample_rate)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_events(session: Session) -> None:
+    session.info.pop("pending_events", None)
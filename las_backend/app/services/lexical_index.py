@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import logging
+import math
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, insert, inspect, literal, select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.entities.user import (
+    LexicalDocument,
+    LexicalIndexState,
+    LexicalPosting,
+    ModelCard,
+    Problem,
+    ResourceLink,
+    User,
+)
+from app.services import model_os_embedding_support as embedding_support
+from app.services.model_os_structured_support import tokenize_text
+
+logger = logging.getLogger(__name__)
+
+MAX_TOKEN_LENGTH = 64
+FULL_MATCH_BONUS = 0.5
+
+
+def lexical_tokens(text: Optional[str]) -> List[str]:
+    """Search tokens (words plus CJK bigrams) clipped to the posting column width."""
+    return [token[:MAX_TOKEN_LENGTH] for token in tokenize_text(text or "")]
+
+
+IndexedEntity = Tuple[Any, Tuple[str, ...], Callable[[Any], str]]
+INDEXED_ENTITIES: Dict[str, IndexedEntity] = {
+    "model_card": (
+        ModelCard,
+        ("title", "user_notes", "examples", "counter_examples"),
+        lambda card: embedding_support.build_embedding_text(
+            title=card.title,
+            user_notes=card.user_notes,
+            examples=card.examples,
+            counter_examples=card.counter_examples,
+        ),
+    ),
+    "problem": (
+        Problem,
+        ("title", "description", "associated_concepts"),
+        lambda problem: embedding_support.build_problem_embedding_text(
+            title=problem.title,
+            description=problem.description,
+            associated_concepts=problem.associated_concepts,
+        ),
+    ),
+    "resource": (
+        ResourceLink,
+        ("title", "url", "link_type", "ai_summary", "status"),
+        lambda resource: embedding_support.build_resource_embedding_text(
+            title=resource.title,
+            url=resource.url,
+            link_type=resource.link_type,
+            ai_summary=resource.ai_summary,
+            status=resource.status,
+        ),
+    ),
+}
+_KIND_BY_ENTITY = {entity: kind for kind, (entity, _, _) in INDEXED_ENTITIES.items()}
+
+
+def _document_rows(kind: str, item: Any) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    _, _, build_text = INDEXED_ENTITIES[kind]
+    counts = Counter(lexical_tokens(build_text(item)))
+    user_id, entity_id = str(item.user_id), str(item.id)
+    document = {
+        "user_id": user_id,
+        "entity_type": kind,
+        "entity_id": entity_id,
+        "length": sum(counts.values()),
+    }
+    postings = [
+        {"user_id": user_id, "entity_type": kind, "entity_id": entity_id, "token": token, "tf": tf}
+        for token, tf in counts.items()
+    ]
+    return document, postings
+
+
+def text_changed(item: Any, fields: Iterable[str]) -> bool:
+    state = inspect(item)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+class LexicalIndex:
+    """Per-user inverted index (token -> postings with tf) for hybrid search.
+
+    Postings are rewritten in the same transaction whenever a card, problem or
+    resource is flushed with changed text, and queried with BM25. The score is
+    normalized so a document matching every query term once at average length
+    scores 1.0, keeping it on the scale of the old token-hit ratio, and a
+    document matching all query terms gets the old 0.5 bonus in place of the
+    substring check.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._indexed: set = set()
+        self._reported_fallbacks: set = set()
+        self.fallbacks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.LEXICAL_INDEX_ENABLED)
+
+    def sync_session(self, session: Session) -> None:
+        upserts: Dict[str, List[Any]] = {}
+        removals: Dict[str, List[str]] = {}
+        new_users: List[str] = []
+        deleted_users: List[str] = []
+        for item in session.new:
+            kind = _KIND_BY_ENTITY.get(type(item))
+            if kind is not None:
+                upserts.setdefault(kind, []).append(item)
+            elif isinstance(item, User):
+                new_users.append(str(item.id))
+        for item in session.dirty:
+            kind = _KIND_BY_ENTITY.get(type(item))
+            if kind is not None and text_changed(item, INDEXED_ENTITIES[kind][1]):
+                upserts.setdefault(kind, []).append(item)
+        for item in session.deleted:
+            kind = _KIND_BY_ENTITY.get(type(item))
+            if kind is not None:
+                removals.setdefault(kind, []).append(str(item.id))
+            elif isinstance(item, User):
+                deleted_users.append(str(item.id))
+        if not upserts and not removals and not new_users and not deleted_users:
+            return
+
+        connection = session.connection()
+        for kind, items in upserts.items():
+            removals.setdefault(kind, []).extend(str(item.id) for item in items)
+        for kind, entity_ids in removals.items():
+            self._delete_documents(connection, kind, entity_ids)
+        if deleted_users:
+            # Rows removed by a database-level cascade never reach the flush.
+            for model in (LexicalPosting, LexicalDocument, LexicalIndexState):
+                connection.execute(delete(model).where(model.user_id.in_(deleted_users)))
+            self._indexed = {key for key in self._indexed if key[0] not in deleted_users}
+        if new_users:
+            # A brand-new user has nothing to backfill.
+            connection.execute(
+                insert(LexicalIndexState),
+                [{"user_id": user_id, "entity_type": kind} for user_id in new_users for kind in INDEXED_ENTITIES],
+            )
+        documents: List[Dict[str, Any]] = []
+        postings: List[Dict[str, Any]] = []
+        for kind, items in upserts.items():
+            for item in items:
+                document, item_postings = _document_rows(kind, item)
+                documents.append(document)
+                postings.extend(item_postings)
+        if documents:
+            connection.execute(insert(LexicalDocument), documents)
+        if postings:
+            connection.execute(insert(LexicalPosting), postings)
+
+    def drop_bulk_deleted(self, orm_execute_state) -> None:
+        """Remove documents for the rows an ORM bulk ``delete()`` is about to remove.
+
+        Bulk deletes skip ``after_flush``, so without this their postings would
+        outlive the rows they point at.
+        """
+        mapper = orm_execute_state.bind_mapper
+        kind = _KIND_BY_ENTITY.get(mapper.class_) if mapper is not None else None
+        if kind is None:
+            return
+        entity = mapper.class_
+        doomed = select(entity.id)
+        whereclause = orm_execute_state.statement.whereclause
+        if whereclause is not None:
+            doomed = doomed.where(whereclause)
+        self._delete_documents(orm_execute_state.session.connection(), kind, doomed)
+
+    def _delete_documents(self, connection, kind: str, entity_ids) -> None:
+        connection.execute(
+            delete(LexicalPosting).where(
+                LexicalPosting.entity_type == kind,
+                LexicalPosting.entity_id.in_(entity_ids),
+            )
+        )
+        connection.execute(
+            delete(LexicalDocument).where(
+                LexicalDocument.entity_type == kind,
+                LexicalDocument.entity_id.in_(entity_ids),
+            )
+        )
+
+    async def reindex(self, db, user_id: Optional[str] = None) -> int:
+        """Rebuild postings for every indexed row (optionally for one user).
+
+        Also drops orphaned documents and marks the rebuilt users as complete.
+        """
+        indexed = 0
+        for kind, (entity, _, _) in INDEXED_ENTITIES.items():
+            statement = select(entity)
+            users = select(User.id, literal(kind), func.now())
+            document_filter = [LexicalDocument.entity_type == kind]
+            posting_filter = [LexicalPosting.entity_type == kind]
+            state_filter = [LexicalIndexState.entity_type == kind]
+            if user_id is not None:
+                statement = statement.where(entity.user_id == str(user_id))
+                users = users.where(User.id == str(user_id))
+                document_filter.append(LexicalDocument.user_id == str(user_id))
+                posting_filter.append(LexicalPosting.user_id == str(user_id))
+                state_filter.append(LexicalIndexState.user_id == str(user_id))
+            await db.execute(delete(LexicalPosting).where(*posting_filter))
+            await db.execute(delete(LexicalDocument).where(*document_filter))
+            items = list((await db.execute(statement)).scalars().all())
+            documents: List[Dict[str, Any]] = []
+            postings: List[Dict[str, Any]] = []
+            for item in items:
+                document, item_postings = _document_rows(kind, item)
+                documents.append(document)
+                postings.extend(item_postings)
+            if documents:
+                await db.execute(insert(LexicalDocument), documents)
+            if postings:
+                await db.execute(insert(LexicalPosting), postings)
+            await db.execute(delete(LexicalIndexState).where(*state_filter))
+            await db.execute(
+                insert(LexicalIndexState).from_select(["user_id", "entity_type", "indexed_at"], users)
+            )
+            indexed += len(items)
+        return indexed
+
+    async def is_indexed(self, db, user_id: str, kind: str) -> bool:
+        """Whether the backfill (or account creation) marked this user's rows as indexed.
+
+        Markers are only ever added while the index stays in sync, so a positive
+        answer is cached for the life of the process.
+        """
+        key = (user_id, kind)
+        if key in self._indexed:
+            return True
+        marker = await db.scalar(
+            select(LexicalIndexState.id)
+            .where(LexicalIndexState.user_id == user_id, LexicalIndexState.entity_type == kind)
+            .limit(1)
+        )
+        if marker is None:
+            return False
+        self._indexed.add(key)
+        return True
+
+    async def search(self, db, user_id: str, kind: str, query: str) -> Optional[Dict[str, float]]:
+        """Return lexical scores for every document matching a query term.
+
+        ``None`` means the index cannot answer for this user (disabled or not
+        yet backfilled) and callers should score rows directly.
+        """
+        if not self.enabled:
+            return None
+        user_id = str(user_id)
+        terms = list(dict.fromkeys(lexical_tokens(query)))
+        if not terms:
+            return {}
+        if not await self.is_indexed(db, user_id, kind):
+            self.fallbacks += 1
+            if (user_id, kind) not in self._reported_fallbacks:
+                self._reported_fallbacks.add((user_id, kind))
+                logger.warning(
+                    "Lexical index has no %s backfill for user %s; scoring rows directly "
+                    "until scripts/backfill_lexical_index.py runs",
+                    kind,
+                    user_id,
+                )
+            return None
+
+        document_count, average_length = (
+            await db.execute(
+                select(func.count(), func.avg(LexicalDocument.length)).where(
+                    LexicalDocument.user_id == user_id,
+                    LexicalDocument.entity_type == kind,
+                )
+            )
+        ).one()
+        postings = (
+            await db.execute(
+                select(LexicalPosting.entity_id, LexicalPosting.token, LexicalPosting.tf).where(
+                    LexicalPosting.user_id == user_id,
+                    LexicalPosting.entity_type == kind,
+                    LexicalPosting.token.in_(terms),
+                )
+            )
+        ).all()
+        if not postings:
+            return {}
+        lengths = dict(
+            (
+                await db.execute(
+                    select(LexicalDocument.entity_id, LexicalDocument.length).where(
+                        LexicalDocument.entity_type == kind,
+                        LexicalDocument.entity_id.in_({entity_id for entity_id, _, _ in postings}),
+                    )
+                )
+            ).all()
+        )
+        return self._bm25(terms, postings, lengths, int(document_count or 0), float(average_length or 0.0))
+
+    def _bm25(
+        self,
+        terms: List[str],
+        postings: List[Tuple[str, str, int]],
+        lengths: Dict[str, int],
+        document_count: int,
+        average_length: float,
+    ) -> Dict[str, float]:
+        k1 = float(self.settings.LEXICAL_INDEX_BM25_K1)
+        b = float(self.settings.LEXICAL_INDEX_BM25_B)
+        document_count = max(document_count, 1)
+        average_length = average_length or 1.0
+        frequencies = Counter(token for _, token, _ in postings)
+        # Terms absent from the corpus still count against coverage, but only
+        # as much as a term found in a single document would.
+        idf = {
+            term: math.log(1.0 + (document_count - max(frequencies[term], 1) + 0.5) / (max(frequencies[term], 1) + 0.5))
+            for term in terms
+        }
+        ideal = sum(idf.values()) or 1.0
+
+        raw: Dict[str, float] = {}
+        matched: Dict[str, int] = {}
+        for entity_id, token, tf in postings:
+            norm = k1 * (1.0 - b + b * lengths.get(entity_id, average_length) / average_length)
+            raw[entity_id] = raw.get(entity_id, 0.0) + idf[token] * tf * (k1 + 1.0) / (tf + norm)
+            matched[entity_id] = matched.get(entity_id, 0) + 1
+        return {
+            entity_id: min(1.0, score / ideal) + (FULL_MATCH_BONUS if matched[entity_id] == len(terms) else 0.0)
+            for entity_id, score in raw.items()
+        }
+
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "indexed_users": len({user_id for user_id, _ in self._indexed}),
+            "fallbacks": self.fallbacks,
+        }
+
+    def reset(self) -> None:
+        self._indexed.clear()
+        self._reported_fallbacks.clear()
+        self.fallbacks = 0
+
+
+lexical_index = LexicalIndex()
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_lexical_index(session: Session, flush_context) -> None:
+    if lexical_index.enabled:
+        lexical_index.sync_session(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _drop_bulk_deleted_documents(orm_execute_state) -> None:
+    if lexical_index.enabled and orm_execute_state.is_delete:
+        lexical_index.drop_bulk_deleted(orm_execute_state)
@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.models.entities.llm_provider import LLMCallEvent
+
+
+# Lane and fallback reason are only known to ModelOSService; LLMService picks
+# them up from here when it records the call.
+_call_tags: ContextVar[Dict[str, Optional[str]]] = ContextVar("llm_call_tags", default={})
+_current_meter: ContextVar[Optional["CallMeter"]] = ContextVar("llm_call_meter", default=None)
+
+
+@contextmanager
+def llm_call_tags(**tags: Optional[str]) -> Iterator[None]:
+    token = _call_tags.set({**_call_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        try:
+            _call_tags.reset(token)
+        except ValueError:
+            # Exited from another task's context (e.g. a hedged stream step).
+            pass
+
+
+def note_usage(
+    prompt_tokens: Optional[int],
+    completion_tokens: Optional[int],
+    meter: Optional["CallMeter"] = None,
+) -> None:
+    # Streams pass their meter explicitly: their steps may run in other
+    # tasks' contexts (hedging), where the context variable is not visible.
+    meter = meter or _current_meter.get()
+    if meter is not None:
+        meter.prompt_tokens = _as_int(prompt_tokens)
+        meter.completion_tokens = _as_int(completion_tokens)
+
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def percentile(values: List[float], quantile: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(quantile * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+@dataclass
+class CallRecord:
+    operation: str
+    lane: Optional[str]
+    provider_id: Optional[int]
+    provider_type: Optional[str]
+    model_id: Optional[str]
+    status: str
+    latency_ms: int
+    error: Optional[str] = None
+    cache_hit: bool = False
+    fallback_reason: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    time_to_first_token_ms: Optional[int] = None
+    cost_usd: Optional[float] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+class CallMeter:
+    def __init__(self, operation: str, provider_id: Optional[int], provider_type: Optional[str], model_id: Optional[str]):
+        self.operation = operation
+        self.provider_id = provider_id
+        self.provider_type = provider_type
+        self.model_id = model_id
+        # Captured up front: a stream may finish in another task's context.
+        self.tags = dict(_call_tags.get())
+        self.started = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def mark_first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+
+    def fail(self, error: Any) -> None:
+        self.error = str(error or "empty response").strip()[:255]
+
+
+class LLMCallMetrics:
+    """Per-call token, latency and cost accounting for LLMService.
+
+    Records land in an in-memory ring buffer (recent-traffic stats) and a
+    pending queue that a background loop flushes in batches to
+    ``llm_call_events``. Both are bounded, so a stalled database drops the
+    oldest unflushed records instead of growing without limit.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.settings = get_settings()
+        self.session_factory = session_factory
+        size = max(1, int(self.settings.LLM_CALL_METRICS_BUFFER_SIZE))
+        self._recent: Deque[CallRecord] = deque(maxlen=size)
+        self._pending: Deque[CallRecord] = deque(maxlen=size)
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._prices: Optional[Dict[str, Dict[str, float]]] = None
+        self.recorded = 0
+        self.flushed = 0
+        self.flush_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.LLM_CALL_METRICS_ENABLED)
+
+    @property
+    def dropped(self) -> int:
+        return max(0, self.recorded - self.flushed - len(self._pending))
+
+    def _model_prices(self) -> Dict[str, Dict[str, float]]:
+        if self._prices is None:
+            try:
+                parsed = json.loads(self.settings.LLM_MODEL_PRICES_JSON or "{}")
+            except json.JSONDecodeError:
+                parsed = {}
+            self._prices = parsed if isinstance(parsed, dict) else {}
+        return self._prices
+
+    def estimate_cost(
+        self,
+        model_id: Optional[str],
+        prompt_tokens: Optional[int],
+        completion_tokens: Optional[int],
+    ) -> Optional[float]:
+        price = self._model_prices().get(model_id or "")
+        if not isinstance(price, dict) or (prompt_tokens is None and completion_tokens is None):
+            return None
+        cost = (prompt_tokens or 0) / 1000 * float(price.get("prompt", 0.0))
+        cost += (completion_tokens or 0) / 1000 * float(price.get("completion", 0.0))
+        return round(cost, 8)
+
+    def record(self, record: CallRecord) -> None:
+        if not self.enabled:
+            return
+        if record.cost_usd is None:
+            record.cost_usd = self.estimate_cost(record.model_id, record.prompt_tokens, record.completion_tokens)
+        self._recent.append(record)
+        self._pending.append(record)
+        self.recorded += 1
+
+    @asynccontextmanager
+    async def measure(
+        self,
+        operation: str,
+        *,
+        provider_id: Optional[int] = None,
+        provider_type: Optional[str] = None,
+        model_id: Optional[str] = None,
+    ) -> AsyncIterator[CallMeter]:
+        meter = CallMeter(operation, provider_id, provider_type, model_id)
+        token = _current_meter.set(meter)
+        status = "ok"
+        try:
+            yield meter
+        except (asyncio.CancelledError, GeneratorExit):
+            status = "cancelled"
+            raise
+        except Exception as exc:
+            meter.fail(exc)
+            raise
+        finally:
+            try:
+                _current_meter.reset(token)
+            except ValueError:
+                pass
+            if status == "ok" and meter.error is not None:
+                status = "error"
+            self.record(self._build_record(meter, status))
+
+    def _build_record(self, meter: CallMeter, status: str) -> CallRecord:
+        tags = meter.tags
+        finished = time.monotonic()
+        ttft = meter.first_token_at
+        return CallRecord(
+            operation=meter.operation,
+            lane=tags.get("lane"),
+            provider_id=meter.provider_id,
+            provider_type=meter.provider_type,
+            model_id=meter.model_id,
+            status=status,
+            error=meter.error,
+            fallback_reason=tags.get("fallback_reason"),
+            prompt_tokens=meter.prompt_tokens,
+            completion_tokens=meter.completion_tokens,
+            time_to_first_token_ms=int((ttft - meter.started) * 1000) if ttft is not None else None,
+            latency_ms=int((finished - meter.started) * 1000),
+        )
+
+    def record_cache_hit(self, operation: str, *, lane: str, provider_type: Optional[str], model_id: Optional[str]) -> None:
+        self.record(
+            CallRecord(
+                operation=operation,
+                lane=lane,
+                provider_id=None,
+                provider_type=provider_type,
+                model_id=model_id,
+                status="ok",
+                latency_ms=0,
+                cache_hit=True,
+                cost_usd=0.0,
+            )
+        )
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            written = 0
+            batch_size = max(1, int(self.settings.LLM_CALL_METRICS_FLUSH_BATCH_SIZE))
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(min(batch_size, len(self._pending)))]
+                try:
+                    async with self.session_factory() as db:
+                        db.add_all([LLMCallEvent(**asdict(record)) for record in batch])
+                        await db.commit()
+                except Exception:
+                    self.flush_errors += 1
+                    self._pending.extendleft(reversed(batch))
+                    break
+                written += len(batch)
+                self.flushed += len(batch)
+            return written
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(0.5, float(self.settings.LLM_CALL_METRICS_FLUSH_INTERVAL_SECONDS)))
+            await self.flush()
+
+    def start(self) -> None:
+        if self.enabled and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def load_events(self, since: datetime) -> List[LLMCallEvent]:
+        async with self.session_factory() as db:
+            result = await db.execute(select(LLMCallEvent).where(LLMCallEvent.created_at >= since))
+            return list(result.scalars().all())
+
+    async def summarize(self, hours: float = 24.0) -> Dict[str, Any]:
+        await self.flush()
+        since = datetime.utcnow() - timedelta(hours=hours)
+        events = await self.load_events(since)
+        return {
+            "since": since.isoformat(),
+            "buffer": self.stats(),
+            **summarize_call_events(events),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "recent": len(self._recent),
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flush_errors": self.flush_errors,
+        }
+
+    def recent(self) -> List[CallRecord]:
+        return list(self._recent)
+
+    def reset(self) -> None:
+        self._recent.clear()
+        self._pending.clear()
+        self._prices = None
+        self.recorded = 0
+        self.flushed = 0
+        self.flush_errors = 0
+
+
+def _summarize_group(events: List[Any]) -> Dict[str, Any]:
+    latencies = [event.latency_ms for event in events if not event.cache_hit]
+    ttfts = [event.time_to_first_token_ms for event in events if event.time_to_first_token_ms is not None]
+    prompt_tokens = sum(event.prompt_tokens or 0 for event in events)
+    completion_tokens = sum(event.completion_tokens or 0 for event in events)
+    costs = [event.cost_usd for event in events if event.cost_usd is not None]
+    return {
+        "calls": len(events),
+        "errors": sum(1 for event in events if event.status == "error"),
+        "cancelled": sum(1 for event in events if event.status == "cancelled"),
+        "cache_hits": sum(1 for event in events if event.cache_hit),
+        "fallbacks": sum(1 for event in events if event.fallback_reason),
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+        },
+        "time_to_first_token_ms": {
+            "p50": percentile(ttfts, 0.50),
+            "p95": percentile(ttfts, 0.95),
+        },
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "cost_usd": round(sum(costs), 6) if costs else None,
+    }
+
+
+def summarize_call_events(events: Iterable[Any]) -> Dict[str, Any]:
+    events = list(events)
+    by_lane: Dict[str, List[Any]] = {}
+    by_model: Dict[str, List[Any]] = {}
+    for event in events:
+        by_lane.setdefault(event.lane or "unassigned", []).append(event)
+        by_model.setdefault(f"{event.provider_type or ''}/{event.model_id or ''}", []).append(event)
+    return {
+        "total": _summarize_group(events),
+        "lanes": {lane: _summarize_group(items) for lane, items in sorted(by_lane.items())},
+        "models": {model: _summarize_group(items) for model, items in sorted(by_model.items())},
+    }
+
+
+llm_call_metrics = LLMCallMetrics()
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class RouteCircuitBreaker:
+    def __init__(self, route_key: str, registry: "CircuitBreakerRegistry"):
+        self.route_key = route_key
+        self.registry = registry
+        self.state = STATE_CLOSED
+        self.opened_at: Optional[float] = None
+        self.half_open_inflight = 0
+        self.total_calls = 0
+        self.total_failures = 0
+        self.short_circuited = 0
+        self._window: Deque[Tuple[float, bool, float]] = deque()
+
+    @property
+    def settings(self):
+        return self.registry.settings
+
+    def _trim(self, now: float) -> None:
+        horizon = now - self.settings.LLM_BREAKER_WINDOW_SECONDS
+        while self._window and self._window[0][0] < horizon:
+            self._window.popleft()
+
+    def _transition(self, new_state: str, reason: str) -> None:
+        if new_state == self.state:
+            return
+        self.registry.record_event(self.route_key, self.state, new_state, reason)
+        self.state = new_state
+        if new_state == STATE_OPEN:
+            self.opened_at = time.monotonic()
+            self.half_open_inflight = 0
+        elif new_state == STATE_CLOSED:
+            self.opened_at = None
+            self.half_open_inflight = 0
+            self._window.clear()
+
+    def allow_request(self) -> bool:
+        if self.state == STATE_OPEN:
+            elapsed = time.monotonic() - (self.opened_at or 0.0)
+            if elapsed < self.settings.LLM_BREAKER_OPEN_SECONDS:
+                self.short_circuited += 1
+                return False
+            self._transition(STATE_HALF_OPEN, "cool-down elapsed")
+
+        if self.state == STATE_HALF_OPEN:
+            if self.half_open_inflight >= self.settings.LLM_BREAKER_HALF_OPEN_PROBES:
+                self.short_circuited += 1
+                return False
+            self.half_open_inflight += 1
+        return True
+
+    def record(self, ok: bool, latency_seconds: float, reason: str = "") -> None:
+        now = time.monotonic()
+        slow = latency_seconds >= self.settings.LLM_BREAKER_SLOW_CALL_SECONDS
+        failed = (not ok) or slow
+        self.total_calls += 1
+        if failed:
+            self.total_failures += 1
+
+        if self.state == STATE_HALF_OPEN:
+            self.half_open_inflight = max(0, self.half_open_inflight - 1)
+            if failed:
+                self._transition(STATE_OPEN, f"probe failed: {reason or 'slow call'}")
+            else:
+                self._transition(STATE_CLOSED, "probe succeeded")
+            return
+
+        self._window.append((now, failed, latency_seconds))
+        self._trim(now)
+        if self.state != STATE_CLOSED:
+            return
+        calls = len(self._window)
+        if calls < self.settings.LLM_BREAKER_MIN_REQUESTS:
+            return
+        error_rate = sum(1 for _, item_failed, _ in self._window if item_failed) / calls
+        if error_rate >= self.settings.LLM_BREAKER_ERROR_RATE:
+            self._transition(
+                STATE_OPEN,
+                f"error rate {error_rate:.2f} over {calls} calls" + (f": {reason}" if reason else ""),
+            )
+
+    def latency_quantile(self, quantile: float, *, min_samples: int = 1) -> Optional[float]:
+        self._trim(time.monotonic())
+        latencies = sorted(latency for _, failed, latency in self._window if not failed)
+        if len(latencies) < max(1, min_samples):
+            return None
+        index = min(len(latencies) - 1, int(len(latencies) * quantile))
+        return latencies[index]
+
+    def release(self) -> None:
+        if self.state == STATE_HALF_OPEN:
+            self.half_open_inflight = max(0, self.half_open_inflight - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._trim(time.monotonic())
+        latencies = sorted(latency for _, _, latency in self._window)
+        calls = len(self._window)
+        failures = sum(1 for _, failed, _ in self._window if failed)
+        p95 = latencies[min(calls - 1, int(calls * 0.95))] if latencies else None
+        return {
+            "route": self.route_key,
+            "state": self.state,
+            "window_calls": calls,
+            "window_failures": failures,
+            "error_rate": round(failures / calls, 4) if calls else 0.0,
+            "avg_latency_ms": round(sum(latencies) / calls * 1000, 1) if calls else None,
+            "p95_latency_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "total_calls": self.total_calls,
+            "total_failures": self.total_failures,
+            "short_circuited": self.short_circuited,
+            "open_for_seconds": (
+                round(time.monotonic() - self.opened_at, 1) if self.opened_at is not None else None
+            ),
+        }
+
+
+class CircuitBreakerRegistry:
+    """Per-route circuit breakers for task lanes.
+
+    A route opens once its rolling error rate (slow calls count as errors)
+    crosses ``LLM_BREAKER_ERROR_RATE``; while open, callers skip straight to
+    the fallback route. After ``LLM_BREAKER_OPEN_SECONDS`` a limited number
+    of probe requests decide whether it closes again.
+    """
+
+    def __init__(self, max_events: int = 100):
+        self.settings = get_settings()
+        self._breakers: Dict[str, RouteCircuitBreaker] = {}
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.LLM_BREAKER_ENABLED)
+
+    def get(self, route_key: str) -> RouteCircuitBreaker:
+        breaker = self._breakers.get(route_key)
+        if breaker is None:
+            breaker = RouteCircuitBreaker(route_key, self)
+            self._breakers[route_key] = breaker
+        return breaker
+
+    def allow_request(self, route_key: str) -> bool:
+        if not self.enabled:
+            return True
+        return self.get(route_key).allow_request()
+
+    def record_success(self, route_key: str, latency_seconds: float) -> None:
+        if self.enabled:
+            self.get(route_key).record(True, latency_seconds)
+
+    def record_failure(self, route_key: str, latency_seconds: float, reason: str = "") -> None:
+        if self.enabled:
+            self.get(route_key).record(False, latency_seconds, reason)
+
+    def record_cancelled(self, route_key: str, latency_seconds: float) -> None:
+        if not self.enabled:
+            return
+        # A caller-side timeout on a slow call is evidence against the route;
+        # a quick cancellation (client went away) is not.
+        if latency_seconds >= self.settings.LLM_BREAKER_SLOW_CALL_SECONDS:
+            self.get(route_key).record(False, latency_seconds, "cancelled after slow call")
+        else:
+            self.get(route_key).release()
+
+    def release(self, route_key: str) -> None:
+        if self.enabled:
+            self.get(route_key).release()
+
+    def latency_quantile(self, route_key: str, quantile: float, *, min_samples: int = 1) -> Optional[float]:
+        breaker = self._breakers.get(route_key)
+        if breaker is None:
+            return None
+        return breaker.latency_quantile(quantile, min_samples=min_samples)
+
+    def is_open(self, route_key: str) -> bool:
+        breaker = self._breakers.get(route_key)
+        return breaker is not None and breaker.state == STATE_OPEN
+
+    def record_event(self, route_key: str, from_state: str, to_state: str, reason: str) -> None:
+        self._events.append(
+            {
+                "route": route_key,
+                "from_state": from_state,
+                "to_state": to_state,
+                "reason": reason,
+                "at": datetime.utcnow().isoformat(),
+            }
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "routes": [breaker.snapshot() for breaker in self._breakers.values()],
+            "events": list(self._events),
+        }
+
+    def reset(self) -> None:
+        self._breakers.clear()
+        self._events.clear()
+
+
+def describe_breaker_failure(result: Any) -> str:
+    return str(result or "empty response").strip()[:200]
+
+
+llm_circuit_breakers = CircuitBreakerRegistry()
+
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple
+
+import httpx
+import openai
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OLLAMA_BASE_URL = "http://localhost:11434"
+
+ClientKey = Tuple[str, Optional[int], str, str, str]
+
+
+@dataclass
+class _PooledClient:
+    client: Any
+    loop: asyncio.AbstractEventLoop
+
+
+class LLMClientPool:
+    """Provider-keyed registry of native async LLM clients.
+
+    Clients keep their httpx connection pool alive between calls so repeated
+    requests to the same provider reuse TLS sessions instead of reconnecting.
+    Entries are keyed on the provider row plus its credentials, so an admin
+    edit naturally produces a new client; ``invalidate`` closes the stale one.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._clients: Dict[ClientKey, _PooledClient] = {}
+        self._closing: Set[Any] = set()
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.settings.LLM_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=self.settings.LLM_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=self.settings.LLM_CLIENT_KEEPALIVE_EXPIRY_SECONDS,
+        )
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.settings.LLM_REQUEST_TIMEOUT_SECONDS, connect=5.0)
+
+    def _key(self, kind: str, provider, base_url: str) -> ClientKey:
+        return (
+            kind,
+            getattr(provider, "id", None),
+            getattr(provider, "provider_type", "") or "",
+            getattr(provider, "api_key", "") or "",
+            base_url,
+        )
+
+    def _get_or_create(self, key: ClientKey, factory) -> Any:
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(key)
+        if entry is not None and entry.loop is loop and not entry.loop.is_closed():
+            return entry.client
+        # Connection pools are bound to the loop that opened them; a client
+        # created on another (possibly closed) loop cannot be reused safely.
+        if entry is not None:
+            self._retire(entry)
+        client = factory()
+        self._clients[key] = _PooledClient(client=client, loop=loop)
+        return client
+
+    def get_openai_client(self, provider, base_url: Optional[str]):
+        resolved_base_url = base_url or ""
+        key = self._key("openai", provider, resolved_base_url)
+        return self._get_or_create(
+            key,
+            lambda: openai.AsyncOpenAI(
+                api_key=provider.api_key,
+                base_url=base_url or None,
+                http_client=openai.DefaultAsyncHttpxClient(
+                    limits=self._limits(),
+                    timeout=self._timeout(),
+                ),
+            ),
+        )
+
+    def get_anthropic_client(self, provider):
+        import anthropic
+
+        base_url = provider.base_url or ""
+        key = self._key("anthropic", provider, base_url)
+        return self._get_or_create(
+            key,
+            lambda: anthropic.AsyncAnthropic(
+                api_key=provider.api_key,
+                base_url=base_url or None,
+                http_client=anthropic.DefaultAsyncHttpxClient(
+                    limits=self._limits(),
+                    timeout=self._timeout(),
+                ),
+            ),
+        )
+
+    def get_ollama_client(self, provider) -> httpx.AsyncClient:
+        base_url = provider.base_url or DEFAULT_OLLAMA_BASE_URL
+        key = self._key("ollama", provider, base_url)
+        return self._get_or_create(
+            key,
+            lambda: httpx.AsyncClient(
+                base_url=base_url,
+                limits=self._limits(),
+                timeout=self._timeout(),
+            ),
+        )
+
+    def get_embedding_client(self, base_url: str, api_key: str, timeout_seconds: float) -> httpx.AsyncClient:
+        key = ("embedding", None, "", api_key or "", base_url)
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        return self._get_or_create(
+            key,
+            lambda: httpx.AsyncClient(
+                headers=headers,
+                limits=self._limits(),
+                timeout=httpx.Timeout(timeout_seconds, connect=5.0),
+            ),
+        )
+
+    @staticmethod
+    async def _close_client(client: Any) -> None:
+        close = getattr(client, "aclose", None) or getattr(client, "close", None)
+        if close is None:
+            return
+        try:
+            await close()
+        except Exception as exc:
+            logger.debug("Closing pooled LLM client failed: %s", exc)
+
+    def _retire(self, entry: _PooledClient) -> None:
+        """Close a replaced client without blocking the caller.
+
+        A loop still running elsewhere closes its own client; otherwise the
+        close runs on the current loop as a best effort, so the connection
+        pool is released instead of leaked.
+        """
+        loop = asyncio.get_running_loop()
+        if entry.loop is not loop and entry.loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._close_client(entry.client), entry.loop)
+            return
+        task = loop.create_task(self._close_client(entry.client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close_entry(self, entry: _PooledClient) -> None:
+        if entry.loop is asyncio.get_running_loop():
+            await self._close_client(entry.client)
+        else:
+            self._retire(entry)
+
+    async def invalidate(self, provider_id: Optional[int] = None) -> int:
+        """Drop pooled clients for one provider (or all when ``provider_id`` is None)."""
+        stale_keys = [
+            key for key in self._clients
+            if provider_id is None or key[1] == provider_id
+        ]
+        for key in stale_keys:
+            entry = self._clients.pop(key, None)
+            if entry is not None:
+                await self._close_entry(entry)
+        return len(stale_keys)
+
+    async def aclose(self) -> None:
+        await self.invalidate()
+        loop = asyncio.get_running_loop()
+        pending = [task for task in self._closing if task.get_loop() is loop]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self._clients),
+            "max_connections": self.settings.LLM_CLIENT_MAX_CONNECTIONS,
+            "max_keepalive_connections": self.settings.LLM_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+        }
+
+
+llm_client_pool = LLMClientPool()
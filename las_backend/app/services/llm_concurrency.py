@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.core.config import get_settings
+
+
+LANE_PRIORITIES = {
+    "interactive": 0,
+    "fallback": 1,
+    "structured_heavy": 2,
+}
+RATE_LIMIT_ERROR_PREFIX = "Error: rate limited by provider"
+
+# LLMService swallows provider exceptions and returns error strings (or None
+# for structured calls), so 429s are reported out-of-band to the slot that
+# owns the current call.
+_rate_limit_signals: ContextVar[Optional[List[float]]] = ContextVar("llm_rate_limit_signals", default=None)
+
+
+class ConcurrencyQueueTimeout(Exception):
+    """Raised when a call waited longer than ``LLM_CONCURRENCY_QUEUE_TIMEOUT_SECONDS`` for a slot."""
+
+
+def format_rate_limit_error(retry_after: Optional[float]) -> str:
+    if not retry_after:
+        return RATE_LIMIT_ERROR_PREFIX
+    return f"{RATE_LIMIT_ERROR_PREFIX} (retry after {retry_after:g}s)"
+
+
+def note_rate_limit(retry_after: Optional[float]) -> None:
+    signals = _rate_limit_signals.get()
+    if signals is not None:
+        signals.append(float(retry_after or 0.0))
+
+
+def extract_retry_after(exc: BaseException) -> Optional[float]:
+    """Read Retry-After from an SDK exception carrying an HTTP 429 response, if any."""
+    response = getattr(exc, "response", None)
+    status_code = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if status_code != 429:
+        return None
+    return retry_after_from_headers(getattr(response, "headers", None))
+
+
+def retry_after_from_headers(headers: Any) -> float:
+    raw = None
+    if headers is not None:
+        raw = headers.get("retry-after-ms")
+        if raw is not None:
+            try:
+                return max(0.0, float(raw) / 1000.0)
+            except (TypeError, ValueError):
+                pass
+        raw = headers.get("retry-after")
+    try:
+        return max(0.0, float(raw)) if raw is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class AdaptiveRouteLimiter:
+    """AIMD concurrency limit for one route with a lane-priority wait queue."""
+
+    def __init__(self, route_key: str, registry: "RouteConcurrencyRegistry"):
+        self.route_key = route_key
+        self.registry = registry
+        self.limit = float(registry.settings.LLM_CONCURRENCY_INITIAL_LIMIT)
+        self.inflight = 0
+        self.blocked_until = 0.0
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self._wake_handle: Optional[asyncio.TimerHandle] = None
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.lane_wait_seconds: Dict[str, float] = {}
+
+    @property
+    def settings(self):
+        return self.registry.settings
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for entry in self._waiters if not entry[2].done())
+
+    def _can_admit(self) -> bool:
+        return self.inflight < max(1, int(self.limit)) and time.monotonic() >= self.blocked_until
+
+    def _record_wait(self, lane: str, waited: float) -> None:
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.lane_wait_seconds[lane] = self.lane_wait_seconds.get(lane, 0.0) + waited
+
+    async def acquire(self, lane: str) -> None:
+        if self._can_admit() and not self.queue_depth:
+            self.inflight += 1
+            self.admitted += 1
+            return
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = [LANE_PRIORITIES.get(lane, 1), next(self._sequence), future]
+        heapq.heappush(self._waiters, entry)
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        self._schedule_wake()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, timeout=self.settings.LLM_CONCURRENCY_QUEUE_TIMEOUT_SECONDS)
+        except BaseException as exc:
+            if future.done() and not future.cancelled():
+                # Admitted at the same moment the caller gave up: hand the slot back.
+                self.inflight -= 1
+                self._wake()
+            self.rejected += 1
+            if isinstance(exc, asyncio.TimeoutError):
+                raise ConcurrencyQueueTimeout(f"concurrency queue timeout for route {self.route_key}") from None
+            raise
+        finally:
+            self._record_wait(lane, time.monotonic() - started)
+        self.admitted += 1
+
+    def release(self, *, succeeded: bool, retry_after: Optional[float] = None) -> None:
+        self.inflight = max(0, self.inflight - 1)
+        settings = self.settings
+        if retry_after is not None:
+            self.rate_limited += 1
+            self.limit = max(
+                float(settings.LLM_CONCURRENCY_MIN_LIMIT),
+                self.limit * settings.LLM_CONCURRENCY_DECREASE_FACTOR,
+            )
+            delay = retry_after or settings.LLM_CONCURRENCY_DEFAULT_RETRY_AFTER_SECONDS
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        elif succeeded:
+            self.limit = min(float(settings.LLM_CONCURRENCY_MAX_LIMIT), self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def _schedule_wake(self) -> None:
+        remaining = self.blocked_until - time.monotonic()
+        if remaining <= 0 or self._wake_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._wake_handle = loop.call_later(remaining, self._on_wake_timer)
+
+    def _on_wake_timer(self) -> None:
+        self._wake_handle = None
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._can_admit():
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.inflight += 1
+            future.set_result(None)
+        if self._waiters:
+            try:
+                self._schedule_wake()
+            except RuntimeError:
+                pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        waits = self.admitted + self.rejected
+        return {
+            "route": self.route_key,
+            "limit": round(self.limit, 2),
+            "inflight": self.inflight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "rate_limited": self.rate_limited,
+            "blocked_for_seconds": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+            "avg_wait_ms": round(self.total_wait_seconds / waits * 1000, 1) if waits else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+            "lane_wait_ms": {lane: round(value * 1000, 1) for lane, value in self.lane_wait_seconds.items()},
+        }
+
+
+class RouteConcurrencyRegistry:
+    """Adaptive per-route concurrency limits for upstream LLM calls.
+
+    Each route starts at ``LLM_CONCURRENCY_INITIAL_LIMIT`` concurrent calls,
+    grows additively on success and shrinks multiplicatively when the provider
+    answers 429, pausing admissions for the Retry-After interval. Waiting
+    callers are admitted interactive-lane first.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._limiters: Dict[str, AdaptiveRouteLimiter] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.LLM_CONCURRENCY_ENABLED)
+
+    def get(self, route_key: str) -> AdaptiveRouteLimiter:
+        limiter = self._limiters.get(route_key)
+        if limiter is None:
+            limiter = AdaptiveRouteLimiter(route_key, self)
+            self._limiters[route_key] = limiter
+        return limiter
+
+    @asynccontextmanager
+    async def slot(self, route_key: str, lane: str) -> AsyncIterator["_SlotOutcome"]:
+        outcome = _SlotOutcome()
+        if not self.enabled:
+            yield outcome
+            return
+        limiter = self.get(route_key)
+        await limiter.acquire(lane)
+        signals: List[float] = []
+        token = _rate_limit_signals.set(signals)
+        try:
+            yield outcome
+        finally:
+            try:
+                _rate_limit_signals.reset(token)
+            except ValueError:
+                # A stream closed from another task (hedging) ends its slot
+                # outside the context that opened it.
+                pass
+            limiter.release(
+                succeeded=outcome.succeeded and not signals,
+                retry_after=signals[-1] if signals else None,
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "routes": [limiter.snapshot() for limiter in self._limiters.values()],
+        }
+
+    def reset(self) -> None:
+        self._limiters.clear()
+
+
+class _SlotOutcome:
+    def __init__(self):
+        self.succeeded = False
+
+
+llm_concurrency = RouteConcurrencyRegistry()
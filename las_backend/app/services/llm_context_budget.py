@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import get_settings
+
+
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?。！？])\s*")
+SUMMARY_CACHE_MAX_ENTRIES = 1024
+OMITTED_MARKER = "[earlier turns omitted]"
+
+
+def _count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+@lru_cache(maxsize=8192)
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate: one token per CJK character, ~4 chars per token otherwise."""
+    return _count_tokens(text)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if _count_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + "…"
+
+
+@dataclass(frozen=True)
+class RetrievalSection:
+    text: str
+    score: float = 0.0
+
+
+class RetrievalContext(str):
+    """Retrieval block that still behaves as the joined string but keeps per-section scores."""
+
+    sections: Tuple[RetrievalSection, ...]
+
+    def __new__(cls, text: str, sections: Sequence[RetrievalSection] = ()):
+        value = super().__new__(cls, text)
+        value.sections = tuple(sections)
+        return value
+
+
+@dataclass
+class BuiltContext:
+    prompt: str
+    token_counts: Dict[str, int] = field(default_factory=dict)
+    recent_turns: int = 0
+    summarized_turns: int = 0
+    retrieval_sections: int = 0
+    dropped_retrieval_sections: int = 0
+
+
+class ContextBudgetBuilder:
+    """Builds the chat prompt for ``LLMService`` within a token budget.
+
+    The newest turns are kept verbatim, older turns are folded into an
+    extractive rolling summary (cached by a chained digest of the folded
+    turns, so each request only folds what is new), and retrieval sections
+    are admitted best-score first until their budget is spent.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._summaries: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self.builds = 0
+        self.summary_cache_hits = 0
+        self.totals: Dict[str, int] = {}
+        self.max_prompt_tokens = 0
+
+    def _summarize_turn(self, message: Dict[str, Any]) -> str:
+        content = " ".join(str(message.get("content", "") or "").split())
+        first_sentence = _SENTENCE_END_RE.split(content, maxsplit=1)[0] if content else ""
+        line_budget = max(8, int(self.settings.LLM_CONTEXT_SUMMARY_LINE_TOKENS))
+        return f"{message.get('role', 'user')}: {truncate_to_tokens(first_sentence or content, line_budget)}"
+
+    def _rolling_summary(self, older: List[Dict[str, Any]]) -> Tuple[str, ...]:
+        digests: List[str] = []
+        digest = ""
+        for message in older:
+            digest = hashlib.sha1(
+                f"{digest}\x1f{message.get('role', 'user')}\x1f{message.get('content', '')}".encode("utf-8")
+            ).hexdigest()
+            digests.append(digest)
+
+        start = 0
+        lines: Tuple[str, ...] = ()
+        for index in range(len(digests) - 1, -1, -1):
+            cached = self._summaries.get(digests[index])
+            if cached is not None:
+                self._summaries.move_to_end(digests[index])
+                self.summary_cache_hits += 1
+                start, lines = index + 1, cached
+                break
+
+        summary_budget = max(0, int(self.settings.LLM_CONTEXT_SUMMARY_MAX_TOKENS))
+        for index in range(start, len(older)):
+            omitted = bool(lines) and lines[0] == OMITTED_MARKER
+            body = [line for line in lines if line != OMITTED_MARKER]
+            body.append(self._summarize_turn(older[index]))
+            while len(body) > 1 and _count_tokens("\n".join([OMITTED_MARKER, *body])) > summary_budget:
+                body.pop(0)
+                omitted = True
+            lines = ((OMITTED_MARKER,) if omitted else ()) + tuple(body)
+            self._summaries[digests[index]] = lines
+            self._summaries.move_to_end(digests[index])
+        while len(self._summaries) > SUMMARY_CACHE_MAX_ENTRIES:
+            self._summaries.popitem(last=False)
+        return lines
+
+    def _select_retrieval(self, retrieval_context: Optional[str], budget: int) -> Tuple[List[str], int]:
+        if not retrieval_context:
+            return [], 0
+        sections = list(getattr(retrieval_context, "sections", ()) or ())
+        if not sections:
+            # Plain strings keep their given order as the ranking.
+            parts = [part for part in str(retrieval_context).split("\n\n") if part.strip()]
+            sections = [RetrievalSection(text=part, score=-index) for index, part in enumerate(parts)]
+
+        ranked = sorted(enumerate(sections), key=lambda item: item[1].score, reverse=True)
+        chosen: List[Tuple[int, str]] = []
+        used = 0
+        for position, section in ranked:
+            cost = estimate_tokens(section.text)
+            if used + cost > budget:
+                continue
+            chosen.append((position, section.text))
+            used += cost
+        chosen.sort()
+        return [text for _, text in chosen], len(sections) - len(chosen)
+
+    def build(
+        self,
+        prompt: str,
+        context: List[Dict[str, Any]],
+        retrieval_context: Optional[str] = None,
+        *,
+        language_instruction: str = "",
+    ) -> BuiltContext:
+        settings = self.settings
+        turns = [message for message in (context or []) if isinstance(message, dict)]
+        if turns and turns[-1].get("role", "user") == "user" and turns[-1].get("content") == prompt:
+            # The current question is repeated below; do not pay for it twice.
+            turns = turns[:-1]
+
+        fixed_tokens = estimate_tokens(prompt) + estimate_tokens(language_instruction)
+        budget = max(0, int(settings.LLM_CONTEXT_MAX_TOKENS) - fixed_tokens)
+        retrieval_budget = min(budget, max(0, int(settings.LLM_CONTEXT_RETRIEVAL_MAX_TOKENS)))
+        retrieval_sections, dropped_sections = self._select_retrieval(retrieval_context, retrieval_budget)
+        retrieval_text = "\n\n".join(retrieval_sections)
+        retrieval_tokens = estimate_tokens(retrieval_text)
+        history_budget = max(0, budget - retrieval_tokens)
+
+        recent_limit = max(0, int(settings.LLM_CONTEXT_RECENT_TURNS))
+        recent: List[str] = []
+        recent_tokens = 0
+        split = len(turns)
+        for message in reversed(turns[-recent_limit:] if recent_limit else []):
+            line = f"{message.get('role', 'user')}: {message.get('content', '')}"
+            cost = estimate_tokens(line)
+            if recent and recent_tokens + cost > history_budget:
+                break
+            if not recent and cost > history_budget:
+                if history_budget <= 0:
+                    break
+                line = truncate_to_tokens(line, history_budget)
+                cost = estimate_tokens(line)
+            recent.insert(0, line)
+            recent_tokens += cost
+            split -= 1
+
+        summary_lines = self._rolling_summary(turns[:split]) if split else ()
+        summary_text = "\n".join(summary_lines)
+        summary_budget = max(0, history_budget - recent_tokens)
+        if estimate_tokens(summary_text) > summary_budget:
+            summary_text = truncate_to_tokens(summary_text, summary_budget) if summary_budget else ""
+        summary_tokens = estimate_tokens(summary_text)
+
+        context_parts = []
+        if summary_text:
+            context_parts.append(f"Earlier conversation (summary):\n{summary_text}")
+        context_parts.extend(recent)
+        context_str = "\n".join(context_parts)
+        retrieval_block = f"\nRelevant knowledge:\n{retrieval_text}\n" if retrieval_text else ""
+        full_prompt = f"""Context:
+{context_str}
+{retrieval_block}
+
+Current question: {prompt}
+
+{language_instruction}"""
+
+        built = BuiltContext(
+            prompt=full_prompt,
+            token_counts={
+                "summary": summary_tokens,
+                "recent_turns": recent_tokens,
+                "retrieval": retrieval_tokens,
+                "question": estimate_tokens(prompt),
+                "instructions": estimate_tokens(language_instruction),
+                "total": estimate_tokens(full_prompt),
+            },
+            recent_turns=len(recent),
+            summarized_turns=split,
+            retrieval_sections=len(retrieval_sections),
+            dropped_retrieval_sections=dropped_sections,
+        )
+        self._observe(built)
+        return built
+
+    def _observe(self, built: BuiltContext) -> None:
+        self.builds += 1
+        for name, tokens in built.token_counts.items():
+            self.totals[name] = self.totals.get(name, 0) + tokens
+        self.max_prompt_tokens = max(self.max_prompt_tokens, built.token_counts["total"])
+
+    def stats(self) -> Dict[str, Any]:
+        settings = self.settings
+        return {
+            "budget": {
+                "max_tokens": settings.LLM_CONTEXT_MAX_TOKENS,
+                "recent_turns": settings.LLM_CONTEXT_RECENT_TURNS,
+                "retrieval_max_tokens": settings.LLM_CONTEXT_RETRIEVAL_MAX_TOKENS,
+                "summary_max_tokens": settings.LLM_CONTEXT_SUMMARY_MAX_TOKENS,
+            },
+            "builds": self.builds,
+            "avg_tokens": {
+                name: round(total / self.builds, 1) for name, total in self.totals.items()
+            } if self.builds else {},
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "summary_cache_entries": len(self._summaries),
+            "summary_cache_hits": self.summary_cache_hits,
+        }
+
+    def reset(self) -> None:
+        self._summaries.clear()
+        self.builds = 0
+        self.summary_cache_hits = 0
+        self.totals.clear()
+        self.max_prompt_tokens = 0
+
+
+llm_context_budget = ContextBudgetBuilder()
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.llm_circuit_breaker import CircuitBreakerRegistry, llm_circuit_breakers
+
+
+class HedgingPolicy:
+    """Opt-in hedged requests for latency-sensitive lanes.
+
+    If the primary route has not answered (or produced a first token) within
+    a delay derived from its recent p90 latency, the fallback route is started
+    in parallel and the first usable answer wins; the loser is cancelled.
+    """
+
+    def __init__(self, breakers: CircuitBreakerRegistry):
+        self.settings = get_settings()
+        self.breakers = breakers
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _enabled_lanes(self) -> set[str]:
+        return {
+            item.strip()
+            for item in str(self.settings.LLM_HEDGE_LANES or "").split(",")
+            if item.strip()
+        }
+
+    def enabled_for(self, lane: str) -> bool:
+        return lane in self._enabled_lanes()
+
+    def delay_for(self, route_key: str) -> float:
+        observed = self.breakers.latency_quantile(
+            route_key,
+            self.settings.LLM_HEDGE_LATENCY_QUANTILE,
+            min_samples=self.settings.LLM_HEDGE_MIN_SAMPLES,
+        )
+        delay = observed if observed is not None else self.settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(float(self.settings.LLM_HEDGE_MIN_DELAY_SECONDS), float(delay))
+
+    def _count(self, lane: str, name: str) -> None:
+        counters = self._counters.setdefault(lane, {"requests": 0, "fired": 0, "won": 0})
+        counters[name] += 1
+
+    async def run(
+        self,
+        lane: str,
+        delay: float,
+        primary: Callable[[], Awaitable[Any]],
+        hedge: Callable[[], Awaitable[Any]],
+        is_good: Callable[[Any], bool],
+    ) -> Any:
+        self._count(lane, "requests")
+        primary_task = asyncio.ensure_future(primary())
+        tasks = {primary_task}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                result = primary_task.result()
+                if is_good(result):
+                    return result
+                # The primary failed fast: behave like a plain sequential fallback.
+                hedge_result = await hedge()
+                return hedge_result if is_good(hedge_result) else result
+
+            self._count(lane, "fired")
+            hedge_task = asyncio.ensure_future(hedge())
+            tasks.add(hedge_task)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and is_good(task.result()):
+                        if task is hedge_task:
+                            self._count(lane, "won")
+                        return task.result()
+            return primary_task.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    try:
+                        await task
+                    except (Exception, asyncio.CancelledError):
+                        pass
+
+    async def stream(
+        self,
+        lane: str,
+        delay: float,
+        primary: Callable[[], AsyncIterator[str]],
+        hedge: Callable[[], AsyncIterator[str]],
+        is_good: Callable[[str], bool],
+    ) -> AsyncIterator[str]:
+        self._count(lane, "requests")
+        primary_iter = primary().__aiter__()
+        contenders: Dict[asyncio.Future, Tuple[str, AsyncIterator[str]]] = {
+            asyncio.ensure_future(primary_iter.__anext__()): ("primary", primary_iter),
+        }
+        winner: Optional[AsyncIterator[str]] = None
+        first_token: Optional[str] = None
+        fallback_token: Optional[Tuple[str, AsyncIterator[str]]] = None
+        try:
+            done, _ = await asyncio.wait(set(contenders), timeout=delay)
+            if not done:
+                self._count(lane, "fired")
+                hedge_iter = hedge().__aiter__()
+                contenders[asyncio.ensure_future(hedge_iter.__anext__())] = ("hedge", hedge_iter)
+
+            pending = set(contenders)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name, iterator = contenders[task]
+                    if task.exception() is not None:
+                        continue
+                    token = task.result()
+                    if is_good(token):
+                        winner, first_token = iterator, token
+                        if name == "hedge":
+                            self._count(lane, "won")
+                        break
+                    if fallback_token is None:
+                        fallback_token = (token, iterator)
+        finally:
+            kept = winner if winner is not None else (fallback_token[1] if fallback_token else None)
+            for task, (_, iterator) in contenders.items():
+                if iterator is kept:
+                    continue
+                if not task.done():
+                    task.cancel()
+                    try:
+                        await task
+                    except (Exception, asyncio.CancelledError):
+                        pass
+                await _aclose_quietly(iterator)
+
+        if winner is None:
+            if fallback_token is None:
+                return
+            winner, first_token = fallback_token[1], fallback_token[0]
+
+        yield first_token
+        async for token in winner:
+            yield token
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled_lanes": sorted(self._enabled_lanes()),
+            "lanes": {lane: dict(counters) for lane, counters in self._counters.items()},
+        }
+
+    def reset(self) -> None:
+        self._counters.clear()
+
+
+async def _aclose_quietly(iterator: AsyncIterator[str]) -> None:
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is None:
+        return
+    try:
+        await aclose()
+    except (Exception, asyncio.CancelledError):
+        pass
+
+
+llm_hedging = HedgingPolicy(llm_circuit_breakers)
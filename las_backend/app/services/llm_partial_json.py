@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class StructuredPartial(NamedTuple):
+    """One step of a structured stream; ``complete`` once the document has closed."""
+
+    value: Any
+    complete: bool
+
+
+class PartialJSONParser:
+    """Incrementally parses a streamed JSON document.
+
+    ``feed`` scans only the new text and remembers the last position where
+    the document could be cut and closed into valid JSON. Arrays only ever
+    contain fully received elements; an object nested in an object may be
+    returned with the keys received so far. Leading prose or a Markdown fence
+    before the first bracket is ignored.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._length = 0
+        self._started = False
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._safe: Optional[Tuple[int, Tuple[str, ...]]] = None
+        self._parsed_safe: Optional[Tuple[int, Tuple[str, ...]]] = None
+        self._value: Any = None
+        self.complete = False
+
+    def _inside_array_element(self) -> bool:
+        return "[" in self._stack[:-1]
+
+    def feed(self, chunk: str) -> bool:
+        """Consume ``chunk``; return True when a larger prefix became parseable."""
+        if self.complete or not chunk:
+            return False
+        if not self._started:
+            starts = [index for index in (chunk.find("{"), chunk.find("[")) if index >= 0]
+            if not starts:
+                return False
+            chunk = chunk[min(starts):]
+            self._started = True
+
+        offset = self._length
+        self._buffer.append(chunk)
+        self._length += len(chunk)
+        for index, char in enumerate(chunk, start=offset):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._stack.append(char)
+                # An empty container is only useful where it does not stand
+                # in for a half-received array element.
+                if not self._inside_array_element():
+                    self._safe = (index + 1, tuple(self._stack))
+            elif char in "}]":
+                if not self._stack:
+                    break
+                self._stack.pop()
+                if not self._stack:
+                    self._safe = (index + 1, ())
+                    self.complete = True
+                    break
+                if not self._inside_array_element():
+                    self._safe = (index + 1, tuple(self._stack))
+            elif char == "," and self._stack and not self._inside_array_element():
+                self._safe = (index, tuple(self._stack))
+        return self._refresh()
+
+    def _refresh(self) -> bool:
+        if self._safe is None or self._safe == self._parsed_safe:
+            return False
+        cut, open_containers = self._safe
+        text = "".join(self._buffer)
+        self._buffer = [text]
+        candidate = text[:cut].rstrip().rstrip(",")
+        candidate += "".join(_CLOSERS[item] for item in reversed(open_containers))
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError:
+            return False
+        self._parsed_safe = self._safe
+        self._value = value
+        return True
+
+    @property
+    def value(self) -> Any:
+        return self._value
+
+
+def parse_partial_json(text: str) -> Optional[Any]:
+    """Parse the longest complete prefix of a (possibly truncated) JSON document."""
+    parser = PartialJSONParser()
+    parser.feed(text or "")
+    return parser.value
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Protocol, Tuple
+
+from sqlalchemy import delete, func, select
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.models.entities.llm_provider import LLMResponseCacheEntry
+
+
+RESPONSE_CACHE_BACKENDS = {"memory", "database", "none"}
+DATABASE_PRUNE_EVERY_WRITES = 50
+
+
+class ResponseCacheBackend(Protocol):
+    name: str
+
+    async def get(self, key: str) -> Optional[Any]: ...
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        *,
+        ttl_seconds: float,
+        route_key: str,
+        schema_name: str,
+    ) -> None: ...
+
+    async def clear(self) -> None: ...
+
+    async def size(self) -> int: ...
+
+
+class InMemoryResponseCacheBackend:
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        *,
+        ttl_seconds: float,
+        route_key: str,
+        schema_name: str,
+    ) -> None:
+        self._entries[key] = (time.monotonic() + ttl_seconds, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+
+class DatabaseResponseCacheBackend:
+    """Stores cached payloads in ``llm_response_cache`` so all workers share them."""
+
+    name = "database"
+
+    def __init__(self, max_entries: int, session_factory=AsyncSessionLocal):
+        self.max_entries = max(1, int(max_entries))
+        self.session_factory = session_factory
+        self._writes = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        async with self.session_factory() as db:
+            entry = await db.get(LLMResponseCacheEntry, key)
+            if entry is None:
+                return None
+            now = datetime.utcnow()
+            if entry.expires_at <= now:
+                await db.delete(entry)
+                await db.commit()
+                return None
+            entry.last_accessed_at = now
+            entry.hit_count = (entry.hit_count or 0) + 1
+            payload = entry.payload
+            await db.commit()
+            return payload
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        *,
+        ttl_seconds: float,
+        route_key: str,
+        schema_name: str,
+    ) -> None:
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            entry = await db.get(LLMResponseCacheEntry, key)
+            if entry is None:
+                entry = LLMResponseCacheEntry(cache_key=key, hit_count=0, created_at=now)
+                db.add(entry)
+            entry.route_key = route_key[:255]
+            entry.schema_name = schema_name[:100]
+            entry.payload = value
+            entry.last_accessed_at = now
+            entry.expires_at = now + timedelta(seconds=ttl_seconds)
+            await db.commit()
+
+            self._writes += 1
+            if self._writes % DATABASE_PRUNE_EVERY_WRITES == 0:
+                await self._prune(db, now)
+
+    async def _prune(self, db, now: datetime) -> None:
+        await db.execute(delete(LLMResponseCacheEntry).where(LLMResponseCacheEntry.expires_at <= now))
+        total = (await db.execute(select(func.count()).select_from(LLMResponseCacheEntry))).scalar_one()
+        overflow = int(total) - self.max_entries
+        if overflow > 0:
+            oldest_keys = (
+                select(LLMResponseCacheEntry.cache_key)
+                .order_by(LLMResponseCacheEntry.last_accessed_at.asc())
+                .limit(overflow)
+            )
+            await db.execute(
+                delete(LLMResponseCacheEntry).where(LLMResponseCacheEntry.cache_key.in_(oldest_keys))
+            )
+        await db.commit()
+
+    async def clear(self) -> None:
+        async with self.session_factory() as db:
+            await db.execute(delete(LLMResponseCacheEntry))
+            await db.commit()
+
+    async def size(self) -> int:
+        async with self.session_factory() as db:
+            total = await db.execute(select(func.count()).select_from(LLMResponseCacheEntry))
+            return int(total.scalar_one())
+
+
+class LLMResponseCache:
+    """Content-addressed cache for deterministic (temperature 0) structured calls."""
+
+    def __init__(self, backend: Optional[ResponseCacheBackend] = None):
+        self.settings = get_settings()
+        self._backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @property
+    def backend(self) -> Optional[ResponseCacheBackend]:
+        if self._backend is None:
+            self._backend = self._build_backend()
+        return self._backend
+
+    def _build_backend(self) -> Optional[ResponseCacheBackend]:
+        backend_name = str(self.settings.LLM_RESPONSE_CACHE_BACKEND or "none").strip().lower()
+        if backend_name not in RESPONSE_CACHE_BACKENDS:
+            raise ValueError(f"Unsupported LLM_RESPONSE_CACHE_BACKEND: {backend_name}")
+        if backend_name == "memory":
+            return InMemoryResponseCacheBackend(self.settings.LLM_RESPONSE_CACHE_MAX_ENTRIES)
+        if backend_name == "database":
+            return DatabaseResponseCacheBackend(self.settings.LLM_RESPONSE_CACHE_MAX_ENTRIES)
+        return None
+
+    def configure(self, backend: Optional[ResponseCacheBackend]) -> None:
+        self._backend = backend
+
+    @staticmethod
+    def build_key(route_key: str, schema_name: str, prompt: str, json_schema: Dict[str, Any]) -> str:
+        digest = hashlib.sha256()
+        for part in (
+            route_key,
+            schema_name,
+            json.dumps(json_schema, sort_keys=True, ensure_ascii=False),
+            prompt,
+        ):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x1f")
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[Any]:
+        backend = self.backend
+        if backend is None:
+            return None
+        try:
+            value = await backend.get(key)
+        except Exception:
+            self.errors += 1
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, *, route_key: str, schema_name: str) -> None:
+        backend = self.backend
+        if backend is None or value is None:
+            return
+        ttl_seconds = float(self.settings.LLM_RESPONSE_CACHE_TTL_SECONDS)
+        if ttl_seconds <= 0:
+            return
+        try:
+            await backend.set(
+                key,
+                value,
+                ttl_seconds=ttl_seconds,
+                route_key=route_key,
+                schema_name=schema_name,
+            )
+            self.stores += 1
+        except Exception:
+            self.errors += 1
+
+    async def clear(self) -> None:
+        if self.backend is not None:
+            await self.backend.clear()
+
+    async def stats(self) -> Dict[str, Any]:
+        backend = self.backend
+        lookups = self.hits + self.misses
+        entries = 0
+        if backend is not None:
+            try:
+                entries = await backend.size()
+            except Exception:
+                entries = 0
+        return {
+            "backend": backend.name if backend is not None else "none",
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "errors": self.errors,
+            "ttl_seconds": float(self.settings.LLM_RESPONSE_CACHE_TTL_SECONDS),
+            "max_entries": self.settings.LLM_RESPONSE_CACHE_MAX_ENTRIES,
+        }
+
+
+llm_response_cache = LLMResponseCache()
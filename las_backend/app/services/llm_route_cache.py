@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.core.config import get_settings
+
+
+_MISSING = object()
+
+
+class LLMRouteCache:
+    """Versioned, TTL-bounded cache for resolved LLM routes and provider rows.
+
+    Admin writes call ``invalidate`` which bumps the version; a resolution that
+    started under an older version is never stored, so a slow query racing an
+    admin edit cannot re-populate stale config. The TTL bounds staleness for
+    writes made by other workers or directly in the database.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self._ttl_seconds = ttl_seconds
+        self._entries: Dict[Hashable, Tuple[float, int, Any]] = {}
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def ttl_seconds(self) -> float:
+        if self._ttl_seconds is not None:
+            return float(self._ttl_seconds)
+        return float(get_settings().LLM_ROUTE_CACHE_TTL_SECONDS)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, version, value = entry
+            if version == self._version and expires_at > time.monotonic():
+                self.hits += 1
+                return value
+            self._entries.pop(key, None)
+        self.misses += 1
+        return _MISSING
+
+    def set(self, key: Hashable, value: Any, version: int) -> None:
+        ttl_seconds = self.ttl_seconds
+        if ttl_seconds <= 0 or version != self._version:
+            return
+        self._entries[key] = (time.monotonic() + ttl_seconds, version, value)
+
+    def invalidate(self) -> int:
+        self._version += 1
+        self.invalidations += 1
+        self._entries.clear()
+        return self._version
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "version": self._version,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+def is_cache_miss(value: Any) -> bool:
+    return value is _MISSING
+
+
+llm_route_cache = LLMRouteCache()
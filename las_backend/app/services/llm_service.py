@@ -1,14 +1,25 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import json
 from typing import Optional, List, Dict, Any, AsyncGenerator
-import openai
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import get_settings
 from app.core.database import AsyncSessionLocal
 from app.models.entities.llm_provider import LLMProvider, LLMModel
+from app.services.llm_call_metrics import CallMeter, llm_call_metrics, note_usage
+from app.services.llm_client_pool import llm_client_pool
+from app.services.llm_context_budget import llm_context_budget
+from app.services.llm_partial_json import PartialJSONParser, StructuredPartial
+from app.services.llm_concurrency import (
+    extract_retry_after,
+    format_rate_limit_error,
+    note_rate_limit,
+    retry_after_from_headers,
+)
+from app.services.llm_route_cache import is_cache_miss, llm_route_cache
 
 OPENAI_COMPATIBLE_PROVIDERS = {"openai", "qwen"}
 DEFAULT_BASE_URLS = {
@@ -19,6 +30,9 @@ DEFAULT_BASE_URLS = {
 class LLMService:
     def __init__(self):
         self.settings = get_settings()
+        self.clients = llm_client_pool
+        self.metrics = llm_call_metrics
+        self.route_cache = llm_route_cache
     
     async def _get_db(self):
         async with AsyncSessionLocal() as session:
@@ -79,33 +93,59 @@ class LLMService:
             "ollama": "llama2",
         }
         return provider, resolved_model_id or fallbacks.get(provider.provider_type, "gpt-4o-mini")
-    
-    async def generate(
+
+    async def _resolve_provider_and_model_cached(
         self,
-        prompt: str,
         provider_type: Optional[str] = None,
         provider_id: Optional[int] = None,
         model_id: Optional[str] = None,
-        **kwargs
-    ) -> str:
+    ) -> tuple[Optional[LLMProvider], str]:
+        cache_key = ("provider", provider_type, provider_id, model_id)
+        cached = self.route_cache.get(cache_key)
+        if not is_cache_miss(cached):
+            return cached
+
+        version = self.route_cache.version
         async with AsyncSessionLocal() as db:
-            provider, resolved_model = await self._resolve_provider_and_model(
+            resolved = await self._resolve_provider_and_model(
                 db,
                 provider_type=provider_type,
                 provider_id=provider_id,
                 model_id=model_id,
             )
-            if not provider:
-                return "Error: No active LLM provider configured"
-
-            if provider.provider_type in OPENAI_COMPATIBLE_PROVIDERS:
-                return await self._generate_openai_compatible(prompt, provider, resolved_model)
-            elif provider.provider_type == "anthropic":
-                return await self._generate_anthropic(prompt, provider, resolved_model)
-            elif provider.provider_type == "ollama":
-                return await self._generate_ollama(prompt, provider, resolved_model)
-            else:
-                return f"Error: Unsupported provider type: {provider.provider_type}"
+        self.route_cache.set(cache_key, resolved, version)
+        return resolved
+    
+    async def generate(
+        self,
+        prompt: str,
+        provider_type: Optional[str] = None,
+        provider_id: Optional[int] = None,
+        model_id: Optional[str] = None,
+        **kwargs
+    ) -> str:
+        provider, resolved_model = await self._resolve_provider_and_model_cached(
+            provider_type=provider_type,
+            provider_id=provider_id,
+            model_id=model_id,
+        )
+        if not provider:
+            return "Error: No active LLM provider configured"
+
+        if provider.provider_type in OPENAI_COMPATIBLE_PROVIDERS:
+            generate = self._generate_openai_compatible
+        elif provider.provider_type == "anthropic":
+            generate = self._generate_anthropic
+        elif provider.provider_type == "ollama":
+            generate = self._generate_ollama
+        else:
+            return f"Error: Unsupported provider type: {provider.provider_type}"
+
+        async with self._measure("generate", provider, resolved_model) as meter:
+            result = await generate(prompt, provider, resolved_model)
+            if not result or str(result).startswith("Error"):
+                meter.fail(result)
+            return result
 
     async def generate_structured_json(
         self,
@@ -117,47 +157,74 @@ class LLMService:
         provider_id: Optional[int] = None,
         model_id: Optional[str] = None,
     ) -> Optional[Dict[str, Any] | List[Any]]:
-        async with AsyncSessionLocal() as db:
-            provider, resolved_model = await self._resolve_provider_and_model(
-                db,
-                provider_type=provider_type,
-                provider_id=provider_id,
-                model_id=model_id,
-            )
-            if not provider:
-                return None
+        provider, resolved_model = await self._resolve_provider_and_model_cached(
+            provider_type=provider_type,
+            provider_id=provider_id,
+            model_id=model_id,
+        )
+        if not provider:
+            return None
 
-            if provider.provider_type not in OPENAI_COMPATIBLE_PROVIDERS:
-                return None
+        if provider.provider_type not in OPENAI_COMPATIBLE_PROVIDERS:
+            return None
 
-            return await self._generate_openai_compatible_structured(
+        async with self._measure("generate_structured", provider, resolved_model) as meter:
+            structured = await self._generate_openai_compatible_structured(
                 prompt=prompt,
                 provider=provider,
                 model=resolved_model,
                 json_schema=json_schema,
                 schema_name=schema_name,
             )
+            if structured is None:
+                meter.fail("no structured result")
+            return structured
     
+    def _measure(self, operation: str, provider: LLMProvider, model: str):
+        return self.metrics.measure(
+            operation,
+            provider_id=provider.id,
+            provider_type=provider.provider_type,
+            model_id=model,
+        )
+
+    @staticmethod
+    def _note_openai_usage(response: Any, meter: Optional[CallMeter] = None) -> None:
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            note_usage(getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None), meter)
+
+    @staticmethod
+    def _note_anthropic_usage(response: Any, meter: Optional[CallMeter] = None) -> None:
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            note_usage(getattr(usage, "input_tokens", None), getattr(usage, "output_tokens", None), meter)
+
+    def _openai_base_url(self, provider: LLMProvider) -> Optional[str]:
+        return provider.base_url or DEFAULT_BASE_URLS.get(provider.provider_type) or None
+
+    def _rate_limit_error(self, exc: Exception) -> Optional[str]:
+        retry_after = extract_retry_after(exc)
+        if retry_after is None:
+            return None
+        note_rate_limit(retry_after)
+        return format_rate_limit_error(retry_after)
+
     async def _generate_openai_compatible(self, prompt: str, provider: LLMProvider, model: str) -> str:
         try:
-            def _call() -> str:
-                client = openai.OpenAI(
-                    api_key=provider.api_key,
-                    base_url=provider.base_url or DEFAULT_BASE_URLS.get(provider.provider_type) or None,
-                )
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.7,
-                    timeout=self.settings.LLM_REQUEST_TIMEOUT_SECONDS,
-                )
-                return response.choices[0].message.content
-
-            return await asyncio.to_thread(_call)
+            client = self.clients.get_openai_client(provider, self._openai_base_url(provider))
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.7,
+                timeout=self.settings.LLM_REQUEST_TIMEOUT_SECONDS,
+            )
+            self._note_openai_usage(response)
+            return response.choices[0].message.content
         except asyncio.CancelledError:
             raise
         except Exception as e:
-            return f"Error generating response: {str(e)}"
+            return self._rate_limit_error(e) or f"Error generating response: {str(e)}"
 
     async def _generate_openai_compatible_structured(
         self,
@@ -169,79 +236,70 @@ class LLMService:
         schema_name: str,
     ) -> Optional[Dict[str, Any] | List[Any]]:
         try:
-            def _call() -> Optional[Dict[str, Any] | List[Any]]:
-                client = openai.OpenAI(
-                    api_key=provider.api_key,
-                    base_url=provider.base_url or DEFAULT_BASE_URLS.get(provider.provider_type) or None,
-                )
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0,
-                    response_format={
-                        "type": "json_schema",
-                        "json_schema": {
-                            "name": schema_name,
-                            "schema": json_schema,
-                            "strict": True,
-                        },
+            client = self.clients.get_openai_client(provider, self._openai_base_url(provider))
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0,
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": schema_name,
+                        "schema": json_schema,
+                        "strict": True,
                     },
-                    timeout=self.settings.LLM_REQUEST_TIMEOUT_SECONDS,
-                )
-                message = response.choices[0].message if response.choices else None
-                content = getattr(message, "content", None) if message else None
-                if not content:
-                    return None
-                return json.loads(content)
-
-            return await asyncio.to_thread(_call)
+                },
+                timeout=self.settings.LLM_REQUEST_TIMEOUT_SECONDS,
+            )
+            self._note_openai_usage(response)
+            message = response.choices[0].message if response.choices else None
+            content = getattr(message, "content", None) if message else None
+            if not content:
+                return None
+            return json.loads(content)
         except asyncio.CancelledError:
             raise
-        except Exception:
+        except Exception as e:
+            self._rate_limit_error(e)
             return None
     
     async def _generate_anthropic(self, prompt: str, provider: LLMProvider, model: str) -> str:
         try:
-            def _call() -> str:
-                from anthropic import Anthropic
-
-                client = Anthropic(
-                    api_key=provider.api_key,
-                    base_url=provider.base_url or None
-                )
-                response = client.messages.create(
-                    model=model,
-                    max_tokens=2048,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                return response.content[0].text
-
-            return await asyncio.to_thread(_call)
+            client = self.clients.get_anthropic_client(provider)
+            response = await client.messages.create(
+                model=model,
+                max_tokens=2048,
+                messages=[{"role": "user", "content": prompt}],
+                timeout=self.settings.LLM_REQUEST_TIMEOUT_SECONDS,
+            )
+            self._note_anthropic_usage(response)
+            return response.content[0].text
         except asyncio.CancelledError:
             raise
         except Exception as e:
-            return f"Error generating response: {str(e)}"
+            return self._rate_limit_error(e) or f"Error generating response: {str(e)}"
     
     async def _generate_ollama(self, prompt: str, provider: LLMProvider, model: str) -> str:
         try:
-            def _call() -> str:
-                import httpx
-
-                base_url = provider.base_url or "http://localhost:11434"
-                response = httpx.post(
-                    f"{base_url}/api/generate",
-                    json={"model": model, "prompt": prompt, "stream": False},
-                    timeout=self.settings.LLM_REQUEST_TIMEOUT_SECONDS,
-                )
-                if response.status_code == 200:
-                    return response.json().get("response", "No response")
-                return f"Error: {response.status_code}"
-
-            return await asyncio.to_thread(_call)
+            client = self.clients.get_ollama_client(provider)
+            response = await client.post(
+                "/api/generate",
+                json={"model": model, "prompt": prompt, "stream": False},
+                timeout=self.settings.LLM_REQUEST_TIMEOUT_SECONDS,
+            )
+            if response.status_code == 200:
+                payload = response.json()
+                note_usage(payload.get("prompt_eval_count"), payload.get("eval_count"))
+                return payload.get("response", "No response")
+            if response.status_code == 429:
+                retry_after = retry_after_from_headers(response.headers)
+                note_rate_limit(retry_after)
+                return format_rate_limit_error(retry_after)
+            return f"Error: {response.status_code}"
         except asyncio.CancelledError:
             raise
         except Exception as e:
-            return f"Error generating response: {str(e)}"
+            return self._rate_limit_error(e) or f"Error generating response: {str(e)}"
     
     async def stream_generate(
         self,
@@ -252,25 +310,94 @@ class LLMService:
         model_id: str | None = None,
         temperature: float = 0.7,
     ) -> AsyncGenerator[str, None]:
-        async with AsyncSessionLocal() as db:
-            provider, resolved_model = await self._resolve_provider_and_model(
-                db,
-                provider_type=provider_type,
-                provider_id=provider_id,
-                model_id=model_id,
+        provider, resolved_model = await self._resolve_provider_and_model_cached(
+            provider_type=provider_type,
+            provider_id=provider_id,
+            model_id=model_id,
+        )
+        if not provider:
+            yield "Error: No active LLM provider configured"
+            return
+
+        if provider.provider_type in OPENAI_COMPATIBLE_PROVIDERS:
+            stream = self._stream_openai_compatible
+        elif provider.provider_type == "anthropic":
+            stream = self._stream_anthropic
+        elif provider.provider_type == "ollama":
+            stream = self._stream_ollama
+        else:
+            yield f"Error: Streaming not supported for provider: {provider.provider_type}"
+            return
+
+        async with self._measure("stream", provider, resolved_model) as meter:
+            async for token in stream(messages, system_prompt, provider, resolved_model, temperature, meter=meter):
+                if meter.first_token_at is None and token.startswith("Error: "):
+                    meter.fail(token)
+                meter.mark_first_token()
+                yield token
+
+    async def stream_structured_json(
+        self,
+        prompt: str,
+        json_schema: Dict[str, Any],
+        *,
+        schema_name: str = "structured_response",
+        provider_type: Optional[str] = None,
+        provider_id: Optional[int] = None,
+        model_id: Optional[str] = None,
+    ) -> AsyncGenerator[StructuredPartial, None]:
+        """Yield progressively larger parses of a structured response.
+
+        Each item holds the document received so far, closed into valid JSON
+        with only fully received array elements. Only the item carrying the
+        full payload is marked ``complete``; a stream that stops early never
+        yields one. Nothing is yielded if the provider errors before any JSON
+        arrives.
+        """
+        provider, resolved_model = await self._resolve_provider_and_model_cached(
+            provider_type=provider_type,
+            provider_id=provider_id,
+            model_id=model_id,
+        )
+        if not provider:
+            return
+
+        messages = [{"role": "user", "content": prompt}]
+        if provider.provider_type in OPENAI_COMPATIBLE_PROVIDERS:
+            stream = functools.partial(
+                self._stream_openai_compatible,
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {"name": schema_name, "schema": json_schema, "strict": True},
+                },
             )
-            if not provider:
-                yield "Error: No active LLM provider configured"
-                return
-
-            if provider.provider_type in OPENAI_COMPATIBLE_PROVIDERS:
-                async for token in self._stream_openai_compatible(messages, system_prompt, provider, resolved_model, temperature):
-                    yield token
-            elif provider.provider_type == "anthropic":
-                async for token in self._stream_anthropic(messages, system_prompt, provider, resolved_model, temperature):
-                    yield token
-            else:
-                yield f"Error: Streaming not supported for provider: {provider.provider_type}"
+        elif provider.provider_type == "anthropic":
+            stream = self._stream_anthropic
+        elif provider.provider_type == "ollama":
+            stream = functools.partial(self._stream_ollama, response_format=json_schema)
+        else:
+            return
+
+        parser = PartialJSONParser()
+        last_yielded: Any = None
+        async with self._measure("stream_structured", provider, resolved_model) as meter:
+            chunks = stream(messages, "", provider, resolved_model, 0, meter=meter)
+            try:
+                async for chunk in chunks:
+                    if chunk.startswith("Error: "):
+                        meter.fail(chunk)
+                        return
+                    meter.mark_first_token()
+                    grew = parser.feed(chunk)
+                    if parser.complete or (grew and parser.value != last_yielded):
+                        last_yielded = parser.value
+                        yield StructuredPartial(parser.value, parser.complete)
+                    if parser.complete:
+                        break
+            finally:
+                await chunks.aclose()
+            if not parser.complete:
+                meter.fail("incomplete structured stream")
 
     async def _stream_openai_compatible(
         self,
@@ -279,30 +406,35 @@ class LLMService:
         provider,
         model: str,
         temperature: float,
+        response_format: Optional[Dict[str, Any]] = None,
+        meter: Optional[CallMeter] = None,
     ) -> AsyncGenerator[str, None]:
         try:
-            client = openai.AsyncOpenAI(
-                api_key=provider.api_key,
-                base_url=provider.base_url or DEFAULT_BASE_URLS.get(provider.provider_type) or None,
-            )
+            client = self.clients.get_openai_client(provider, self._openai_base_url(provider))
             all_messages = []
             if system_prompt:
                 all_messages.append({"role": "system", "content": system_prompt})
             all_messages.extend(messages)
 
+            kwargs: dict = {"stream_options": {"include_usage": True}}
+            if response_format is not None:
+                kwargs["response_format"] = response_format
             stream = await client.chat.completions.create(
                 model=model,
                 messages=all_messages,
                 temperature=temperature,
                 stream=True,
                 timeout=self.settings.LLM_REQUEST_TIMEOUT_SECONDS,
+                **kwargs,
             )
             async for chunk in stream:
+                # With include_usage the final chunk carries usage and no choices.
+                self._note_openai_usage(chunk, meter)
                 content = chunk.choices[0].delta.content if chunk.choices else None
                 if content is not None:
                     yield content
         except Exception as e:
-            yield f"Error: {str(e)}"
+            yield self._rate_limit_error(e) or f"Error: {str(e)}"
 
     async def _stream_anthropic(
         self,
@@ -311,13 +443,10 @@ class LLMService:
         provider,
         model: str,
         temperature: float,
+        meter: Optional[CallMeter] = None,
     ) -> AsyncGenerator[str, None]:
         try:
-            from anthropic import AsyncAnthropic
-            client = AsyncAnthropic(
-                api_key=provider.api_key,
-                base_url=provider.base_url or None,
-            )
+            client = self.clients.get_anthropic_client(provider)
             kwargs: dict = {
                 "model": model,
                 "max_tokens": 2048,
@@ -330,8 +459,67 @@ class LLMService:
             async with client.messages.stream(**kwargs) as stream:
                 async for text in stream.text_stream:
                     yield text
+                self._note_anthropic_usage(await stream.get_final_message(), meter)
+        except Exception as e:
+            yield self._rate_limit_error(e) or f"Error: {str(e)}"
+
+    async def _stream_ollama(
+        self,
+        messages: list[dict],
+        system_prompt: str,
+        provider,
+        model: str,
+        temperature: float,
+        response_format: Optional[Dict[str, Any]] = None,
+        meter: Optional[CallMeter] = None,
+    ) -> AsyncGenerator[str, None]:
+        try:
+            client = self.clients.get_ollama_client(provider)
+            all_messages = []
+            if system_prompt:
+                all_messages.append({"role": "system", "content": system_prompt})
+            all_messages.extend(messages)
+
+            payload: dict = {
+                "model": model,
+                "messages": all_messages,
+                "stream": True,
+                "options": {"temperature": temperature},
+            }
+            if response_format is not None:
+                payload["format"] = response_format
+            async with client.stream(
+                "POST",
+                "/api/chat",
+                json=payload,
+                timeout=self.settings.LLM_REQUEST_TIMEOUT_SECONDS,
+            ) as response:
+                if response.status_code == 429:
+                    retry_after = retry_after_from_headers(response.headers)
+                    note_rate_limit(retry_after)
+                    yield format_rate_limit_error(retry_after)
+                    return
+                if response.status_code != 200:
+                    yield f"Error: {response.status_code}"
+                    return
+                # Ollama streams one JSON object per line.
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        yield f"Error: {chunk['error']}"
+                        return
+                    content = (chunk.get("message") or {}).get("content")
+                    if content:
+                        yield content
+                    if chunk.get("done"):
+                        note_usage(chunk.get("prompt_eval_count"), chunk.get("eval_count"), meter)
+                        return
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            yield f"Error: {str(e)}"
+            yield self._rate_limit_error(e) or f"Error: {str(e)}"
 
     def _build_context_prompt(
         self,
@@ -339,25 +527,18 @@ class LLMService:
         context: List[Dict[str, Any]],
         retrieval_context: Optional[str] = None,
     ) -> str:
-        context_str = "\n".join([
-            f"{msg.get('role', 'user')}: {msg.get('content', '')}"
-            for msg in context
-        ])
-        retrieval_block = f"\nRelevant knowledge:\n{retrieval_context}\n" if retrieval_context else ""
         language_instruction = (
             "Language requirement: Use the current question as the source of truth for language. "
             "Respond in the same language as the current question. "
             "If the current question contains Chinese, respond in Simplified Chinese. "
             "If the current question does not contain Chinese, do not respond in Chinese even if other context does."
         )
-
-        return f"""Context:
-{context_str}
-{retrieval_block}
-
-Current question: {prompt}
-
-{language_instruction}"""
+        return llm_context_budget.build(
+            prompt,
+            context,
+            retrieval_context,
+            language_instruction=language_instruction,
+        ).prompt
 
     async def generate_with_context(
         self,
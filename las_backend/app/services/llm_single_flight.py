@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+def build_flight_key(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamFlight:
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def pump(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for token in source:
+                self.tokens.append(token)
+                self.notify()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self.done = True
+            self.notify()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        index = 0
+        self.subscribers += 1
+        try:
+            while True:
+                if index < len(self.tokens):
+                    token = self.tokens[index]
+                    index += 1
+                    yield token
+                    continue
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                changed = self._changed
+                await changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and self.task is not None and not self.task.done():
+                self.task.cancel()
+
+
+class SingleFlight:
+    """Coalesces identical in-flight LLM calls onto one upstream request.
+
+    Concurrent callers with the same key await the same task; streamed calls
+    share one upstream stream, with late subscribers replaying the tokens
+    emitted so far. The upstream work is cancelled only once every waiter has
+    gone away, so one client timing out does not fail the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._streams: Dict[Hashable, _StreamFlight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._inflight.get(key)
+        is_leader = flight is None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _task: self._forget(self._inflight, key, flight))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+        return result if is_leader or isinstance(result, str) else copy.deepcopy(result)
+
+    async def stream(
+        self,
+        key: Hashable,
+        factory: Callable[[], AsyncIterator[str]],
+    ) -> AsyncIterator[str]:
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _StreamFlight()
+            self._streams[key] = flight
+            flight.task = asyncio.ensure_future(flight.pump(factory()))
+            flight.task.add_done_callback(lambda _task: self._forget(self._streams, key, flight))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        async for token in flight.subscribe():
+            yield token
+
+    @staticmethod
+    def _forget(registry: Dict[Hashable, Any], key: Hashable, flight: Any) -> None:
+        if registry.get(key) is flight:
+            registry.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "inflight": len(self._inflight),
+            "inflight_streams": len(self._streams),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+
+llm_single_flight = SingleFlight()
@@ -0,0 +1,458 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Protocol
+
+from sqlalchemy import case, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.models.entities.user import LoginThrottle
+
+
+logger = logging.getLogger(__name__)
+
+LOGIN_THROTTLE_BACKENDS = {"database", "memory", "none"}
+# Rows written by other workers may carry an updated_at slightly before the
+# last sync; re-reading this overlap is cheap and idempotent.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+@dataclass
+class ThrottleState:
+    scope_key: str
+    username: Optional[str]
+    client_ip: Optional[str]
+    failed_count: int
+    window_started_at: datetime
+    blocked_until: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+@dataclass
+class ThrottleChange:
+    """Unflushed local changes to one key: an optional clear, then failures.
+
+    ``cleared_at`` is when the clear happened; it only erases state written
+    before then, so failures another worker recorded after it survive.
+    """
+
+    scope_key: str
+    username: Optional[str] = None
+    client_ip: Optional[str] = None
+    failed_delta: int = 0
+    window_started_at: Optional[datetime] = None
+    blocked_until: Optional[datetime] = None
+    cleared_at: Optional[datetime] = None
+
+
+def _later(left: Optional[datetime], right: Optional[datetime]) -> Optional[datetime]:
+    return max(filter(None, [left, right]), default=None)
+
+
+def apply_change(
+    state: Optional[ThrottleState],
+    change: ThrottleChange,
+    *,
+    now: datetime,
+    window_seconds: float,
+    attempts: int,
+    block_seconds: float,
+) -> ThrottleState:
+    """Apply a worker's change on top of the shared state of its key.
+
+    A clear resets state written before it to an empty tombstone; failures
+    are added to the shared count while its window is live and start a new
+    window otherwise, so every worker counts into the same window.
+    """
+    if state is None or (
+        change.cleared_at is not None and (state.updated_at is None or state.updated_at <= change.cleared_at)
+    ):
+        state = ThrottleState(change.scope_key, change.username, change.client_ip, 0, change.cleared_at or now)
+    else:
+        state = replace(state)
+    if change.failed_delta:
+        if state.window_started_at < now - timedelta(seconds=window_seconds):
+            state.failed_count = 0
+            state.window_started_at = change.window_started_at or now
+        state.failed_count += change.failed_delta
+        state.username = change.username
+        state.client_ip = change.client_ip
+        state.blocked_until = _later(state.blocked_until, change.blocked_until)
+        if state.failed_count >= attempts and (state.blocked_until is None or state.blocked_until <= now):
+            state.blocked_until = now + timedelta(seconds=block_seconds)
+    state.updated_at = now
+    return state
+
+
+def _retention(settings) -> timedelta:
+    # Tombstones must outlive every worker's sync overlap; keys untouched for
+    # a whole window and block carry no state worth keeping.
+    return SYNC_OVERLAP + timedelta(
+        seconds=max(settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS, settings.LOGIN_RATE_LIMIT_BLOCK_SECONDS)
+    )
+
+
+def merge_changes(older: ThrottleChange, newer: ThrottleChange) -> ThrottleChange:
+    """Fold two unflushed changes to one key; a later clear discards what came before it."""
+    if newer.cleared_at is not None:
+        return newer
+    return replace(
+        newer,
+        failed_delta=older.failed_delta + newer.failed_delta,
+        window_started_at=older.window_started_at or newer.window_started_at,
+        blocked_until=_later(older.blocked_until, newer.blocked_until),
+        cleared_at=older.cleared_at,
+    )
+
+
+class ThrottleBackend(Protocol):
+    name: str
+
+    async def load_since(self, since: Optional[datetime]) -> List[ThrottleState]: ...
+
+    async def write(self, changes: List[ThrottleChange]) -> None: ...
+
+
+class InMemoryThrottleBackend:
+    """Process-local backend for single-worker setups and tests; it does not share state between workers."""
+
+    name = "memory"
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._states: Dict[str, ThrottleState] = {}
+
+    async def load_since(self, since: Optional[datetime]) -> List[ThrottleState]:
+        return [
+            replace(state)
+            for state in self._states.values()
+            if since is None or (state.updated_at is not None and state.updated_at >= since)
+        ]
+
+    async def write(self, changes: List[ThrottleChange]) -> None:
+        now = datetime.utcnow()
+        for change in changes:
+            self._states[change.scope_key] = apply_change(
+                self._states.get(change.scope_key),
+                change,
+                now=now,
+                window_seconds=self.settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+                attempts=self.settings.LOGIN_RATE_LIMIT_ATTEMPTS,
+                block_seconds=self.settings.LOGIN_RATE_LIMIT_BLOCK_SECONDS,
+            )
+        horizon = now - _retention(self.settings)
+        for key in [key for key, state in self._states.items() if state.updated_at < horizon]:
+            del self._states[key]
+
+
+class DatabaseThrottleBackend:
+    """Shares throttle state between workers through ``login_throttles``.
+
+    Counts are applied as deltas in single UPDATE statements, so concurrent
+    workers never overwrite each other's failures.
+    """
+
+    name = "database"
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.settings = get_settings()
+        self.session_factory = session_factory
+
+    @staticmethod
+    def _to_state(row: LoginThrottle) -> ThrottleState:
+        return ThrottleState(
+            scope_key=row.scope_key,
+            username=row.username,
+            client_ip=row.client_ip,
+            failed_count=row.failed_count,
+            window_started_at=row.window_started_at,
+            blocked_until=row.blocked_until,
+            updated_at=row.updated_at,
+        )
+
+    async def load_since(self, since: Optional[datetime]) -> List[ThrottleState]:
+        statement = select(LoginThrottle)
+        if since is not None:
+            statement = statement.where(LoginThrottle.updated_at >= since)
+        async with self.session_factory() as db:
+            return [self._to_state(row) for row in (await db.execute(statement)).scalars().all()]
+
+    async def _clear(self, db, change: ThrottleChange, now: datetime) -> None:
+        await db.execute(
+            update(LoginThrottle)
+            .where(LoginThrottle.scope_key == change.scope_key, LoginThrottle.updated_at <= change.cleared_at)
+            .values(failed_count=0, window_started_at=change.cleared_at, blocked_until=None, updated_at=now)
+        )
+
+    async def _add_failures(self, db, change: ThrottleChange, now: datetime) -> None:
+        live = LoginThrottle.window_started_at >= now - timedelta(
+            seconds=self.settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+        )
+        window_started_at = change.window_started_at or now
+        result = await db.execute(
+            update(LoginThrottle)
+            .where(LoginThrottle.scope_key == change.scope_key)
+            .values(
+                username=change.username,
+                client_ip=change.client_ip,
+                failed_count=case(
+                    (live, LoginThrottle.failed_count + change.failed_delta), else_=change.failed_delta
+                ),
+                window_started_at=case((live, LoginThrottle.window_started_at), else_=window_started_at),
+                updated_at=now,
+            )
+        )
+        if result.rowcount == 0:
+            try:
+                async with db.begin_nested():
+                    db.add(
+                        LoginThrottle(
+                            scope_key=change.scope_key,
+                            username=change.username,
+                            client_ip=change.client_ip,
+                            failed_count=change.failed_delta,
+                            window_started_at=window_started_at,
+                            updated_at=now,
+                        )
+                    )
+            except IntegrityError:
+                # Another worker inserted the key first; add to its row.
+                await self._add_failures(db, change, now)
+                return
+
+        # The combined count may cross the limit although no single worker did.
+        blocked_until = change.blocked_until
+        if blocked_until is None or blocked_until <= now:
+            blocked_until = now + timedelta(seconds=self.settings.LOGIN_RATE_LIMIT_BLOCK_SECONDS)
+        await db.execute(
+            update(LoginThrottle)
+            .where(
+                LoginThrottle.scope_key == change.scope_key,
+                LoginThrottle.failed_count >= self.settings.LOGIN_RATE_LIMIT_ATTEMPTS,
+                or_(LoginThrottle.blocked_until.is_(None), LoginThrottle.blocked_until < blocked_until),
+            )
+            .values(blocked_until=blocked_until)
+        )
+
+    async def write(self, changes: List[ThrottleChange]) -> None:
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            for change in changes:
+                if change.cleared_at is not None:
+                    await self._clear(db, change, now)
+                if change.failed_delta:
+                    await self._add_failures(db, change, now)
+            await db.execute(delete(LoginThrottle).where(LoginThrottle.updated_at < now - _retention(self.settings)))
+            await db.commit()
+
+
+class LoginThrottleService:
+    """Per-key failed-login counting with ``LOGIN_RATE_LIMIT_*`` semantics.
+
+    Counts live in process memory, which is authoritative for the login hot
+    path: checking and counting never touch the database. A background loop
+    writes each key's new failures behind as a delta and each clear as a
+    tombstone, then pulls the keys every worker changed since the last sync,
+    so counts add up across workers and a block or clear raised anywhere
+    reaches every worker within ``LOGIN_THROTTLE_SYNC_INTERVAL_SECONDS``.
+    """
+
+    def __init__(self, backend: Optional[ThrottleBackend] = None):
+        self.settings = get_settings()
+        self._backend = backend
+        self._backend_built = backend is not None
+        self._states: "OrderedDict[str, ThrottleState]" = OrderedDict()
+        self._dirty: Dict[str, ThrottleChange] = {}
+        self._synced_until: Optional[datetime] = None
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.blocked = 0
+        self.flush_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return (
+            self.settings.LOGIN_RATE_LIMIT_ATTEMPTS > 0
+            and self.settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS > 0
+            and self.settings.LOGIN_RATE_LIMIT_BLOCK_SECONDS > 0
+        )
+
+    @property
+    def backend(self) -> Optional[ThrottleBackend]:
+        if not self._backend_built:
+            self._backend = self._build_backend()
+            self._backend_built = True
+        return self._backend
+
+    def _build_backend(self) -> Optional[ThrottleBackend]:
+        backend_name = str(self.settings.LOGIN_THROTTLE_BACKEND or "none").strip().lower()
+        if backend_name not in LOGIN_THROTTLE_BACKENDS:
+            raise ValueError(f"Unsupported LOGIN_THROTTLE_BACKEND: {backend_name}")
+        if backend_name == "database":
+            return DatabaseThrottleBackend()
+        if backend_name == "memory":
+            return InMemoryThrottleBackend()
+        return None
+
+    def configure(self, backend: Optional[ThrottleBackend]) -> None:
+        self._backend = backend
+        self._backend_built = True
+
+    def _store(self, state: ThrottleState) -> None:
+        self._states[state.scope_key] = state
+        self._states.move_to_end(state.scope_key)
+        while len(self._states) > max(1, int(self.settings.LOGIN_THROTTLE_MAX_KEYS)):
+            self._states.popitem(last=False)
+
+    def _queue(self, change: ThrottleChange) -> None:
+        pending = self._dirty.get(change.scope_key)
+        self._dirty[change.scope_key] = change if pending is None else merge_changes(pending, change)
+
+    def is_blocked(self, keys: Iterable[str], now: Optional[datetime] = None) -> bool:
+        now = now or datetime.utcnow()
+        for key in keys:
+            state = self._states.get(key)
+            if state is not None and state.blocked_until is not None and state.blocked_until > now:
+                self.blocked += 1
+                return True
+        return False
+
+    def register_failure(
+        self,
+        keys: Iterable[str],
+        *,
+        username: Optional[str],
+        client_ip: Optional[str],
+        now: Optional[datetime] = None,
+    ) -> None:
+        now = now or datetime.utcnow()
+        window_start = now - timedelta(seconds=self.settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS)
+        for key in keys:
+            state = self._states.get(key)
+            if state is None or state.window_started_at < window_start:
+                state = ThrottleState(key, username, client_ip, 0, now)
+                pending = self._dirty.get(key)
+                if pending is not None:
+                    # Failures still queued from the expired window no longer count.
+                    if pending.cleared_at is None:
+                        del self._dirty[key]
+                    else:
+                        self._dirty[key] = ThrottleChange(key, cleared_at=pending.cleared_at)
+            state.username = username
+            state.client_ip = client_ip
+            state.failed_count += 1
+            state.updated_at = now
+            if state.failed_count >= self.settings.LOGIN_RATE_LIMIT_ATTEMPTS:
+                state.blocked_until = now + timedelta(seconds=self.settings.LOGIN_RATE_LIMIT_BLOCK_SECONDS)
+            self._store(state)
+            self._queue(
+                ThrottleChange(key, username, client_ip, 1, state.window_started_at, state.blocked_until)
+            )
+
+    def clear(self, keys: Iterable[str]) -> None:
+        now = datetime.utcnow()
+        for key in keys:
+            if self._states.pop(key, None) is not None or self.backend is not None:
+                self._queue(ThrottleChange(key, cleared_at=now))
+
+    def _prune(self, now: datetime) -> None:
+        window_start = now - timedelta(seconds=self.settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS)
+        expired = [
+            key
+            for key, state in self._states.items()
+            if state.window_started_at < window_start and (state.blocked_until is None or state.blocked_until <= now)
+        ]
+        for key in expired:
+            del self._states[key]
+
+    def _adopt(self, state: ThrottleState, now: datetime) -> None:
+        change = self._dirty.get(state.scope_key)
+        if change is not None:
+            # Failures or clears that arrived during the sync stay on top.
+            state = apply_change(
+                state,
+                change,
+                now=now,
+                window_seconds=self.settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+                attempts=self.settings.LOGIN_RATE_LIMIT_ATTEMPTS,
+                block_seconds=self.settings.LOGIN_RATE_LIMIT_BLOCK_SECONDS,
+            )
+        if state.failed_count == 0 and state.blocked_until is None:
+            self._states.pop(state.scope_key, None)
+        else:
+            self._store(state)
+
+    async def flush(self) -> int:
+        """Write changed keys behind and pull keys other workers changed."""
+        async with self._flush_lock:
+            backend = self.backend
+            if backend is None:
+                self._dirty.clear()
+                return 0
+            now = datetime.utcnow()
+            pending, self._dirty = self._dirty, {}
+            try:
+                await backend.write(list(pending.values()))
+            except Exception:
+                self.flush_errors += 1
+                logger.exception("Login throttle write-behind failed")
+                newer, self._dirty = self._dirty, pending
+                for change in newer.values():
+                    self._queue(change)
+                return 0
+            try:
+                since = self._synced_until - SYNC_OVERLAP if self._synced_until is not None else None
+                remote = await backend.load_since(since)
+            except Exception:
+                self.flush_errors += 1
+                logger.exception("Login throttle sync failed")
+                return len(pending)
+            for state in remote:
+                self._adopt(state, datetime.utcnow())
+            self._synced_until = now
+            self._prune(now)
+            return len(pending)
+
+    async def _run_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(0.1, float(self.settings.LOGIN_THROTTLE_SYNC_INTERVAL_SECONDS)))
+            await self.flush()
+
+    def start(self) -> None:
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name if self.backend is not None else None,
+            "keys": len(self._states),
+            "pending_writes": len(self._dirty),
+            "blocked": self.blocked,
+            "flush_errors": self.flush_errors,
+        }
+
+    def reset(self) -> None:
+        self._states.clear()
+        self._dirty.clear()
+        self._synced_until = None
+        self.blocked = 0
+        self.flush_errors = 0
+
+
+login_throttle = LoginThrottleService()
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import hashlib
-from typing import Any, Callable, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
 from app.core.vector import cosine_similarity
 
+if TYPE_CHECKING:
+    from app.services.model_os_vector_scoring import VectorizedScorer
+
 
 TokenizeFn = Callable[[str], List[str]]
 GenerateEmbeddingFn = Callable[[str], List[float]]
@@ -190,18 +193,88 @@ def _rank_items(items: List[Any], scored_items: List[tuple[float, Any]]) -> List
     return [item for _, item in scored_items]
 
 
+def _rank_vectorized(
+    items: List[Any],
+    texts: List[str],
+    query: str,
+    query_embedding: List[float],
+    scorer: "VectorizedScorer",
+    generate_embedding_fn: GenerateEmbeddingFn,
+) -> List[Any]:
+    scores = scorer.score(
+        texts,
+        [item.embedding for item in items],
+        query,
+        query_embedding,
+        generate_embedding_fn,
+    )
+    scored_items = [(score, item) for score, item in zip(scores, items) if score >= 0.15]
+    return _rank_items(items, scored_items)
+
+
+def _rank_with_lexical_scores(
+    items: List[Any],
+    texts: List[str],
+    lexical_scores: Dict[str, float],
+    query_embedding: List[float],
+    *,
+    generate_embedding_fn: GenerateEmbeddingFn,
+    scorer: Optional["VectorizedScorer"],
+) -> List[Any]:
+    if scorer is not None:
+        semantic_scores = scorer.semantic(
+            texts,
+            [item.embedding for item in items],
+            query_embedding,
+            generate_embedding_fn,
+        ).tolist()
+    else:
+        semantic_scores = [
+            cosine_similarity(item.embedding or generate_embedding_fn(text), query_embedding)
+            for item, text in zip(items, texts)
+        ]
+    scored_items = []
+    for item, semantic_score in zip(items, semantic_scores):
+        score = (lexical_scores.get(str(item.id), 0.0) * 0.7) + (max(semantic_score, 0.0) * 0.3)
+        if score >= 0.15:
+            scored_items.append((score, item))
+    return _rank_items(items, scored_items)
+
+
 def rank_model_cards(
     cards: List[Any],
     query: str,
     *,
     tokenize_text: TokenizeFn,
     generate_embedding_fn: GenerateEmbeddingFn,
+    scorer: Optional["VectorizedScorer"] = None,
+    lexical_scores: Optional[Dict[str, float]] = None,
 ) -> List[Any]:
     query = query.strip()
     if not query:
         return cards
 
     query_embedding = generate_embedding_fn(query)
+    if scorer is not None or lexical_scores is not None:
+        texts = [
+            build_embedding_text(
+                title=card.title,
+                user_notes=card.user_notes,
+                examples=card.examples,
+                counter_examples=card.counter_examples,
+            )
+            for card in cards
+        ]
+        if lexical_scores is not None:
+            return _rank_with_lexical_scores(
+                cards,
+                texts,
+                lexical_scores,
+                query_embedding,
+                generate_embedding_fn=generate_embedding_fn,
+                scorer=scorer,
+            )
+        return _rank_vectorized(cards, texts, query, query_embedding, scorer, generate_embedding_fn)
     scored_cards = []
     for card in cards:
         score = score_model_card(
@@ -222,12 +295,33 @@ def rank_problems(
     *,
     tokenize_text: TokenizeFn,
     generate_embedding_fn: GenerateEmbeddingFn,
+    scorer: Optional["VectorizedScorer"] = None,
+    lexical_scores: Optional[Dict[str, float]] = None,
 ) -> List[Any]:
     query = query.strip()
     if not query:
         return problems
 
     query_embedding = generate_embedding_fn(query)
+    if scorer is not None or lexical_scores is not None:
+        texts = [
+            build_problem_embedding_text(
+                title=problem.title,
+                description=problem.description,
+                associated_concepts=problem.associated_concepts,
+            )
+            for problem in problems
+        ]
+        if lexical_scores is not None:
+            return _rank_with_lexical_scores(
+                problems,
+                texts,
+                lexical_scores,
+                query_embedding,
+                generate_embedding_fn=generate_embedding_fn,
+                scorer=scorer,
+            )
+        return _rank_vectorized(problems, texts, query, query_embedding, scorer, generate_embedding_fn)
     scored_problems = []
     for problem in problems:
         score = score_problem(
@@ -248,12 +342,35 @@ def rank_resources(
     *,
     tokenize_text: TokenizeFn,
     generate_embedding_fn: GenerateEmbeddingFn,
+    scorer: Optional["VectorizedScorer"] = None,
+    lexical_scores: Optional[Dict[str, float]] = None,
 ) -> List[Any]:
     query = query.strip()
     if not query:
         return resources
 
     query_embedding = generate_embedding_fn(query)
+    if scorer is not None or lexical_scores is not None:
+        texts = [
+            build_resource_embedding_text(
+                title=resource.title,
+                url=resource.url,
+                link_type=resource.link_type,
+                ai_summary=resource.ai_summary,
+                status=resource.status,
+            )
+            for resource in resources
+        ]
+        if lexical_scores is not None:
+            return _rank_with_lexical_scores(
+                resources,
+                texts,
+                lexical_scores,
+                query_embedding,
+                generate_embedding_fn=generate_embedding_fn,
+                scorer=scorer,
+            )
+        return _rank_vectorized(resources, texts, query, query_embedding, scorer, generate_embedding_fn)
     scored_resources = []
     for resource in resources:
         score = score_resource(
@@ -4,6 +4,7 @@ from typing import Any, Dict, List, Optional
 
 from app.core.config import get_settings
 from app.services import model_os_structured_support as structured_support
+from app.services.llm_partial_json import StructuredPartial
 
 
 def _clean_json_str(text: str) -> str:
@@ -63,11 +64,18 @@ async def stream_socratic_question(
         latest_feedback,
     )
     route = await self.resolve_task_route("interactive")
-    async for token in self.llm.stream_generate(
-        messages=[{"role": "user", "content": prompt}],
-        provider_id=route.provider_id,
-        provider_type=route.provider_type,
-        model_id=route.model_id,
+
+    def build_stream(target):
+        return self.llm.stream_generate(
+            messages=[{"role": "user", "content": prompt}],
+            provider_id=target.provider_id,
+            provider_type=target.provider_type,
+            model_id=target.model_id,
+        )
+
+    async for token in self._coalesce_stream(
+        ("stream_socratic_question", self._route_cache_key(route), prompt),
+        lambda: self._stream_for_lane("interactive", route, build_stream),
     ):
         yield token
 
@@ -344,13 +352,13 @@ Return as JSON array:
     return self.normalize_migration_payload(migrations)
 
 
-async def generate_learning_path(
+def _build_learning_path_prompt(
     self,
     problem_title: str,
     problem_description: str,
     existing_knowledge: List[str],
     associated_concepts: Optional[List[str]] = None,
-) -> List[Dict[str, Any]]:
+) -> str:
     language_instruction = self._build_language_instruction(
         problem_title,
         problem_description,
@@ -358,7 +366,7 @@ async def generate_learning_path(
         ", ".join(associated_concepts or []),
         json_mode=True,
     )
-    prompt = f"""Generate an optimized learning path for:
+    return f"""Generate an optimized learning path for:
 
 Problem/Goal: {problem_title}
 Description: {problem_description}
@@ -382,6 +390,22 @@ Return ONLY a valid JSON array of steps exactly matching this format (with NO ex
 
 {language_instruction}"""
 
+
+async def generate_learning_path(
+    self,
+    problem_title: str,
+    problem_description: str,
+    existing_knowledge: List[str],
+    associated_concepts: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    prompt = _build_learning_path_prompt(
+        self,
+        problem_title,
+        problem_description,
+        existing_knowledge,
+        associated_concepts,
+    )
+
     try:
         structured_result = await self.generate_structured_for_lane(
             prompt,
@@ -409,6 +433,68 @@ Return ONLY a valid JSON array of steps exactly matching this format (with NO ex
     return self.normalize_learning_path_payload(path)
 
 
+async def stream_learning_path(
+    self,
+    problem_title: str,
+    problem_description: str,
+    existing_knowledge: List[str],
+    associated_concepts: Optional[List[str]] = None,
+):
+    """Yield ``StructuredPartial`` items whose values are normalized step prefixes.
+
+    The last item is complete: either the fully streamed document or, when
+    the stream stops early, the non-streamed ``generate_learning_path``.
+    """
+    prompt = _build_learning_path_prompt(
+        self,
+        problem_title,
+        problem_description,
+        existing_knowledge,
+        associated_concepts,
+    )
+    async for partial in self.stream_structured_for_lane(
+        prompt,
+        self._learning_path_schema(),
+        schema_name="learning_path",
+        lane="structured_heavy",
+    ):
+        steps = self.normalize_learning_path_payload(partial.value)
+        if partial.complete and steps:
+            yield StructuredPartial(steps, True)
+            return
+        if steps:
+            yield StructuredPartial(steps, False)
+
+    path = await self.generate_learning_path(
+        problem_title=problem_title,
+        problem_description=problem_description,
+        existing_knowledge=existing_knowledge,
+        associated_concepts=associated_concepts,
+    )
+    if path:
+        yield StructuredPartial(path, True)
+
+
+async def _collect_learning_path_stream(self, stream, on_partial, deadline: float) -> List[Dict[str, Any]]:
+    """The complete streamed path, or [] when the deadline or an error cut the stream short."""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return []
+            try:
+                partial = await asyncio.wait_for(stream.__anext__(), timeout=remaining)
+            except Exception:
+                # Exhausted, timed out or failed upstream: no complete path.
+                return []
+            if partial.complete:
+                return partial.value
+            await on_partial(partial.value)
+    finally:
+        await stream.aclose()
+
+
 async def generate_learning_path_resilient(
     self,
     problem_title: str,
@@ -416,24 +502,42 @@ async def generate_learning_path_resilient(
     existing_knowledge: List[str],
     associated_concepts: Optional[List[str]] = None,
     timeout_seconds: Optional[int] = None,
+    on_partial=None,
 ) -> List[Dict[str, Any]]:
     effective_timeout = timeout_seconds or get_settings().LEARNING_PATH_TIMEOUT_SECONDS
-    try:
-        path = await asyncio.wait_for(
-            self.generate_learning_path(
+    if on_partial is not None:
+        # ``on_partial`` sees each streamed prefix; only a complete document
+        # is returned, anything cut short gives way to the fallback path.
+        path = await _collect_learning_path_stream(
+            self,
+            self.stream_learning_path(
                 problem_title=problem_title,
                 problem_description=problem_description,
                 existing_knowledge=existing_knowledge,
                 associated_concepts=associated_concepts,
             ),
-            timeout=max(1, int(effective_timeout)),
+            on_partial,
+            asyncio.get_running_loop().time() + max(1, int(effective_timeout)),
         )
-        if isinstance(path, list) and path:
+        if path:
             return path
-    except asyncio.TimeoutError:
-        pass
-    except Exception:
-        pass
+    else:
+        try:
+            path = await asyncio.wait_for(
+                self.generate_learning_path(
+                    problem_title=problem_title,
+                    problem_description=problem_description,
+                    existing_knowledge=existing_knowledge,
+                    associated_concepts=associated_concepts,
+                ),
+                timeout=max(1, int(effective_timeout)),
+            )
+            if isinstance(path, list) and path:
+                return path
+        except asyncio.TimeoutError:
+            pass
+        except Exception:
+            pass
 
     return self._build_fallback_learning_path(
         problem_title=problem_title,
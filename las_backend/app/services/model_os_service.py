@@ -1,11 +1,30 @@
+import asyncio
+import logging
+import time
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from sqlalchemy import select
 
 from app.core.database import AsyncSessionLocal
 from app.models.entities.llm_provider import LLMProvider, LLMModel
 from app.models.entities.system_settings import SystemSettings
 from app.services.llm_service import llm_service
+from app.services.llm_call_metrics import llm_call_metrics, llm_call_tags
+from app.services.llm_circuit_breaker import describe_breaker_failure, llm_circuit_breakers
+from app.services.llm_concurrency import ConcurrencyQueueTimeout, llm_concurrency
+from app.services.llm_context_budget import RetrievalContext, RetrievalSection
+from app.services.llm_hedging import llm_hedging
+from app.services.llm_partial_json import StructuredPartial
+from app.services.llm_response_cache import llm_response_cache
+from app.services.llm_route_cache import is_cache_miss, llm_route_cache
+from app.services.llm_single_flight import build_flight_key, llm_single_flight
+from app.services.embedding_providers import EmbeddingProviderError, embedder
+from app.services.embedding_queue import embedding_queue
+from app.services.event_sink import retrieval_event_sink
+from app.services.model_os_vector_scoring import GenerateEmbeddingFn, VectorizedScorer
+from app.services.lexical_index import lexical_index
+from app.services.retrieval_candidates import retrieval_candidates, retrieval_results
+from app.services.vector_index import vector_index
 from app.core.config import get_settings
 
 from app.services import model_os_embedding_support as embedding_support
@@ -14,6 +33,7 @@ from app.services import model_os_structured_support as structured_support
 
 
 LLM_TASK_ROUTES_KEY = "llm_task_routes"
+logger = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
@@ -26,8 +46,26 @@ class LLMTaskRoute:
 class ModelOSService:
     def __init__(self):
         self.llm = llm_service
+        self.route_cache = llm_route_cache
+        self.response_cache = llm_response_cache
+        self.single_flight = llm_single_flight
+        self.breakers = llm_circuit_breakers
+        self.hedging = llm_hedging
+        self.concurrency = llm_concurrency
+        self.call_metrics = llm_call_metrics
         self.settings = get_settings()
         self.embedding_dimensions = self.settings.MODEL_CARD_EMBEDDING_DIMENSIONS
+        self.embedder = embedder
+        self.embedding_queue = embedding_queue
+        self.vector_index = vector_index
+        self.lexical_index = lexical_index
+        self.retrieval_candidates = retrieval_candidates
+        self.event_sink = retrieval_event_sink
+        self.retrieval_results = retrieval_results
+        self.vector_scorer = VectorizedScorer(
+            tokenize_text=lambda text: self._tokenize_text(text),
+            generate_embedding_fn=lambda text: self._zero_embedding(),
+        )
 
     _feedback_structured_schema = staticmethod(structured_support.feedback_structured_schema)
     _step_hint_schema = staticmethod(structured_support.step_hint_schema)
@@ -82,6 +120,7 @@ class ModelOSService:
     suggest_migration = generation_support.suggest_migration
     generate_learning_path = generation_support.generate_learning_path
     generate_learning_path_resilient = generation_support.generate_learning_path_resilient
+    stream_learning_path = generation_support.stream_learning_path
     generate_feedback = generation_support.generate_feedback
     generate_step_hint = generation_support.generate_step_hint
     generate_feedback_structured = generation_support.generate_feedback_structured
@@ -133,6 +172,17 @@ class ModelOSService:
             return value if isinstance(value, dict) else {}
 
     async def _resolve_db_route(self, lane: str) -> Optional[LLMTaskRoute]:
+        cache_key = ("lane", lane)
+        cached = self.route_cache.get(cache_key)
+        if not is_cache_miss(cached):
+            return cached
+
+        version = self.route_cache.version
+        route = await self._load_db_route(lane)
+        self.route_cache.set(cache_key, route, version)
+        return route
+
+    async def _load_db_route(self, lane: str) -> Optional[LLMTaskRoute]:
         payloads = await self._load_route_payloads()
         assignment = payloads.get(lane)
         if not isinstance(assignment, dict):
@@ -198,6 +248,22 @@ class ModelOSService:
         text = str(result or "").strip()
         return not text or text.startswith("Error:")
 
+    def _route_cache_key(self, route: LLMTaskRoute) -> str:
+        return f"{route.provider_id or ''}|{route.provider_type or ''}|{route.model_id or ''}"
+
+    async def _coalesce(self, key_parts: tuple, factory):
+        if not self.settings.LLM_SINGLE_FLIGHT_ENABLED:
+            return await factory()
+        return await self.single_flight.run(build_flight_key(*key_parts), factory)
+
+    async def _coalesce_stream(self, key_parts: tuple, factory):
+        if not self.settings.LLM_SINGLE_FLIGHT_ENABLED:
+            async for token in factory():
+                yield token
+            return
+        async for token in self.single_flight.stream(build_flight_key(*key_parts), factory):
+            yield token
+
     async def generate_text_for_lane(
         self,
         prompt: str,
@@ -206,27 +272,169 @@ class ModelOSService:
         allow_fallback: bool = True,
     ) -> str:
         primary = await self.resolve_task_route(lane)
-        result = await self.llm.generate(
-            prompt,
-            provider_id=primary.provider_id,
-            provider_type=primary.provider_type,
-            model_id=primary.model_id,
+        return await self._coalesce(
+            ("text", lane, self._route_cache_key(primary), allow_fallback, prompt),
+            lambda: self._generate_text_with_fallback(prompt, primary, allow_fallback, lane=lane),
         )
+
+    async def _generate_text_on_route(
+        self,
+        prompt: str,
+        route: LLMTaskRoute,
+        lane: str = "interactive",
+        fallback_reason: Optional[str] = None,
+    ) -> str:
+        route_key = self._route_cache_key(route)
+        try:
+            async with self.concurrency.slot(route_key, lane) as slot:
+                started = time.monotonic()
+                try:
+                    with llm_call_tags(lane=lane, fallback_reason=fallback_reason):
+                        result = await self.llm.generate(
+                            prompt,
+                            provider_id=route.provider_id,
+                            provider_type=route.provider_type,
+                            model_id=route.model_id,
+                        )
+                except asyncio.CancelledError:
+                    self.breakers.record_cancelled(route_key, time.monotonic() - started)
+                    raise
+                except Exception as exc:
+                    self.breakers.record_failure(route_key, time.monotonic() - started, str(exc))
+                    raise
+                slot.succeeded = not self._looks_like_llm_error(result)
+        except ConcurrencyQueueTimeout as exc:
+            # Local back-pressure, not a provider failure: leave the breaker alone.
+            self.breakers.release(route_key)
+            return f"Error: {exc}"
+        elapsed = time.monotonic() - started
+        if self._looks_like_llm_error(result):
+            self.breakers.record_failure(route_key, elapsed, describe_breaker_failure(result))
+        else:
+            self.breakers.record_success(route_key, elapsed)
+        return result
+
+    async def _generate_text_on_allowed_route(
+        self,
+        prompt: str,
+        route: LLMTaskRoute,
+        lane: str = "interactive",
+        fallback_reason: Optional[str] = None,
+    ) -> str:
+        route_key = self._route_cache_key(route)
+        if not self.breakers.allow_request(route_key):
+            return f"Error: circuit open for route {route_key}"
+        return await self._generate_text_on_route(prompt, route, lane, fallback_reason)
+
+    async def _resolve_hedge_route(self, lane: str, primary: LLMTaskRoute) -> Optional[LLMTaskRoute]:
+        if not self.hedging.enabled_for(lane):
+            return None
+        fallback = await self.resolve_fallback_route()
+        if not self._has_explicit_route(fallback) or self._routes_match(primary, fallback):
+            return None
+        return fallback
+
+    async def _generate_text_with_fallback(
+        self,
+        prompt: str,
+        primary: LLMTaskRoute,
+        allow_fallback: bool,
+        *,
+        lane: str = "interactive",
+    ) -> str:
+        primary_key = self._route_cache_key(primary)
+        primary_allowed = self.breakers.allow_request(primary_key)
+        hedge_route = await self._resolve_hedge_route(lane, primary) if allow_fallback and primary_allowed else None
+        if hedge_route is not None:
+            return await self.hedging.run(
+                lane,
+                self.hedging.delay_for(primary_key),
+                lambda: self._generate_text_on_route(prompt, primary, lane),
+                lambda: self._generate_text_on_allowed_route(prompt, hedge_route, lane, "hedge"),
+                is_good=lambda result: not self._looks_like_llm_error(result),
+            )
+
+        if primary_allowed:
+            result = await self._generate_text_on_route(prompt, primary, lane)
+        else:
+            result = f"Error: circuit open for route {primary_key}"
         if not allow_fallback or not self._looks_like_llm_error(result):
             return result
 
         fallback = await self.resolve_fallback_route()
         if not self._has_explicit_route(fallback) or self._routes_match(primary, fallback):
             return result
+        if not self.breakers.allow_request(self._route_cache_key(fallback)):
+            return result
 
-        fallback_result = await self.llm.generate(
+        fallback_result = await self._generate_text_on_route(
             prompt,
-            provider_id=fallback.provider_id,
-            provider_type=fallback.provider_type,
-            model_id=fallback.model_id,
+            fallback,
+            lane,
+            "primary_error" if primary_allowed else "circuit_open",
         )
         return fallback_result if not self._looks_like_llm_error(fallback_result) else result
 
+    async def _stream_on_route(
+        self,
+        lane: str,
+        route: LLMTaskRoute,
+        build_stream,
+        fallback_reason: Optional[str] = None,
+    ):
+        route_key = self._route_cache_key(route)
+        if not self.breakers.allow_request(route_key):
+            yield f"Error: circuit open for route {route_key}"
+            return
+        try:
+            async with self.concurrency.slot(route_key, lane) as slot:
+                started = time.monotonic()
+                received = False
+                finished = False
+                failure: Optional[str] = None
+                try:
+                    with llm_call_tags(lane=lane, fallback_reason=fallback_reason):
+                        async for token in build_stream(route):
+                            if not received:
+                                received = True
+                                if self._looks_like_llm_error(token):
+                                    failure = describe_breaker_failure(token)
+                                slot.succeeded = failure is None
+                            yield token
+                    finished = True
+                except Exception as exc:
+                    failure = str(exc)
+                    raise
+                finally:
+                    elapsed = time.monotonic() - started
+                    if failure is not None:
+                        self.breakers.record_failure(route_key, elapsed, failure)
+                    elif not finished:
+                        self.breakers.record_cancelled(route_key, elapsed)
+                    elif received:
+                        self.breakers.record_success(route_key, elapsed)
+                    else:
+                        self.breakers.release(route_key)
+        except ConcurrencyQueueTimeout as exc:
+            self.breakers.release(route_key)
+            yield f"Error: {exc}"
+
+    async def _stream_for_lane(self, lane: str, primary: LLMTaskRoute, build_stream):
+        hedge_route = await self._resolve_hedge_route(lane, primary)
+        if hedge_route is None:
+            async for token in self._stream_on_route(lane, primary, build_stream):
+                yield token
+            return
+
+        async for token in self.hedging.stream(
+            lane,
+            self.hedging.delay_for(self._route_cache_key(primary)),
+            lambda: self._stream_on_route(lane, primary, build_stream),
+            lambda: self._stream_on_route(lane, hedge_route, build_stream, "hedge"),
+            is_good=lambda token: not self._looks_like_llm_error(token),
+        ):
+            yield token
+
     async def generate_structured_for_lane(
         self,
         prompt: str,
@@ -235,31 +443,256 @@ class ModelOSService:
         schema_name: str,
         lane: str = "interactive",
         allow_fallback: bool = True,
+        bypass_cache: bool = False,
     ) -> Optional[Dict[str, Any] | List[Any]]:
         primary = await self.resolve_task_route(lane)
-        structured = await self.llm.generate_structured_json(
+        cache_key: Optional[str] = None
+        route_key = self._route_cache_key(primary)
+        if not bypass_cache and self.response_cache.enabled:
+            cache_key = self.response_cache.build_key(route_key, schema_name, prompt, json_schema)
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                self.call_metrics.record_cache_hit(
+                    "generate_structured",
+                    lane=lane,
+                    provider_type=primary.provider_type,
+                    model_id=primary.model_id,
+                )
+                return cached
+
+        structured, served_by = await self._coalesce(
+            ("structured", lane, route_key, allow_fallback, schema_name, json_schema, prompt),
+            lambda: self._generate_structured_with_fallback(
+                prompt,
+                json_schema,
+                schema_name=schema_name,
+                primary=primary,
+                allow_fallback=allow_fallback,
+                lane=lane,
+            ),
+        )
+        # The key names the primary route; a fallback answer must not be
+        # served from it once the primary recovers.
+        if cache_key is not None and structured is not None and served_by is primary:
+            await self.response_cache.set(
+                cache_key,
+                structured,
+                route_key=route_key,
+                schema_name=schema_name,
+            )
+        return structured
+
+    async def _generate_structured_on_route(
+        self,
+        prompt: str,
+        json_schema: Dict[str, Any],
+        *,
+        schema_name: str,
+        route: LLMTaskRoute,
+        lane: str = "interactive",
+        fallback_reason: Optional[str] = None,
+    ) -> Optional[Dict[str, Any] | List[Any]]:
+        route_key = self._route_cache_key(route)
+        if not self.breakers.allow_request(route_key):
+            return None
+        try:
+            async with self.concurrency.slot(route_key, lane) as slot:
+                started = time.monotonic()
+                try:
+                    with llm_call_tags(lane=lane, fallback_reason=fallback_reason):
+                        structured = await self.llm.generate_structured_json(
+                            prompt,
+                            json_schema,
+                            schema_name=schema_name,
+                            provider_id=route.provider_id,
+                            provider_type=route.provider_type,
+                            model_id=route.model_id,
+                        )
+                except asyncio.CancelledError:
+                    self.breakers.record_cancelled(route_key, time.monotonic() - started)
+                    raise
+                except Exception as exc:
+                    self.breakers.record_failure(route_key, time.monotonic() - started, str(exc))
+                    raise
+                slot.succeeded = structured is not None
+        except ConcurrencyQueueTimeout:
+            self.breakers.release(route_key)
+            return None
+        if structured is None:
+            # Providers without native JSON-schema support also return None,
+            # so an empty structured result is not evidence of an outage.
+            self.breakers.release(route_key)
+        else:
+            self.breakers.record_success(route_key, time.monotonic() - started)
+        return structured
+
+    async def _generate_structured_with_fallback(
+        self,
+        prompt: str,
+        json_schema: Dict[str, Any],
+        *,
+        schema_name: str,
+        primary: LLMTaskRoute,
+        allow_fallback: bool,
+        lane: str = "interactive",
+    ) -> Tuple[Optional[Dict[str, Any] | List[Any]], Optional[LLMTaskRoute]]:
+        """Return the structured result and the route that produced it."""
+        structured = await self._generate_structured_on_route(
             prompt,
             json_schema,
             schema_name=schema_name,
-            provider_id=primary.provider_id,
-            provider_type=primary.provider_type,
-            model_id=primary.model_id,
+            route=primary,
+            lane=lane,
         )
-        if structured is not None or not allow_fallback:
-            return structured
+        if structured is not None:
+            return structured, primary
+        if not allow_fallback:
+            return None, None
 
         fallback = await self.resolve_fallback_route()
         if not self._has_explicit_route(fallback) or self._routes_match(primary, fallback):
-            return structured
+            return None, None
 
-        return await self.llm.generate_structured_json(
+        structured = await self._generate_structured_on_route(
             prompt,
             json_schema,
             schema_name=schema_name,
-            provider_id=fallback.provider_id,
-            provider_type=fallback.provider_type,
-            model_id=fallback.model_id,
+            route=fallback,
+            lane=lane,
+            fallback_reason="primary_empty",
         )
+        return structured, fallback if structured is not None else None
+
+    async def stream_structured_for_lane(
+        self,
+        prompt: str,
+        json_schema: Dict[str, Any],
+        *,
+        schema_name: str,
+        lane: str = "interactive",
+        allow_fallback: bool = True,
+    ):
+        """Yield ``StructuredPartial`` items; a cached payload arrives as one complete item."""
+        primary = await self.resolve_task_route(lane)
+        route_key = self._route_cache_key(primary)
+        cache_key: Optional[str] = None
+        if self.response_cache.enabled:
+            cache_key = self.response_cache.build_key(route_key, schema_name, prompt, json_schema)
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                self.call_metrics.record_cache_hit(
+                    "stream_structured",
+                    lane=lane,
+                    provider_type=primary.provider_type,
+                    model_id=primary.model_id,
+                )
+                yield StructuredPartial(cached, True)
+                return
+
+        async for partial in self._coalesce_stream(
+            ("stream_structured", lane, route_key, allow_fallback, schema_name, json_schema, prompt),
+            lambda: self._stream_structured_with_fallback(
+                prompt,
+                json_schema,
+                schema_name=schema_name,
+                primary=primary,
+                allow_fallback=allow_fallback,
+                lane=lane,
+                cache_key=cache_key,
+            ),
+        ):
+            yield partial
+
+    async def _stream_structured_with_fallback(
+        self,
+        prompt: str,
+        json_schema: Dict[str, Any],
+        *,
+        schema_name: str,
+        primary: LLMTaskRoute,
+        allow_fallback: bool,
+        lane: str,
+        cache_key: Optional[str],
+    ):
+        streamed = False
+        async for partial in self._stream_structured_on_route(
+            prompt,
+            json_schema,
+            schema_name=schema_name,
+            route=primary,
+            lane=lane,
+        ):
+            streamed = True
+            if partial.complete and cache_key is not None:
+                await self.response_cache.set(
+                    cache_key,
+                    partial.value,
+                    route_key=self._route_cache_key(primary),
+                    schema_name=schema_name,
+                )
+            yield partial
+        if streamed or not allow_fallback:
+            return
+
+        fallback = await self.resolve_fallback_route()
+        if not self._has_explicit_route(fallback) or self._routes_match(primary, fallback):
+            return
+        async for partial in self._stream_structured_on_route(
+            prompt,
+            json_schema,
+            schema_name=schema_name,
+            route=fallback,
+            lane=lane,
+            fallback_reason="primary_empty",
+        ):
+            yield partial
+
+    async def _stream_structured_on_route(
+        self,
+        prompt: str,
+        json_schema: Dict[str, Any],
+        *,
+        schema_name: str,
+        route: LLMTaskRoute,
+        lane: str,
+        fallback_reason: Optional[str] = None,
+    ):
+        route_key = self._route_cache_key(route)
+        if not self.breakers.allow_request(route_key):
+            return
+        try:
+            async with self.concurrency.slot(route_key, lane) as slot:
+                started = time.monotonic()
+                received = False
+                complete = False
+                finished = False
+                try:
+                    with llm_call_tags(lane=lane, fallback_reason=fallback_reason):
+                        async for partial in self.llm.stream_structured_json(
+                            prompt,
+                            json_schema,
+                            schema_name=schema_name,
+                            provider_id=route.provider_id,
+                            provider_type=route.provider_type,
+                            model_id=route.model_id,
+                        ):
+                            received = True
+                            complete = partial.complete
+                            yield partial
+                    finished = True
+                finally:
+                    elapsed = time.monotonic() - started
+                    if not finished:
+                        self.breakers.record_cancelled(route_key, elapsed)
+                    elif complete:
+                        self.breakers.record_success(route_key, elapsed)
+                    elif received:
+                        self.breakers.record_failure(route_key, elapsed, "incomplete structured stream")
+                    else:
+                        self.breakers.release(route_key)
+                slot.succeeded = complete
+        except ConcurrencyQueueTimeout:
+            self.breakers.release(route_key)
 
     def build_embedding_text(
         self,
@@ -303,21 +736,62 @@ class ModelOSService:
             status=status,
         )
 
-    def generate_embedding(self, text: str) -> List[float]:
-        return embedding_support.generate_embedding(
-            text,
-            embedding_dimensions=self.embedding_dimensions,
-            tokenize_text=self._tokenize_text,
-        )
+    def _zero_embedding(self) -> List[float]:
+        return [0.0] * self.embedding_dimensions
 
-    def generate_card_embedding(
+    async def generate_embedding(self, text: str) -> List[float]:
+        try:
+            return await self.embedder.aembed(text)
+        except EmbeddingProviderError as exc:
+            # A zero vector leaves ranking to the lexical score.
+            logger.warning("Embedding provider failed: %s", exc)
+            return self._zero_embedding()
+
+    async def embedding_lookup(self, texts: List[str]) -> GenerateEmbeddingFn:
+        """Embed ``texts`` in one batch and return a lookup for the sync scoring helpers.
+
+        Unknown texts, or every text when the provider fails, map to a zero vector.
+        """
+        distinct = list(dict.fromkeys(texts))
+        vectors: Dict[str, List[float]] = {}
+        if distinct:
+            try:
+                vectors = dict(zip(distinct, await self.embedder.aembed_many(distinct)))
+            except EmbeddingProviderError as exc:
+                logger.warning("Embedding provider failed: %s", exc)
+        return lambda text: vectors.get(text) or self._zero_embedding()
+
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Batch-encode ``texts`` for offline scripts; raises ``EmbeddingProviderError`` on failure."""
+        return self.embedder.embed_many(texts)
+
+    @property
+    def embedding_signature(self) -> str:
+        return self.embedder.signature
+
+    async def _store_embedding(self, item, text: str) -> Optional[List[float]]:
+        if self.embedding_queue.enabled:
+            # Flushing the changed text queues the row for the workers.
+            return item.embedding
+        try:
+            item.embedding = await self.embedder.aembed(text)
+            item.embedding_model = self.embedder.signature
+        except EmbeddingProviderError as exc:
+            # Rows without an embedding are scored on the fly and picked up
+            # by the re-embed job once the provider is back.
+            logger.warning("Embedding provider failed: %s", exc)
+            item.embedding = None
+            item.embedding_model = None
+        return item.embedding
+
+    async def generate_card_embedding(
         self,
         title: str,
         user_notes: Optional[str] = None,
         examples: Optional[List[str]] = None,
         counter_examples: Optional[List[str]] = None,
     ) -> List[float]:
-        return self.generate_embedding(
+        return await self.generate_embedding(
             self.build_embedding_text(
                 title=title,
                 user_notes=user_notes,
@@ -332,88 +806,215 @@ class ModelOSService:
             embedding_dimensions=self.embedding_dimensions,
         )
 
-    def refresh_card_embedding(self, card) -> List[float]:
-        card.embedding = self.generate_card_embedding(
+    def card_embedding_text(self, card) -> str:
+        return self.build_embedding_text(
             title=card.title,
             user_notes=card.user_notes,
             examples=card.examples,
             counter_examples=card.counter_examples,
         )
-        return card.embedding
 
-    def refresh_problem_embedding(self, problem) -> List[float]:
-        problem.embedding = self.generate_embedding(
-            self.build_problem_embedding_text(
-                title=problem.title,
-                description=problem.description,
-                associated_concepts=problem.associated_concepts,
-            )
+    def problem_embedding_text(self, problem) -> str:
+        return self.build_problem_embedding_text(
+            title=problem.title,
+            description=problem.description,
+            associated_concepts=problem.associated_concepts,
         )
-        return problem.embedding
 
-    def refresh_resource_embedding(self, resource) -> List[float]:
-        resource.embedding = self.generate_embedding(
-            self.build_resource_embedding_text(
-                title=resource.title,
-                url=resource.url,
-                link_type=resource.link_type,
-                ai_summary=resource.ai_summary,
-                status=resource.status,
-            )
+    def resource_embedding_text(self, resource) -> str:
+        return self.build_resource_embedding_text(
+            title=resource.title,
+            url=resource.url,
+            link_type=resource.link_type,
+            ai_summary=resource.ai_summary,
+            status=resource.status,
         )
-        return resource.embedding
 
-    def score_model_card(self, card, query: str, query_embedding: List[float]) -> float:
+    async def refresh_card_embedding(self, card) -> Optional[List[float]]:
+        return await self._store_embedding(card, self.card_embedding_text(card))
+
+    async def refresh_problem_embedding(self, problem) -> Optional[List[float]]:
+        return await self._store_embedding(problem, self.problem_embedding_text(problem))
+
+    async def refresh_resource_embedding(self, resource) -> Optional[List[float]]:
+        return await self._store_embedding(resource, self.resource_embedding_text(resource))
+
+    def score_model_card(
+        self,
+        card,
+        query: str,
+        query_embedding: List[float],
+        embeddings: Optional[GenerateEmbeddingFn] = None,
+    ) -> float:
         return embedding_support.score_model_card(
             card,
             query,
             query_embedding,
             tokenize_text=self._tokenize_text,
-            generate_embedding_fn=self.generate_embedding,
+            generate_embedding_fn=embeddings or (lambda text: self._zero_embedding()),
         )
 
-    def score_problem(self, problem, query: str, query_embedding: List[float]) -> float:
+    def score_problem(
+        self,
+        problem,
+        query: str,
+        query_embedding: List[float],
+        embeddings: Optional[GenerateEmbeddingFn] = None,
+    ) -> float:
         return embedding_support.score_problem(
             problem,
             query,
             query_embedding,
             tokenize_text=self._tokenize_text,
-            generate_embedding_fn=self.generate_embedding,
+            generate_embedding_fn=embeddings or (lambda text: self._zero_embedding()),
         )
 
-    def score_resource(self, resource, query: str, query_embedding: List[float]) -> float:
+    def score_resource(
+        self,
+        resource,
+        query: str,
+        query_embedding: List[float],
+        embeddings: Optional[GenerateEmbeddingFn] = None,
+    ) -> float:
         return embedding_support.score_resource(
             resource,
             query,
             query_embedding,
             tokenize_text=self._tokenize_text,
-            generate_embedding_fn=self.generate_embedding,
+            generate_embedding_fn=embeddings or (lambda text: self._zero_embedding()),
         )
 
-    def rank_model_cards(self, cards: List[Any], query: str) -> List[Any]:
+    def _ranking_scorer(self) -> Optional[VectorizedScorer]:
+        if self.settings.MODEL_OS_VECTORIZED_SCORING_ENABLED and self.vector_scorer.available:
+            return self.vector_scorer
+        return None
+
+    async def _ranking_embeddings(
+        self,
+        items: List[Any],
+        query: str,
+        build_text: Callable[[Any], str],
+    ) -> GenerateEmbeddingFn:
+        # Rows without a stored embedding (not backfilled, or still waiting
+        # on the queue) are embedded here, all in one cached batch, so they
+        # rank exactly as they would once stored.
+        missing = [build_text(item) for item in items if not item.embedding]
+        return await self.embedding_lookup([query.strip(), *missing])
+
+    async def rank_model_cards(
+        self,
+        cards: List[Any],
+        query: str,
+        lexical_scores: Optional[Dict[str, float]] = None,
+    ) -> List[Any]:
+        if not query.strip():
+            return cards
+        embeddings = await self._ranking_embeddings(cards, query, self.card_embedding_text)
         return embedding_support.rank_model_cards(
             cards,
             query,
             tokenize_text=self._tokenize_text,
-            generate_embedding_fn=self.generate_embedding,
+            generate_embedding_fn=embeddings,
+            scorer=self._ranking_scorer(),
+            lexical_scores=lexical_scores,
         )
 
-    def rank_problems(self, problems: List[Any], query: str) -> List[Any]:
+    async def rank_problems(
+        self,
+        problems: List[Any],
+        query: str,
+        lexical_scores: Optional[Dict[str, float]] = None,
+    ) -> List[Any]:
+        if not query.strip():
+            return problems
+        embeddings = await self._ranking_embeddings(problems, query, self.problem_embedding_text)
         return embedding_support.rank_problems(
             problems,
             query,
             tokenize_text=self._tokenize_text,
-            generate_embedding_fn=self.generate_embedding,
+            generate_embedding_fn=embeddings,
+            scorer=self._ranking_scorer(),
+            lexical_scores=lexical_scores,
         )
 
-    def rank_resources(self, resources: List[Any], query: str) -> List[Any]:
+    async def rank_resources(
+        self,
+        resources: List[Any],
+        query: str,
+        lexical_scores: Optional[Dict[str, float]] = None,
+    ) -> List[Any]:
+        if not query.strip():
+            return resources
+        embeddings = await self._ranking_embeddings(resources, query, self.resource_embedding_text)
         return embedding_support.rank_resources(
             resources,
             query,
             tokenize_text=self._tokenize_text,
-            generate_embedding_fn=self.generate_embedding,
+            generate_embedding_fn=embeddings,
+            scorer=self._ranking_scorer(),
+            lexical_scores=lexical_scores,
         )
 
+    @staticmethod
+    def _index_version(item) -> Any:
+        # The embedding queue stores vectors without touching updated_at, so a
+        # re-embedded row is told apart by a prefix of its vector.
+        return item.updated_at, item.embedding_model, tuple(item.embedding[:4])
+
+    async def shortlist_for_ranking(self, user_id: str, kind: str, items: List[Any], query: str) -> List[Any]:
+        """Narrow a large candidate list to its nearest neighbours before exact ranking.
+
+        Users with at most ``VECTOR_INDEX_CANDIDATES`` items are ranked as-is.
+        Rows without a stored embedding stay out of the index and are always
+        kept, to be embedded and ranked exactly.
+        """
+        candidate_limit = max(1, int(self.settings.VECTOR_INDEX_CANDIDATES))
+        if not self.vector_index.enabled or len(items) <= candidate_limit or not query.strip():
+            return items
+        embedded = [item for item in items if item.embedding]
+        self.vector_index.sync(
+            str(user_id),
+            kind,
+            ((str(item.id), self._index_version(item), item) for item in embedded),
+            lambda item: item.embedding,
+        )
+        hits = self.vector_index.search(
+            str(user_id),
+            kind,
+            await self.generate_embedding(query),
+            candidate_limit,
+            allowed_ids={str(item.id) for item in embedded},
+        )
+        shortlisted = {item_id for item_id, _ in hits}
+        return [item for item in items if not item.embedding or str(item.id) in shortlisted]
+
+    def top_lexical_ids(self, lexical_scores: Optional[Dict[str, float]]) -> List[str]:
+        if not lexical_scores:
+            return []
+        limit = max(1, int(self.settings.VECTOR_INDEX_CANDIDATES))
+        return sorted(lexical_scores, key=lexical_scores.get, reverse=True)[:limit]
+
+    async def _rank_retrieval_candidates(self, db, user_id: str, kind: str, rows: List[Any], query: str) -> List[Any]:
+        if not query.strip():
+            return rows
+        # Only the nearest neighbours plus the best lexical matches are ranked
+        # exactly, so cost tracks the shortlist rather than the library.
+        lexical_scores = await self.lexical_index.search(db, user_id, kind, query)
+        shortlisted = {str(row.id) for row in await self.shortlist_for_ranking(user_id, kind, rows, query)}
+        shortlisted.update(self.top_lexical_ids(lexical_scores))
+        candidates = [row for row in rows if str(row.id) in shortlisted]
+        rank = self.rank_model_cards if kind == "model_card" else self.rank_problems
+        return await rank(candidates, query, lexical_scores=lexical_scores)
+
+    def index_item(self, user_id: str, kind: str, item) -> None:
+        if not item.embedding:
+            self.vector_index.remove(str(user_id), kind, str(item.id))
+            return
+        self.vector_index.upsert(str(user_id), kind, str(item.id), item.embedding, self._index_version(item))
+
+    def unindex_item(self, user_id: str, kind: str, item_id: str) -> None:
+        self.vector_index.remove(str(user_id), kind, str(item_id))
+
     def _score_text_match(self, text: str, query: str) -> float:
         return embedding_support.score_text_match(
             text,
@@ -458,21 +1059,28 @@ class ModelOSService:
         limit: int = 5,
         source: str = "unknown",
     ) -> str:
-        from app.models.entities.user import ModelCard, Problem, RetrievalEvent, Review
+        normalized_limit = max(1, limit)
+        stamps = await self.retrieval_candidates.stamps(db, user_id)
+        cache_key = self.retrieval_results.key(user_id, query, normalized_limit, stamps)
+        cached = self.retrieval_results.get(cache_key) if self.retrieval_results.enabled else None
+        if cached is not None:
+            retrieval_context, selected_items = cached
+            self._log_retrieval_event(db, user_id, source, query, retrieval_context, selected_items, cache_hit=True)
+            return retrieval_context
 
         sections: List[str] = []
         items: List[Dict[str, Any]] = []
-        normalized_limit = max(1, limit)
-        query_embedding = self.generate_embedding(query)
-
-        cards_result = await db.execute(
-            select(ModelCard)
-            .where(ModelCard.user_id == user_id)
-            .order_by(ModelCard.updated_at.desc())
+        query_embedding = await self.generate_embedding(query)
+        candidates = await self.retrieval_candidates.load(db, user_id, stamps)
+
+        ranked_cards = (
+            await self._rank_retrieval_candidates(db, user_id, "model_card", candidates["model_card"], query)
+        )[:3]
+        card_embeddings = await self.embedding_lookup(
+            [self.card_embedding_text(card) for card in ranked_cards if not card.embedding]
         )
-        ranked_cards = self.rank_model_cards(list(cards_result.scalars().all()), query)[:3]
         for card in ranked_cards:
-            score = self.score_model_card(card, query, query_embedding)
+            score = self.score_model_card(card, query, query_embedding, card_embeddings)
             sections.append(
                 "\n".join(
                     [
@@ -493,14 +1101,14 @@ class ModelOSService:
                 )
             )
 
-        problems_result = await db.execute(
-            select(Problem)
-            .where(Problem.user_id == user_id)
-            .order_by(Problem.updated_at.desc())
+        ranked_problems = (
+            await self._rank_retrieval_candidates(db, user_id, "problem", candidates["problem"], query)
+        )[:2]
+        problem_embeddings = await self.embedding_lookup(
+            [self.problem_embedding_text(problem) for problem in ranked_problems if not problem.embedding]
         )
-        ranked_problems = self.rank_problems(list(problems_result.scalars().all()), query)[:2]
         for problem in ranked_problems:
-            score = self.score_problem(problem, query, query_embedding)
+            score = self.score_problem(problem, query, query_embedding, problem_embeddings)
             sections.append(
                 "\n".join(
                     [
@@ -521,13 +1129,8 @@ class ModelOSService:
                 )
             )
 
-        reviews_result = await db.execute(
-            select(Review)
-            .where(Review.user_id == user_id)
-            .order_by(Review.created_at.desc())
-        )
         scored_reviews = []
-        for review in reviews_result.scalars().all():
+        for review in candidates["review"]:
             score = self.score_review(review, query)
             if score > 0:
                 scored_reviews.append((score, review))
@@ -557,22 +1160,44 @@ class ModelOSService:
 
         selected_sections = sections[:normalized_limit]
         selected_items = items[:normalized_limit]
-        retrieval_context = "\n\n".join(selected_sections)
-
-        if query.strip():
-            db.add(
-                RetrievalEvent(
-                    user_id=user_id,
-                    source=source,
-                    query=query,
-                    retrieval_context=retrieval_context or None,
-                    items=selected_items,
-                    result_count=len(selected_items),
-                )
-            )
+        retrieval_context = RetrievalContext(
+            "\n\n".join(selected_sections),
+            sections=[
+                RetrievalSection(text=section, score=item["score"])
+                for section, item in zip(selected_sections, selected_items)
+            ],
+        )
 
+        if self.retrieval_results.enabled:
+            self.retrieval_results.put(cache_key, retrieval_context, selected_items)
+        self._log_retrieval_event(db, user_id, source, query, retrieval_context, selected_items, cache_hit=False)
         return retrieval_context
 
+    def _log_retrieval_event(self, db, user_id, source, query, retrieval_context, items, *, cache_hit: bool) -> None:
+        from app.models.entities.user import RetrievalEvent
+
+        if not query.strip():
+            return
+        context_text = str(retrieval_context) if retrieval_context else None
+        max_chars = int(self.settings.RETRIEVAL_EVENT_CONTEXT_MAX_CHARS)
+        if context_text and max_chars > 0:
+            context_text = context_text[:max_chars]
+        row = {
+            "user_id": user_id,
+            "source": source,
+            "query": query,
+            "retrieval_context": context_text,
+            "items": [dict(item) for item in items],
+            "result_count": len(items),
+            "cache_hit": cache_hit,
+        }
+        if self.event_sink.enabled:
+            self.event_sink.submit_after_commit(
+                db, row, sample_rate=float(self.settings.RETRIEVAL_EVENT_SAMPLE_RATE)
+            )
+        else:
+            db.add(RetrievalEvent(**row))
+
     def build_model_snapshot(self, card) -> Dict[str, Any]:
         return {
             "title": card.title,
@@ -617,14 +1242,39 @@ class ModelOSService:
         lane: str = "interactive",
     ):
         route = await self.resolve_task_route(lane)
-        async for token in self.llm.stream_generate_with_context(
-            prompt=prompt,
-            context=context,
-            retrieval_context=retrieval_context,
+        primary = LLMTaskRoute(
             provider_id=provider_id or route.provider_id,
             provider_type=provider_type or route.provider_type,
             model_id=model_id or route.model_id,
-            temperature=temperature,
+        )
+        has_override = bool(provider_id or provider_type or model_id)
+
+        def build_stream(target: LLMTaskRoute):
+            return self.llm.stream_generate_with_context(
+                prompt=prompt,
+                context=context,
+                retrieval_context=retrieval_context,
+                provider_id=target.provider_id,
+                provider_type=target.provider_type,
+                model_id=target.model_id,
+                temperature=temperature,
+            )
+
+        async for token in self._coalesce_stream(
+            (
+                "stream_context",
+                lane,
+                self._route_cache_key(primary),
+                temperature,
+                prompt,
+                context,
+                retrieval_context,
+            ),
+            lambda: (
+                self._stream_on_route(lane, primary, build_stream)
+                if has_override
+                else self._stream_for_lane(lane, primary, build_stream)
+            ),
         ):
             yield token
 
@@ -1,8 +1,16 @@
 from collections import Counter
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 import re
 
 
+_WORD_RE = re.compile(r"[a-zA-Z0-9_]+")
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+_CJK_RUN_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+CJK_SEARCH_NGRAMS = (2,)
+CJK_EMBEDDING_NGRAMS = (2, 3)
+
+
 def clean_json_str(text: str) -> str:
     match = re.search(r"```(?:json)?\s*(.*?)\s*```", text, re.DOTALL)
     if match:
@@ -194,20 +202,42 @@ def migration_schema() -> Dict[str, Any]:
     }
 
 
-def tokenize_text(text: str) -> List[str]:
-    return re.findall(r"[a-zA-Z0-9_]+", text.lower())
+@lru_cache(maxsize=8192)
+def _cached_tokens(text: str, cjk_ngrams: Tuple[int, ...]) -> Tuple[str, ...]:
+    lowered = text.lower()
+    tokens = _WORD_RE.findall(lowered)
+    for run in _CJK_RUN_RE.findall(lowered):
+        # Runs shorter than every n-gram size are kept whole so single
+        # characters still match.
+        if len(run) < min(cjk_ngrams):
+            tokens.append(run)
+            continue
+        for size in cjk_ngrams:
+            tokens.extend(run[index:index + size] for index in range(len(run) - size + 1))
+    return tuple(tokens)
+
+
+def tokenize_text(text: str, cjk_ngrams: Tuple[int, ...] = CJK_SEARCH_NGRAMS) -> List[str]:
+    """Lowercased word tokens plus character n-grams of each CJK run."""
+    if not text:
+        return []
+    return list(_cached_tokens(text, tuple(cjk_ngrams)))
+
+
+def tokenize_embedding_text(text: str) -> List[str]:
+    return tokenize_text(text, CJK_EMBEDDING_NGRAMS)
 
 
 def contains_cjk(text: Optional[str]) -> bool:
     if not text:
         return False
-    return bool(re.search(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]", text))
+    return bool(_CJK_RE.search(text))
 
 
 def count_cjk_chars(text: Optional[str]) -> int:
     if not text:
         return 0
-    return len(re.findall(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]", text))
+    return len(_CJK_RE.findall(text))
 
 
 def build_language_instruction(*texts: Optional[str], json_mode: bool = False) -> str:
@@ -699,8 +729,7 @@ Rules:
 
 
 def hint_tokens(text: str) -> set[str]:
-    tokens = set(re.findall(r"[a-zA-Z0-9_]+|[\u4e00-\u9fff]", (text or "").lower()))
-    return {token for token in tokens if token.strip()}
+    return set(tokenize_text(text, (1,)))
 
 
 def hint_similarity(left: str, right: str) -> float:
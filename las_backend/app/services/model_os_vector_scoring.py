@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from app.core.vector import cosine_similarity
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy ships with the backend image
+    np = None
+
+
+TokenizeFn = Callable[[str], List[str]]
+GenerateEmbeddingFn = Callable[[str], List[float]]
+FEATURE_CACHE_MAX_ENTRIES = 20000
+
+
+class _TextFeatures:
+    __slots__ = ("tokens", "lowered", "embedding")
+
+    def __init__(self, tokens: frozenset, lowered: str):
+        self.tokens = tokens
+        self.lowered = lowered
+        self.embedding: Optional[List[float]] = None
+
+
+class VectorizedScorer:
+    """Batched lexical + cosine scoring for the model_os ranking helpers.
+
+    Produces the same scores as ``score_text_match`` combined with
+    ``cosine_similarity`` (0.7 lexical / 0.3 semantic), but stacks the item
+    embeddings into one float32 matrix and scores them with a single matmul.
+    Token sets and fallback embeddings are memoized per item text, so
+    unchanged items are not re-tokenized on every query.
+    """
+
+    def __init__(self, tokenize_text: TokenizeFn, generate_embedding_fn: GenerateEmbeddingFn):
+        self.tokenize_text = tokenize_text
+        self.generate_embedding_fn = generate_embedding_fn
+        self._features: "OrderedDict[str, _TextFeatures]" = OrderedDict()
+
+    @property
+    def available(self) -> bool:
+        return np is not None
+
+    def _features_for(self, text: str) -> _TextFeatures:
+        features = self._features.get(text)
+        if features is None:
+            features = _TextFeatures(frozenset(self.tokenize_text(text)), text.lower())
+            self._features[text] = features
+            if len(self._features) > FEATURE_CACHE_MAX_ENTRIES:
+                self._features.popitem(last=False)
+        else:
+            self._features.move_to_end(text)
+        return features
+
+    def _embedding_for(
+        self,
+        text: str,
+        stored: Optional[Sequence[float]],
+        features: _TextFeatures,
+        generate_embedding_fn: Optional[GenerateEmbeddingFn] = None,
+    ):
+        if stored:
+            return stored
+        if generate_embedding_fn is not None:
+            return generate_embedding_fn(text)
+        if features.embedding is None:
+            features.embedding = self.generate_embedding_fn(text)
+        return features.embedding
+
+    def score(
+        self,
+        texts: List[str],
+        stored_embeddings: List[Optional[Sequence[float]]],
+        query: str,
+        query_embedding: List[float],
+        generate_embedding_fn: Optional[GenerateEmbeddingFn] = None,
+    ) -> List[float]:
+        if not texts:
+            return []
+        query_tokens = self.tokenize_text(query)
+        lowered_query = query.lower()
+        lexical = np.zeros(len(texts), dtype=np.float64)
+        for row, text in enumerate(texts):
+            features = self._features_for(text)
+            if query_tokens:
+                hits = sum(1 for token in query_tokens if token in features.tokens)
+                lexical[row] = hits / len(query_tokens)
+            if lowered_query in features.lowered:
+                lexical[row] += 0.5
+        semantic = self.semantic(texts, stored_embeddings, query_embedding, generate_embedding_fn)
+        scores = lexical * 0.7 + np.maximum(semantic, 0.0) * 0.3
+        return scores.tolist()
+
+    def semantic(
+        self,
+        texts: List[str],
+        stored_embeddings: List[Optional[Sequence[float]]],
+        query_embedding: List[float],
+        generate_embedding_fn: Optional[GenerateEmbeddingFn] = None,
+    ):
+        """Cosine of every item against the query, as one float32 matmul.
+
+        ``generate_embedding_fn`` overrides the memoized fallback for rows
+        without a stored embedding, e.g. with vectors prefetched for the call.
+        """
+        dimensions = len(query_embedding)
+        matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+        # Rows whose length differs from the query keep the scalar cosine,
+        # which truncates both sides to the shorter vector.
+        irregular: List[Tuple[int, Sequence[float]]] = []
+        for row, (text, stored) in enumerate(zip(texts, stored_embeddings)):
+            features = self._features_for(text)
+            embedding = self._embedding_for(text, stored, features, generate_embedding_fn)
+            if embedding is not None and len(embedding) == dimensions:
+                matrix[row] = embedding
+            else:
+                irregular.append((row, embedding))
+
+        semantic = np.zeros(len(texts), dtype=np.float64)
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = float(np.linalg.norm(query_vector))
+        if dimensions and query_norm > 0:
+            row_norms = np.linalg.norm(matrix, axis=1)
+            dots = matrix @ query_vector
+            valid = row_norms > 0
+            semantic[valid] = dots[valid] / (row_norms[valid] * query_norm)
+        for row, embedding in irregular:
+            semantic[row] = cosine_similarity(embedding, query_embedding)
+        return semantic
+
+    def clear(self) -> None:
+        self._features.clear()
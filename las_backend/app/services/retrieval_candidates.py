@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func, inspect, literal, select, union_all
+
+from app.core.config import get_settings
+from app.models.entities.user import ModelCard, Problem, Review
+from app.services.embedding_providers import embedder
+
+
+RETRIEVAL_ENTITIES = {
+    "model_card": ModelCard,
+    "problem": Problem,
+    "review": Review,
+}
+
+Stamp = Tuple[int, Any, int]
+
+
+@dataclass
+class CandidateSet:
+    stamp: Stamp
+    rows: List[SimpleNamespace]
+
+
+def _snapshot(row: Any) -> SimpleNamespace:
+    return SimpleNamespace(**{attr.key: getattr(row, attr.key) for attr in inspect(type(row)).column_attrs})
+
+
+class RetrievalCandidateCache:
+    """Per-user snapshots of the cards, problems and reviews retrieval ranks.
+
+    Each kind is stamped with ``(row count, max(updated_at), rows embedded
+    under the current signature)``; the last part moves when the embedding
+    queue fills in vectors, which leaves ``updated_at`` alone. One UNION
+    query fetches all three stamps per call, and only kinds whose stamp moved
+    (a write anywhere, in any process) are reloaded. Snapshots are plain
+    namespaces, so they outlive the session that loaded them.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._users: "OrderedDict[str, Dict[str, CandidateSet]]" = OrderedDict()
+        self.hits = 0
+        self.reloads = 0
+
+    async def stamps(self, db, user_id: str) -> Dict[str, Stamp]:
+        signature = embedder.signature
+
+        def embedded(entity):
+            if not hasattr(entity, "embedding_model"):
+                return literal(0)
+            return func.count(case((entity.embedding_model == signature, 1)))
+
+        statement = union_all(
+            *(
+                select(
+                    literal(kind).label("kind"),
+                    func.count(),
+                    func.max(entity.updated_at),
+                    embedded(entity),
+                ).where(entity.user_id == user_id)
+                for kind, entity in RETRIEVAL_ENTITIES.items()
+            )
+        )
+        return {
+            kind: (int(count or 0), updated_at, int(embedded_count or 0))
+            for kind, count, updated_at, embedded_count in (await db.execute(statement)).all()
+        }
+
+    async def load(
+        self,
+        db,
+        user_id: str,
+        stamps: Optional[Dict[str, Stamp]] = None,
+    ) -> Dict[str, List[SimpleNamespace]]:
+        user_id = str(user_id)
+        if stamps is None:
+            stamps = await self.stamps(db, user_id)
+        cached = self._users.get(user_id) or {}
+        fresh: Dict[str, CandidateSet] = {}
+        for kind, entity in RETRIEVAL_ENTITIES.items():
+            stamp = stamps.get(kind, (0, None, 0))
+            current = cached.get(kind)
+            if current is not None and current.stamp == stamp:
+                self.hits += 1
+                fresh[kind] = current
+                continue
+            self.reloads += 1
+            order = entity.created_at.desc() if entity is Review else entity.updated_at.desc()
+            result = await db.execute(select(entity).where(entity.user_id == user_id).order_by(order))
+            fresh[kind] = CandidateSet(stamp=stamp, rows=[_snapshot(row) for row in result.scalars().all()])
+
+        self._users[user_id] = fresh
+        self._users.move_to_end(user_id)
+        while len(self._users) > max(1, int(self.settings.RETRIEVAL_CANDIDATE_CACHE_MAX_USERS)):
+            self._users.popitem(last=False)
+        return {kind: candidate_set.rows for kind, candidate_set in fresh.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"users": len(self._users), "hits": self.hits, "reloads": self.reloads}
+
+    def reset(self) -> None:
+        self._users.clear()
+        self.hits = 0
+        self.reloads = 0
+
+
+def normalize_query(query: str) -> str:
+    return " ".join((query or "").casefold().split())
+
+
+class RetrievalResultCache:
+    """Short-TTL cache of finished retrieval results.
+
+    Keys combine the user, the normalized query, the section limit and the
+    user's data version (the candidate stamps), so any write to their cards,
+    problems or reviews naturally misses.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[float, Any, List[Dict[str, Any]]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return float(self.settings.RETRIEVAL_RESULT_CACHE_TTL_SECONDS) > 0
+
+    def key(self, user_id: str, query: str, limit: int, stamps: Dict[str, Stamp]) -> Tuple[Any, ...]:
+        version = tuple(
+            sorted(
+                (kind, count, str(updated_at), embedded)
+                for kind, (count, updated_at, embedded) in stamps.items()
+            )
+        )
+        return (str(user_id), normalize_query(query), limit, version)
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[Tuple[Any, List[Dict[str, Any]]]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def put(self, key: Tuple[Any, ...], context: Any, items: List[Dict[str, Any]]) -> None:
+        expires_at = time.monotonic() + float(self.settings.RETRIEVAL_RESULT_CACHE_TTL_SECONDS)
+        self._entries[key] = (expires_at, context, items)
+        self._entries.move_to_end(key)
+        while len(self._entries) > max(1, int(self.settings.RETRIEVAL_RESULT_CACHE_MAX_ENTRIES)):
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def reset(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+retrieval_candidates = RetrievalCandidateCache()
+retrieval_results = RetrievalResultCache()
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+
+
+IVF_TRAIN_ITERATIONS = 8
+
+
+def _unit(vector: Optional[Sequence[float]], dimensions: int) -> np.ndarray:
+    row = np.zeros(dimensions, dtype=np.float32)
+    if vector:
+        values = np.asarray(list(vector)[:dimensions], dtype=np.float32)
+        row[: len(values)] = values
+    norm = float(np.linalg.norm(row))
+    return row / norm if norm > 0 else row
+
+
+class FlatVectorIndex:
+    """Exact cosine search over unit vectors kept in a growable float32 matrix."""
+
+    kind = "flat"
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.matrix = np.zeros((16, dimensions), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def upsert(self, item_id: str, vector: np.ndarray) -> None:
+        row = self.rows.get(item_id)
+        if row is None:
+            row = len(self.ids)
+            if row >= self.matrix.shape[0]:
+                grown = np.zeros((self.matrix.shape[0] * 2, self.dimensions), dtype=np.float32)
+                grown[:row] = self.matrix[:row]
+                self.matrix = grown
+            self.ids.append(item_id)
+            self.rows[item_id] = row
+        self.matrix[row] = vector
+
+    def remove(self, item_id: str) -> None:
+        row = self.rows.pop(item_id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self.ids[row] = moved
+            self.rows[moved] = row
+            self.matrix[row] = self.matrix[last]
+        self.ids.pop()
+
+    def vector(self, item_id: str) -> Optional[np.ndarray]:
+        row = self.rows.get(item_id)
+        return None if row is None else self.matrix[row]
+
+    def score_rows(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        return self.matrix[rows] @ query
+
+    def search(self, query: np.ndarray, k: int, allowed: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        if not self.ids:
+            return []
+        rows = np.arange(len(self.ids))
+        if allowed is not None:
+            rows = np.fromiter((self.rows[item_id] for item_id in allowed if item_id in self.rows), dtype=np.int64)
+        return _top_k(self.ids, rows, self.score_rows(rows, query), k)
+
+
+class IVFVectorIndex:
+    """Inverted-file index: k-means centroids over the flat store, probing the closest lists."""
+
+    kind = "ivf"
+
+    def __init__(self, store: FlatVectorIndex, probes: int):
+        self.store = store
+        self.probes = max(1, probes)
+        self.trained_size = len(store)
+        count = max(1, int(len(store) ** 0.5))
+        self.centroids = self._train(store.matrix[: len(store)], count)
+        self.assignments: Dict[str, int] = {}
+        self.lists: List[Set[str]] = [set() for _ in range(len(self.centroids))]
+        if len(store):
+            nearest = np.argmax(store.matrix[: len(store)] @ self.centroids.T, axis=1)
+            for item_id, centroid in zip(store.ids, nearest.tolist()):
+                self.assignments[item_id] = centroid
+                self.lists[centroid].add(item_id)
+
+    @staticmethod
+    def _train(data: np.ndarray, count: int) -> np.ndarray:
+        if not len(data):
+            return np.zeros((1, data.shape[1]), dtype=np.float32)
+        # Deterministic seeding keeps rebuilds reproducible.
+        centroids = data[np.linspace(0, len(data) - 1, count).astype(np.int64)].copy()
+        for _ in range(IVF_TRAIN_ITERATIONS):
+            nearest = np.argmax(data @ centroids.T, axis=1)
+            for index in range(count):
+                members = data[nearest == index]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    norm = float(np.linalg.norm(centroid))
+                    centroids[index] = centroid / norm if norm > 0 else centroid
+        return centroids
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def upsert(self, item_id: str, vector: np.ndarray) -> None:
+        self.store.upsert(item_id, vector)
+        previous = self.assignments.get(item_id)
+        if previous is not None:
+            self.lists[previous].discard(item_id)
+        centroid = int(np.argmax(self.centroids @ vector))
+        self.assignments[item_id] = centroid
+        self.lists[centroid].add(item_id)
+
+    def remove(self, item_id: str) -> None:
+        centroid = self.assignments.pop(item_id, None)
+        if centroid is not None:
+            self.lists[centroid].discard(item_id)
+        self.store.remove(item_id)
+
+    def search(self, query: np.ndarray, k: int, allowed: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        probes = np.argsort(-(self.centroids @ query))[: self.probes]
+        candidates: Iterable[str] = (item_id for centroid in probes.tolist() for item_id in self.lists[centroid])
+        if allowed is not None:
+            candidates = (item_id for item_id in candidates if item_id in allowed)
+        rows = np.fromiter((self.store.rows[item_id] for item_id in candidates), dtype=np.int64)
+        if not len(rows):
+            return []
+        return _top_k(self.store.ids, rows, self.store.score_rows(rows, query), k)
+
+
+def _top_k(ids: List[str], rows: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[str, float]]:
+    if not len(rows):
+        return []
+    if len(rows) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+    else:
+        best = np.arange(len(rows))
+    best = best[np.argsort(-scores[best], kind="stable")]
+    return [(ids[int(rows[index])], float(scores[index])) for index in best]
+
+
+class VectorCollection:
+    """One user's vectors for one entity kind, switching flat <-> IVF by size."""
+
+    def __init__(self, dimensions: int, settings):
+        self.settings = settings
+        self.store = FlatVectorIndex(dimensions)
+        self.index: Any = self.store
+        self.versions: Dict[str, Any] = {}
+
+    def upsert(self, item_id: str, vector: Optional[Sequence[float]], version: Any) -> None:
+        self.index.upsert(item_id, _unit(vector, self.store.dimensions))
+        self.versions[item_id] = version
+
+    def remove(self, item_id: str) -> None:
+        self.index.remove(item_id)
+        self.versions.pop(item_id, None)
+
+    def rebalance(self) -> None:
+        size = len(self.store)
+        threshold = max(1, int(self.settings.VECTOR_INDEX_IVF_THRESHOLD))
+        if isinstance(self.index, IVFVectorIndex):
+            if size < threshold // 2:
+                self.index = self.store
+            elif size > self.index.trained_size * 2:
+                self.index = IVFVectorIndex(self.store, int(self.settings.VECTOR_INDEX_IVF_PROBES))
+        elif size >= threshold:
+            self.index = IVFVectorIndex(self.store, int(self.settings.VECTOR_INDEX_IVF_PROBES))
+
+    def search(self, query: Sequence[float], k: int, allowed: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        return self.index.search(_unit(query, self.store.dimensions), k, allowed)
+
+
+class VectorIndexRegistry:
+    """Per-user in-process vector indexes for deployments without pgvector.
+
+    Collections are built lazily from the rows a search already loaded and
+    kept current by the create/update/delete routes; rows changed elsewhere
+    are caught on the next search by their ``updated_at``. Users are evicted
+    least-recently-used past ``VECTOR_INDEX_MAX_USERS``.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._users: "OrderedDict[str, Dict[str, VectorCollection]]" = OrderedDict()
+        self.searches = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.VECTOR_INDEX_ENABLED)
+
+    def _collection(self, user_id: str, kind: str, create: bool) -> Optional[VectorCollection]:
+        collections = self._users.get(user_id)
+        if collections is None:
+            if not create:
+                return None
+            collections = {}
+            self._users[user_id] = collections
+            while len(self._users) > max(1, int(self.settings.VECTOR_INDEX_MAX_USERS)):
+                self._users.popitem(last=False)
+                self.evictions += 1
+        self._users.move_to_end(user_id)
+        collection = collections.get(kind)
+        if collection is None and create:
+            collection = VectorCollection(self.settings.MODEL_CARD_EMBEDDING_DIMENSIONS, self.settings)
+            collections[kind] = collection
+        return collection
+
+    def sync(self, user_id: str, kind: str, entries: Iterable[Tuple[str, Any, Any]], vector_for) -> VectorCollection:
+        """Upsert ``(item_id, version, item)`` entries whose version changed since indexing."""
+        collection = self._collection(user_id, kind, create=True)
+        for item_id, version, item in entries:
+            if item_id not in collection.versions or collection.versions[item_id] != version:
+                collection.upsert(item_id, vector_for(item), version)
+        collection.rebalance()
+        return collection
+
+    def search(
+        self,
+        user_id: str,
+        kind: str,
+        query_embedding: Sequence[float],
+        k: int,
+        allowed_ids: Optional[Set[str]] = None,
+    ) -> List[Tuple[str, float]]:
+        collection = self._collection(user_id, kind, create=False)
+        if collection is None:
+            return []
+        self.searches += 1
+        return collection.search(query_embedding, k, allowed_ids)
+
+    def upsert(self, user_id: str, kind: str, item_id: str, vector: Optional[Sequence[float]], version: Any) -> None:
+        # Only users with a loaded collection are tracked; others build on first search.
+        collection = self._collection(user_id, kind, create=False)
+        if collection is not None:
+            collection.upsert(item_id, vector, version)
+            collection.rebalance()
+
+    def remove(self, user_id: str, kind: str, item_id: str) -> None:
+        collection = self._collection(user_id, kind, create=False)
+        if collection is not None:
+            collection.remove(item_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "users": len(self._users),
+            "searches": self.searches,
+            "evictions": self.evictions,
+            "collections": {
+                kind: sum(1 for collections in self._users.values() if kind in collections)
+                for kind in ("model_card", "problem", "resource")
+            },
+        }
+
+    def reset(self) -> None:
+        self._users.clear()
+        self.searches = 0
+        self.evictions = 0
+
+
+vector_index = VectorIndexRegistry()
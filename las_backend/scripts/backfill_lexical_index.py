@@ -0,0 +1,20 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import AsyncSessionLocal
+from app.services.lexical_index import lexical_index
+
+
+async def main():
+    user_id = sys.argv[1] if len(sys.argv) > 1 else None
+    async with AsyncSessionLocal() as db:
+        indexed = await lexical_index.reindex(db, user_id=user_id)
+        await db.commit()
+        print(f"Indexed {indexed} model cards, problems and resources")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,8 +1,10 @@
+import argparse
 import asyncio
 import os
 import sys
+from typing import Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import or_, select
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -11,35 +13,74 @@ from app.models.entities.user import ModelCard, Problem, ResourceLink
 from app.services.model_os_service import model_os_service
 
 
-async def main():
-    async with AsyncSessionLocal() as db:
-        cards_result = await db.execute(
-            select(ModelCard).order_by(ModelCard.created_at.asc())
-        )
-        cards = list(cards_result.scalars().all())
-        for card in cards:
-            model_os_service.refresh_card_embedding(card)
-
-        problems_result = await db.execute(
-            select(Problem).order_by(Problem.created_at.asc())
-        )
-        problems = list(problems_result.scalars().all())
-        for problem in problems:
-            model_os_service.refresh_problem_embedding(problem)
-
-        resources_result = await db.execute(
-            select(ResourceLink).order_by(ResourceLink.created_at.asc())
-        )
-        resources = list(resources_result.scalars().all())
-        for resource in resources:
-            model_os_service.refresh_resource_embedding(resource)
-
-        await db.commit()
-        print(
-            f"Updated embeddings for {len(cards)} model cards, "
-            f"{len(problems)} problems, {len(resources)} resources"
-        )
+DEFAULT_CHUNK_SIZE = 256
+ENTITIES = {
+    "model_card": (ModelCard, model_os_service.card_embedding_text),
+    "problem": (Problem, model_os_service.problem_embedding_text),
+    "resource": (ResourceLink, model_os_service.resource_embedding_text),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Re-embed rows whose embedding is missing or stale.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--kind", action="append", choices=sorted(ENTITIES), help="Limit to these entity kinds")
+    parser.add_argument("--after-id", default=None, help="Resume after this row id (single --kind only)")
+    return parser.parse_args()
+
+
+def stale_filter(entity):
+    # Rows embedded by another provider, model or dimension (or never) are
+    # stale; rows already on the current signature are left untouched.
+    return or_(
+        entity.embedding.is_(None),
+        entity.embedding_model.is_(None),
+        entity.embedding_model != model_os_service.embedding_signature,
+    )
+
+
+async def backfill_kind(kind: str, *, chunk_size: int, after_id: Optional[str] = None) -> int:
+    entity, build_text = ENTITIES[kind]
+    updated = 0
+    last_id = after_id
+    while True:
+        # Keyset pagination with a fresh session per chunk keeps memory flat,
+        # and each commit is a resume point.
+        async with AsyncSessionLocal() as db:
+            statement = select(entity).where(stale_filter(entity)).order_by(entity.id).limit(chunk_size)
+            if last_id is not None:
+                statement = statement.where(entity.id > last_id)
+            rows = list((await db.execute(statement)).scalars().all())
+            if not rows:
+                return updated
+            embeddings = model_os_service.generate_embeddings([build_text(row) for row in rows])
+            signature = model_os_service.embedding_signature
+            for row, embedding in zip(rows, embeddings):
+                row.embedding = embedding
+                row.embedding_model = signature
+            await db.commit()
+            last_id = str(rows[-1].id)
+        updated += len(rows)
+        print(f"{kind}: {updated} re-embedded, resume with --kind {kind} --after-id {last_id}")
+
+
+async def main(
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    kinds: Optional[Sequence[str]] = None,
+    after_id: Optional[str] = None,
+):
+    counts = {}
+    for kind in kinds or ENTITIES:
+        counts[kind] = await backfill_kind(kind, chunk_size=max(1, chunk_size), after_id=after_id)
+    print(
+        f"Updated embeddings for {counts.get('model_card', 0)} model cards, "
+        f"{counts.get('problem', 0)} problems, {counts.get('resource', 0)} resources"
+    )
+    return counts
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    if args.after_id and len(args.kind or []) != 1:
+        raise SystemExit("--after-id needs exactly one --kind")
+    asyncio.run(main(chunk_size=args.chunk_size, kinds=args.kind, after_id=args.after_id))
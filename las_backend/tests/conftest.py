@@ -20,9 +20,23 @@ os.environ["AUTO_CREATE_TABLES"] = "true"
 os.environ["SECRET_KEY"] = "test-secret-key"
 
 from app.main import app  # noqa: E402
-from app.core.database import Base, engine, AsyncSessionLocal  # noqa: E402
+from app.core.database import Base, engine, AsyncSessionLocal, read_routing  # noqa: E402
 from app.services.model_os_service import model_os_service  # noqa: E402
 from app.services.cog_test_engine import _engines  # noqa: E402
+from app.services.auth_cache import auth_user_cache, revoked_tokens  # noqa: E402
+from app.services.embedding_providers import embedder  # noqa: E402
+from app.services.embedding_queue import embedding_queue  # noqa: E402
+from app.services.event_sink import learning_event_sink, retrieval_event_sink  # noqa: E402
+from app.services.lexical_index import lexical_index  # noqa: E402
+from app.services.llm_call_metrics import llm_call_metrics  # noqa: E402
+from app.services.llm_circuit_breaker import llm_circuit_breakers  # noqa: E402
+from app.services.llm_concurrency import llm_concurrency  # noqa: E402
+from app.services.llm_context_budget import llm_context_budget  # noqa: E402
+from app.services.llm_response_cache import llm_response_cache  # noqa: E402
+from app.services.llm_route_cache import llm_route_cache  # noqa: E402
+from app.services.login_throttle import login_throttle  # noqa: E402
+from app.services.retrieval_candidates import retrieval_candidates, retrieval_results  # noqa: E402
+from app.services.vector_index import vector_index  # noqa: E402
 
 
 @pytest_asyncio.fixture(autouse=True)
@@ -31,6 +45,24 @@ async def clean_database():
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
     _engines.clear()
+    llm_route_cache.invalidate()
+    read_routing.reset()
+    auth_user_cache.reset()
+    revoked_tokens.reset()
+    login_throttle.reset()
+    llm_circuit_breakers.reset()
+    llm_concurrency.reset()
+    llm_call_metrics.reset()
+    llm_context_budget.reset()
+    vector_index.reset()
+    retrieval_candidates.reset()
+    retrieval_results.reset()
+    embedder.reset()
+    embedding_queue.reset()
+    lexical_index.reset()
+    retrieval_event_sink.reset()
+    learning_event_sink.reset()
+    await llm_response_cache.clear()
     yield
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
@@ -66,6 +66,7 @@ async def promote_user_to_admin(db_session, username="tester"):
 async def test_auth_refresh_and_logout_flow(client, db_session):
     from sqlalchemy import select
 
+    from app.core.security import token_jti
     from app.models.entities.user import RevokedToken
 
     tokens = await register_and_login(client)
@@ -92,7 +93,7 @@ async def test_auth_refresh_and_logout_flow(client, db_session):
     assert replay_refresh_response.status_code == 401
 
     revoked_after_refresh = await db_session.execute(
-        select(RevokedToken).where(RevokedToken.token == tokens["refresh_token"])
+        select(RevokedToken).where(RevokedToken.jti == token_jti(tokens["refresh_token"]))
     )
     revoked_refresh = revoked_after_refresh.scalar_one()
     assert revoked_refresh.token_type == "refresh"
@@ -110,24 +111,137 @@ async def test_auth_refresh_and_logout_flow(client, db_session):
 
     revoked_tokens = await db_session.execute(
         select(RevokedToken).where(
-            RevokedToken.token.in_(
+            RevokedToken.jti.in_(
                 [
-                    tokens["refresh_token"],
-                    refreshed_token,
-                    refreshed_body["refresh_token"],
+                    token_jti(tokens["refresh_token"]),
+                    token_jti(refreshed_token),
+                    token_jti(refreshed_body["refresh_token"]),
                 ]
             )
         )
     )
-    revoked_payloads = {item.token: item.token_type for item in revoked_tokens.scalars().all()}
-    assert revoked_payloads[tokens["refresh_token"]] == "refresh"
-    assert revoked_payloads[refreshed_token] == "access"
-    assert revoked_payloads[refreshed_body["refresh_token"]] == "refresh"
+    revoked_rows = revoked_tokens.scalars().all()
+    revoked_payloads = {item.jti: item.token_type for item in revoked_rows}
+    assert revoked_payloads[token_jti(tokens["refresh_token"])] == "refresh"
+    assert revoked_payloads[token_jti(refreshed_token)] == "access"
+    assert revoked_payloads[token_jti(refreshed_body["refresh_token"])] == "refresh"
+    assert all(item.token is None for item in revoked_rows)
 
     me_after_logout = await client.get("/api/auth/me", headers=refreshed_headers)
     assert me_after_logout.status_code == 401
 
 
+@pytest.mark.asyncio
+async def test_logout_with_forged_token_cannot_revoke_another_session(client, db_session):
+    from jose import jwt
+    from sqlalchemy import func, select
+
+    from app.core.security import token_jti
+    from app.models.entities.user import RevokedToken
+
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    victim_claims = jwt.get_unverified_claims(tokens["access_token"])
+    # Same jti and subject, no expiry, signed with a key the server does not know.
+    forged = jwt.encode(
+        {"sub": victim_claims["sub"], "jti": token_jti(tokens["access_token"]), "type": victim_claims.get("type")},
+        "attacker-controlled-secret",
+        algorithm="HS256",
+    )
+
+    logout_response = await client.post("/api/auth/logout", json={"access_token": forged})
+
+    assert logout_response.status_code == 200
+    assert await db_session.scalar(select(func.count()).select_from(RevokedToken)) == 0
+    assert (await client.get("/api/auth/me", headers=headers)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_authenticated_requests_reuse_cached_user_and_revocation_filter(client):
+    from sqlalchemy import event
+
+    from app.core.database import engine
+
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert (await client.get("/api/auth/me", headers=headers)).status_code == 200
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        me_response = await client.get("/api/auth/me", headers=headers)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    assert me_response.status_code == 200
+    assert not [statement for statement in statements if "users" in statement or "revoked_tokens" in statement]
+
+    update_response = await client.put("/api/auth/me", json={"full_name": "Renamed User"}, headers=headers)
+    assert update_response.status_code == 200
+    assert (await client.get("/api/auth/me", headers=headers)).json()["full_name"] == "Renamed User"
+
+    logout_response = await client.post("/api/auth/logout", json={"access_token": tokens["access_token"]})
+    assert logout_response.status_code == 200
+    assert (await client.get("/api/auth/me", headers=headers)).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_expired_revocations_are_purged_in_batches(db_session, monkeypatch):
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import func, select
+
+    from app.models.entities.user import RevokedToken
+    from app.services.auth_cache import revoked_tokens
+
+    now = datetime.utcnow()
+    db_session.add_all(
+        [RevokedToken(jti=f"expired-{index}", token_type="access", expires_at=now - timedelta(minutes=1)) for index in range(5)]
+        + [
+            RevokedToken(jti="live", token_type="refresh", expires_at=now + timedelta(days=1)),
+            RevokedToken(jti="no-expiry-recent", token_type="access", expires_at=None, created_at=now),
+            RevokedToken(jti="no-expiry-old", token_type="access", expires_at=None, created_at=now - timedelta(days=30)),
+        ]
+    )
+    await db_session.commit()
+    monkeypatch.setattr(revoked_tokens.settings, "REVOKED_TOKEN_PURGE_BATCH_SIZE", 2)
+
+    assert await revoked_tokens.purge_expired() == 6
+    remaining = (await db_session.execute(select(RevokedToken.jti).order_by(RevokedToken.jti))).scalars().all()
+    assert remaining == ["live", "no-expiry-recent"]
+    assert await db_session.scalar(select(func.count()).select_from(RevokedToken)) == 2
+
+
+@pytest.mark.asyncio
+async def test_user_cache_evicts_on_commit_and_revocation_refreshes_count_each_row_once(client, db_session):
+    from app.core.database import AsyncSessionLocal
+    from app.models.entities.user import RevokedToken, User
+    from app.services.auth_cache import auth_user_cache, revoked_tokens
+
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    user_id = (await client.get("/api/auth/me", headers=headers)).json()["id"]
+
+    user = await db_session.get(User, user_id)
+    user.role = "admin"
+    await db_session.flush()
+    # Another request re-caches the row between the flush and the commit.
+    async with AsyncSessionLocal() as other:
+        await auth_user_cache.get(other, user_id)
+    assert auth_user_cache.stats()["entries"] == 1
+    await db_session.commit()
+    assert auth_user_cache.stats()["entries"] == 0
+
+    db_session.add_all([RevokedToken(jti=f"revoked-{index}", token_type="access") for index in range(3)])
+    await db_session.commit()
+    for _ in range(4):
+        await revoked_tokens.refresh(db_session, force=True)
+    assert revoked_tokens.stats()["entries"] == 3
+
+
 @pytest.mark.asyncio
 async def test_model_card_create_sets_manual_origin(client):
     tokens = await register_and_login(client)
@@ -234,6 +348,208 @@ async def test_model_card_search_and_similar(client):
     assert "Vector Similarity" in similar_titles
 
 
+@pytest.mark.asyncio
+async def test_model_card_search_uses_vector_index_shortlist_and_tracks_updates(client, monkeypatch):
+    from app.services.model_os_service import model_os_service
+
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    monkeypatch.setattr(model_os_service.settings, "VECTOR_INDEX_CANDIDATES", 2)
+
+    target = await create_model_card(client, headers, "Vector Search", "semantic retrieval")
+    for title in ("SQL Basics", "Spaced Repetition", "Bayes Rule"):
+        await create_model_card(client, headers, title, f"{title.lower()} notes")
+
+    search_response = await client.get("/api/model-cards/", params={"q": "Vector Search"}, headers=headers)
+    assert search_response.status_code == 200
+    assert search_response.json()[0]["title"] == "Vector Search"
+    assert model_os_service.vector_index.stats()["collections"]["model_card"] == 1
+
+    update_response = await client.put(
+        f"/api/model-cards/{target['id']}",
+        json={"title": "Bayes Rule Revisited", "user_notes": "bayes rule notes"},
+        headers=headers,
+    )
+    assert update_response.status_code == 200
+    updated = update_response.json()
+    hits = model_os_service.vector_index.search(
+        target["user_id"],
+        "model_card",
+        await model_os_service.generate_card_embedding(
+            updated["title"], updated["user_notes"], updated["examples"], updated["counter_examples"]
+        ),
+        1,
+    )
+    assert hits[0][0] == target["id"]
+    assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_model_card_search_embeds_queued_cards_in_one_batch(client, monkeypatch):
+    from app.services.model_os_service import model_os_service
+
+    monkeypatch.setattr(model_os_service.settings, "EMBEDDING_QUEUE_ENABLED", True)
+    monkeypatch.setattr(model_os_service.settings, "VECTOR_INDEX_CANDIDATES", 2)
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    cards = []
+    for title in ("Vector Search", "SQL Basics", "Spaced Repetition", "Bayes Rule"):
+        cards.append(await create_model_card(client, headers, title, f"{title.lower()} notes"))
+
+    batches = []
+    original = model_os_service.embedder.aembed_many
+
+    async def recording_embed(texts):
+        batches.append(list(texts))
+        return await original(texts)
+
+    monkeypatch.setattr(model_os_service.embedder, "aembed_many", recording_embed)
+    search_response = await client.get("/api/model-cards/", params={"q": "Vector Search"}, headers=headers)
+
+    assert search_response.status_code == 200
+    assert search_response.json()[0]["title"] == "Vector Search"
+    # The queue has not embedded the cards yet; search embeds them all at once.
+    card_texts = {
+        model_os_service.build_embedding_text(card["title"], card["user_notes"], card["examples"], card["counter_examples"])
+        for card in cards
+    }
+    card_batches = [batch for batch in batches if card_texts & set(batch)]
+    assert len(card_batches) == 1
+    assert card_texts <= set(card_batches[0])
+
+
+@pytest.mark.asyncio
+async def test_model_card_search_uses_lexical_index_for_cjk_queries(client, db_session):
+    from sqlalchemy import select
+
+    from app.models.entities.user import LexicalPosting
+
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    chinese = await create_model_card(client, headers, "向量检索", "语义搜索的原理")
+    await create_model_card(client, headers, "SQL Basics", "joins and filters")
+
+    search_response = await client.get("/api/model-cards/", params={"q": "向量检索"}, headers=headers)
+    assert search_response.status_code == 200
+    assert [item["title"] for item in search_response.json()] == ["向量检索"]
+
+    update_response = await client.put(
+        f"/api/model-cards/{chinese['id']}",
+        json={"title": "召回率", "user_notes": "阈值权衡"},
+        headers=headers,
+    )
+    assert update_response.status_code == 200
+    postings = await db_session.execute(
+        select(LexicalPosting.token).where(LexicalPosting.entity_id == chinese["id"])
+    )
+    indexed_tokens = set(postings.scalars().all())
+    assert {"召回", "回率", "阈值"} <= indexed_tokens
+    assert "语义" not in indexed_tokens
+
+
+@pytest.mark.asyncio
+async def test_lexical_index_tracks_backfill_markers_and_drops_bulk_deleted_documents(client, db_session):
+    from sqlalchemy import delete, select
+
+    from app.models.entities.user import LexicalDocument, LexicalIndexState, LexicalPosting, ModelCard
+    from app.services.lexical_index import lexical_index
+
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    vector = await create_model_card(client, headers, "Vector Search", "semantic recall")
+    sql = await create_model_card(client, headers, "SQL Basics", "joins and filters")
+    user_id = vector["user_id"]
+
+    # An orphan left behind by a Core write no longer switches the index off.
+    db_session.add(LexicalDocument(user_id=user_id, entity_type="model_card", entity_id="gone", length=1))
+    db_session.add(LexicalPosting(user_id=user_id, entity_type="model_card", entity_id="gone", token="vector", tf=1))
+    await db_session.commit()
+    response = await client.get("/api/model-cards/", params={"q": "Vector"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()[0]["title"] == "Vector Search"
+    assert lexical_index.fallbacks == 0
+
+    await db_session.execute(delete(ModelCard).where(ModelCard.id == sql["id"]))
+    await db_session.commit()
+    remaining = await db_session.execute(select(LexicalDocument.entity_id).where(LexicalDocument.user_id == user_id))
+    assert set(remaining.scalars().all()) == {vector["id"], "gone"}
+
+    # Without a marker the index declines to answer, and says so.
+    await db_session.execute(delete(LexicalIndexState).where(LexicalIndexState.user_id == user_id))
+    await db_session.commit()
+    lexical_index.reset()
+    response = await client.get("/api/model-cards/", params={"q": "Vector"}, headers=headers)
+    assert [item["title"] for item in response.json()] == ["Vector Search"]
+    assert lexical_index.stats()["fallbacks"] == 1
+
+    assert await lexical_index.reindex(db_session, user_id=user_id) == 1
+    await db_session.commit()
+    remaining = await db_session.execute(select(LexicalDocument.entity_id).where(LexicalDocument.user_id == user_id))
+    assert set(remaining.scalars().all()) == {vector["id"]}
+    response = await client.get("/api/model-cards/", params={"q": "Vector"}, headers=headers)
+    assert [item["title"] for item in response.json()] == ["Vector Search"]
+    assert lexical_index.stats()["fallbacks"] == 1
+
+
+@pytest.mark.asyncio
+async def test_model_card_writes_queue_embeddings_and_workers_coalesce_edits(client, db_session, monkeypatch):
+    from sqlalchemy import select
+
+    from app.models.entities.user import EmbeddingJob, ModelCard
+    from app.services.embedding_providers import EmbeddingProviderError
+    from app.services.embedding_queue import embedding_queue
+    from app.services.model_os_service import model_os_service
+
+    monkeypatch.setattr(model_os_service.settings, "EMBEDDING_QUEUE_ENABLED", True)
+    monkeypatch.setattr(model_os_service.settings, "EMBEDDING_QUEUE_DEBOUNCE_SECONDS", 0.0)
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    card = await create_model_card(client, headers, "Queued Card", "embedded later")
+    for title in ("Queued Card v2", "Queued Card v3"):
+        response = await client.put(f"/api/model-cards/{card['id']}", json={"title": title}, headers=headers)
+        assert response.status_code == 200
+
+    jobs = (await db_session.execute(select(EmbeddingJob))).scalars().all()
+    assert [(job.entity_type, job.entity_id) for job in jobs] == [("model_card", card["id"])]
+    stored = await db_session.get(ModelCard, card["id"])
+    assert stored.embedding is None
+    edited_at = stored.updated_at
+
+    async def failing_embed(texts):
+        raise EmbeddingProviderError("provider down")
+
+    monkeypatch.setattr(embedding_queue.embedder, "aembed_many", failing_embed)
+    assert await embedding_queue.process_once() == 0
+    db_session.expire_all()
+    job = (await db_session.execute(select(EmbeddingJob))).scalar_one()
+    assert job.attempts == 1 and job.last_error == "provider down"
+
+    monkeypatch.undo()
+    monkeypatch.setattr(model_os_service.settings, "EMBEDDING_QUEUE_ENABLED", True)
+    job.available_at = job.created_at
+    await db_session.commit()
+    assert await embedding_queue.drain() == 1
+
+    db_session.expire_all()
+    stored = await db_session.get(ModelCard, card["id"])
+    assert stored.embedding == await model_os_service.generate_embedding(model_os_service.card_embedding_text(stored))
+    assert stored.embedding_model == model_os_service.embedding_signature
+    # Background embedding is not a user edit.
+    assert stored.updated_at == edited_at
+    assert (await db_session.execute(select(EmbeddingJob))).scalars().all() == []
+
+    # A job that keeps failing is dropped once it reaches the attempt cap.
+    monkeypatch.setattr(model_os_service.settings, "EMBEDDING_QUEUE_DEBOUNCE_SECONDS", 0.0)
+    monkeypatch.setattr(model_os_service.settings, "EMBEDDING_QUEUE_MAX_ATTEMPTS", 1)
+    monkeypatch.setattr(embedding_queue.embedder, "aembed_many", failing_embed)
+    await create_model_card(client, headers, "Poison Card", "never embeds")
+    assert await embedding_queue.process_once() == 0
+    assert (await db_session.execute(select(EmbeddingJob))).scalars().all() == []
+    assert embedding_queue.stats()["abandoned"] == 1
+
+
 @pytest.mark.asyncio
 async def test_model_card_list_supports_limit_and_offset(client):
     tokens = await register_and_login(client)
@@ -513,6 +829,142 @@ async def test_problem_list_filters_mode_status_and_sort(client):
     assert [item["title"] for item in oldest_response.json()] == ["Problem One", "Problem Two", "Problem Three"]
 
 
+@pytest.mark.asyncio
+async def test_retrieval_context_reuses_candidate_snapshots_until_a_write(client, db_session, monkeypatch):
+    from app.services.model_os_service import model_os_service
+    from app.services.retrieval_candidates import retrieval_candidates
+
+    monkeypatch.setattr(model_os_service.settings, "RETRIEVAL_RESULT_CACHE_TTL_SECONDS", 0)
+
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    me = (await client.get("/api/auth/me", headers=headers)).json()
+
+    card = await create_model_card(client, headers, "Retrieval Signals", "semantic cues and prior knowledge")
+    await create_model_card(client, headers, "Spacing Effect", "distributed practice schedule")
+
+    first = await model_os_service.build_retrieval_context(db_session, me["id"], "semantic cues")
+    assert first.startswith("[Model Card] Retrieval Signals")
+    assert retrieval_candidates.stats()["reloads"] == 3
+
+    second = await model_os_service.build_retrieval_context(db_session, me["id"], "semantic cues")
+    assert second == first
+    assert retrieval_candidates.stats() == {"users": 1, "hits": 3, "reloads": 3}
+
+    update_response = await client.put(
+        f"/api/model-cards/{card['id']}",
+        json={"title": "Retrieval Cues"},
+        headers=headers,
+    )
+    assert update_response.status_code == 200
+    db_session.expire_all()
+    third = await model_os_service.build_retrieval_context(db_session, me["id"], "semantic cues")
+    assert third.startswith("[Model Card] Retrieval Cues")
+    assert retrieval_candidates.stats()["reloads"] == 4
+
+
+@pytest.mark.asyncio
+async def test_retrieval_candidate_snapshots_reload_when_the_queue_embeds_rows(client, db_session, monkeypatch):
+    from app.services.embedding_queue import embedding_queue
+    from app.services.model_os_service import model_os_service
+    from app.services.retrieval_candidates import retrieval_candidates
+
+    monkeypatch.setattr(model_os_service.settings, "EMBEDDING_QUEUE_ENABLED", True)
+    monkeypatch.setattr(model_os_service.settings, "EMBEDDING_QUEUE_DEBOUNCE_SECONDS", 0.0)
+
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    me = (await client.get("/api/auth/me", headers=headers)).json()
+    card = await create_model_card(client, headers, "Retrieval Signals", "semantic cues and prior knowledge")
+
+    before = await retrieval_candidates.load(db_session, me["id"])
+    assert [(row.id, row.embedding) for row in before["model_card"]] == [(card["id"], None)]
+    await db_session.commit()
+
+    assert await embedding_queue.drain() == 1
+    after = await retrieval_candidates.load(db_session, me["id"])
+    assert after["model_card"][0].embedding is not None
+    assert after["model_card"][0].updated_at == before["model_card"][0].updated_at
+    assert retrieval_candidates.stats()["reloads"] == 4
+
+
+@pytest.mark.asyncio
+async def test_retrieval_result_cache_hits_are_logged_and_summarized(client, db_session):
+    from app.services.model_os_service import model_os_service
+
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    me = (await client.get("/api/auth/me", headers=headers)).json()
+    card = await create_model_card(client, headers, "Retrieval Signals", "semantic cues and prior knowledge")
+
+    first = await model_os_service.build_retrieval_context(db_session, me["id"], "Semantic cues", source="ask")
+    second = await model_os_service.build_retrieval_context(db_session, me["id"], "  semantic   CUES ", source="ask")
+    assert second == first
+    await db_session.commit()
+
+    update_response = await client.put(
+        f"/api/model-cards/{card['id']}",
+        json={"title": "Retrieval Cues"},
+        headers=headers,
+    )
+    assert update_response.status_code == 200
+    third = await model_os_service.build_retrieval_context(db_session, me["id"], "semantic cues", source="ask")
+    assert third.startswith("[Model Card] Retrieval Cues")
+    await db_session.commit()
+
+    logs = (await client.get("/api/retrieval/logs", headers=headers)).json()
+    assert sorted(log["cache_hit"] for log in logs) == [False, False, True]
+    summary = (await client.get("/api/retrieval/summary", headers=headers)).json()
+    assert summary["total_events"] == 3
+    assert summary["cache_hits"] == 1
+    assert summary["cache_hit_rate"] == 0.33
+
+
+@pytest.mark.asyncio
+async def test_retrieval_events_are_buffered_truncated_and_bounded(client, db_session, monkeypatch):
+    from sqlalchemy import func, select
+
+    from app.models.entities.user import RetrievalEvent
+    from app.services.event_sink import retrieval_event_sink
+    from app.services.model_os_service import model_os_service
+
+    monkeypatch.setattr(model_os_service.settings, "RETRIEVAL_RESULT_CACHE_TTL_SECONDS", 0)
+    monkeypatch.setattr(model_os_service.settings, "RETRIEVAL_EVENT_CONTEXT_MAX_CHARS", 20)
+    monkeypatch.setattr(model_os_service.settings, "EVENT_SINK_MAX_PENDING", 2)
+
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    me = (await client.get("/api/auth/me", headers=headers)).json()
+    await create_model_card(client, headers, "Retrieval Signals", "semantic cues and prior knowledge")
+
+    # Events of a request that rolls back are never queued.
+    await model_os_service.build_retrieval_context(db_session, me["id"], "semantic cues", source="ask")
+    await db_session.rollback()
+    assert retrieval_event_sink.stats()["submitted"] == 0
+
+    context = await model_os_service.build_retrieval_context(db_session, me["id"], "semantic cues", source="ask")
+    for _ in range(2):
+        await model_os_service.build_retrieval_context(db_session, me["id"], "semantic cues", source="ask")
+    assert retrieval_event_sink.stats()["pending"] == 0
+    await db_session.commit()
+
+    count = await db_session.scalar(select(func.count()).select_from(RetrievalEvent))
+    assert count == 0
+    assert retrieval_event_sink.stats()["pending"] == 2
+    assert retrieval_event_sink.stats()["dropped"] == 1
+
+    assert await retrieval_event_sink.flush() == 2
+    events = (await db_session.execute(select(RetrievalEvent))).scalars().all()
+    assert [event.retrieval_context for event in events] == [context[:20], context[:20]]
+    assert all(event.result_count == 1 and event.cache_hit is False for event in events)
+
+    monkeypatch.setattr(model_os_service.settings, "RETRIEVAL_EVENT_SAMPLE_RATE", 0.0)
+    await model_os_service.build_retrieval_context(db_session, me["id"], "semantic cues", source="ask")
+    await db_session.commit()
+    assert retrieval_event_sink.stats()["sampled_out"] == 1
+    assert retrieval_event_sink.stats()["pending"] == 0
+
+
 @pytest.mark.asyncio
 async def test_retrieval_logs_and_summary(client):
     tokens = await register_and_login(client)
@@ -596,6 +1048,7 @@ async def test_login_rate_limit(client, db_session):
     from sqlalchemy import select
 
     from app.models.entities.user import LoginThrottle
+    from app.services.login_throttle import login_throttle
 
     await register_and_login(client)
 
@@ -612,6 +1065,7 @@ async def test_login_rate_limit(client, db_session):
     )
     assert blocked_response.status_code == 429
 
+    await login_throttle.flush()
     throttle_rows = await db_session.execute(select(LoginThrottle))
     throttles = throttle_rows.scalars().all()
     assert len(throttles) == 3
@@ -619,6 +1073,77 @@ async def test_login_rate_limit(client, db_session):
     assert all(item.blocked_until is not None for item in throttles)
 
 
+@pytest.mark.asyncio
+async def test_login_throttle_counts_in_memory_and_shares_blocks(client, db_session):
+    from sqlalchemy import select
+
+    from app.models.entities.user import LoginThrottle
+    from app.services.login_throttle import LoginThrottleService, login_throttle
+
+    await register_and_login(client)
+
+    for _ in range(2):
+        response = await client.post(
+            "/api/auth/login",
+            data={"username": "tester", "password": "wrong-password"},
+        )
+        assert response.status_code == 401
+
+    assert login_throttle.stats()["pending_writes"] == 3
+    assert (await db_session.execute(select(LoginThrottle))).scalars().all() == []
+
+    # A block raised by another worker reaches this one on its next sync.
+    other_worker = LoginThrottleService()
+    for _ in range(5):
+        other_worker.register_failure(["user:tester"], username="tester", client_ip="10.0.0.9")
+    await other_worker.flush()
+    await login_throttle.flush()
+
+    blocked_response = await client.post(
+        "/api/auth/login",
+        data={"username": "tester", "password": "secret123"},
+    )
+    assert blocked_response.status_code == 429
+
+    throttles = {
+        item.scope_key: item
+        for item in (await db_session.execute(select(LoginThrottle))).scalars().all()
+    }
+    assert len(throttles) == 3
+    assert throttles["user:tester"].blocked_until is not None
+
+
+@pytest.mark.asyncio
+async def test_login_throttle_adds_counts_across_workers_and_propagates_clears():
+    from app.services.login_throttle import LoginThrottleService
+
+    first, second = LoginThrottleService(), LoginThrottleService()
+    keys = ["user:alice"]
+
+    for worker in (first, second, first, second):
+        worker.register_failure(keys, username="alice", client_ip="10.0.0.1")
+    await first.flush()
+    await second.flush()
+    assert not second.is_blocked(keys)
+
+    # Five failures in total across both workers block the key everywhere.
+    first.register_failure(keys, username="alice", client_ip="10.0.0.1")
+    await first.flush()
+    await second.flush()
+    assert first.is_blocked(keys)
+    assert second.is_blocked(keys)
+
+    # A successful login on one worker clears the key on the other.
+    second.clear(keys)
+    await second.flush()
+    await first.flush()
+    assert not first.is_blocked(keys)
+    first.register_failure(keys, username="alice", client_ip="10.0.0.1")
+    await first.flush()
+    assert not first.is_blocked(keys)
+    assert first._states["user:alice"].failed_count == 1
+
+
 @pytest.mark.asyncio
 async def test_reviews_generate_export_and_delete(client):
     tokens = await register_and_login(client)
@@ -905,6 +1430,69 @@ async def test_conversations_and_chat_flow(client, monkeypatch):
     assert missing_response.status_code == 404
 
 
+@pytest.mark.asyncio
+async def test_sqlite_connections_use_wal_and_pool_waits_are_reported(client, db_session):
+    from sqlalchemy import text
+
+    assert (await db_session.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+    assert (await db_session.execute(text("PRAGMA busy_timeout"))).scalar() == 5000
+    assert (await db_session.execute(text("PRAGMA synchronous"))).scalar() == 1
+
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    await promote_user_to_admin(db_session)
+
+    response = await client.get("/api/admin/llm-config/database", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["dialect"] == "sqlite"
+    assert body["pool"] == "MeteredAsyncQueuePool"
+    assert body["checkouts"] > 0
+    assert body["wait_ms"]["p95"] is not None
+
+
+@pytest.mark.asyncio
+async def test_read_endpoints_use_replica_except_right_after_a_write(client, monkeypatch, tmp_path):
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.core import database
+
+    replica_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+    monkeypatch.setattr(
+        database,
+        "ReadSessionLocal",
+        async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False),
+    )
+
+    try:
+        tokens = await register_and_login(client)
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        await create_model_card(client, headers, "Primary Only", "written to the primary")
+
+        # The replica has not caught up, but the writer stays on the primary.
+        sticky_response = await client.get("/api/model-cards/", headers=headers)
+        assert [card["title"] for card in sticky_response.json()] == ["Primary Only"]
+
+        # Another worker has no in-process pin; the signed cookie carries it.
+        database.read_routing.reset()
+        assert database.PRIMARY_READ_COOKIE in client.cookies
+        other_worker_response = await client.get("/api/model-cards/", headers=headers)
+        assert [card["title"] for card in other_worker_response.json()] == ["Primary Only"]
+
+        cookie = client.cookies[database.PRIMARY_READ_COOKIE]
+        assert not database.read_routing.cookie_is_sticky(cookie, "someone-else")
+        assert not database.read_routing.cookie_is_sticky(cookie[:-1] + "x", cookie.split(":")[0])
+
+        client.cookies.clear()
+        replica_response = await client.get("/api/model-cards/", headers=headers)
+        assert replica_response.status_code == 200
+        assert replica_response.json() == []
+    finally:
+        await replica_engine.dispose()
+
+
 @pytest.mark.asyncio
 async def test_admin_users_and_llm_config_flow(client, db_session, monkeypatch):
     import openai
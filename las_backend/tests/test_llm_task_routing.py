@@ -266,3 +266,627 @@ async def test_db_task_route_overrides_env_route(monkeypatch):
         "provider_type": "qwen",
         "model_id": "deepseek-v3.2",
     }
+
+
+@pytest.mark.asyncio
+async def test_task_route_resolution_is_cached_until_invalidated(monkeypatch):
+    from app.services.llm_route_cache import llm_route_cache
+
+    service = ModelOSService()
+
+    async with AsyncSessionLocal() as db:
+        provider = LLMProvider(name="Primary", provider_type="qwen", api_key="k", enabled=True, priority=5)
+        db.add(provider)
+        await db.flush()
+        db.add(
+            SystemSettings(
+                key=LLM_TASK_ROUTES_KEY,
+                value={"interactive": {"provider_id": provider.id, "model_record_id": None}},
+                description="test llm task routes",
+            )
+        )
+        await db.commit()
+
+    loads = []
+    original_load = service._load_route_payloads
+
+    async def counting_load():
+        loads.append(1)
+        return await original_load()
+
+    monkeypatch.setattr(service, "_load_route_payloads", counting_load)
+    hits_before = llm_route_cache.hits
+
+    first = await service.resolve_task_route("interactive")
+    second = await service.resolve_task_route("interactive")
+
+    assert first == second
+    assert first.provider_id == provider.id
+    assert len(loads) == 1
+    assert llm_route_cache.hits == hits_before + 1
+
+    async with AsyncSessionLocal() as db:
+        db_provider = await db.get(LLMProvider, provider.id)
+        db_provider.enabled = False
+        await db.commit()
+
+    assert (await service.resolve_task_route("interactive")).provider_id == provider.id
+
+    llm_route_cache.invalidate()
+    refreshed = await service.resolve_task_route("interactive")
+
+    assert refreshed.provider_id is None
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_structured_lane_responses_are_served_from_response_cache(monkeypatch):
+    service = ModelOSService()
+    monkeypatch.setattr(service.settings, "LLM_STRUCTURED_HEAVY_PROVIDER_TYPE", "qwen")
+    monkeypatch.setattr(service.settings, "LLM_STRUCTURED_HEAVY_MODEL_ID", "deepseek-structured")
+
+    calls = []
+
+    async def fake_generate_structured_json(prompt, json_schema, **kwargs):
+        calls.append(kwargs.get("schema_name"))
+        return {"concepts": ["precision", "recall"]}
+
+    monkeypatch.setattr(service.llm, "generate_structured_json", fake_generate_structured_json)
+    schema = {"type": "object", "properties": {"concepts": {"type": "array"}}}
+
+    first = await service.generate_structured_for_lane(
+        "Extract concepts", schema, schema_name="related_concepts", lane="structured_heavy"
+    )
+    first["concepts"].append("mutated by caller")
+    second = await service.generate_structured_for_lane(
+        "Extract concepts", schema, schema_name="related_concepts", lane="structured_heavy"
+    )
+    bypassed = await service.generate_structured_for_lane(
+        "Extract concepts", schema, schema_name="related_concepts", lane="structured_heavy", bypass_cache=True
+    )
+
+    assert second == {"concepts": ["precision", "recall"]}
+    assert bypassed == second
+    assert calls == ["related_concepts", "related_concepts"]
+
+
+@pytest.mark.asyncio
+async def test_structured_fallback_responses_are_not_cached_under_the_primary_route(monkeypatch):
+    service = ModelOSService()
+    monkeypatch.setattr(service.settings, "LLM_INTERACTIVE_PROVIDER_TYPE", "openai")
+    monkeypatch.setattr(service.settings, "LLM_INTERACTIVE_MODEL_ID", "primary-model")
+    monkeypatch.setattr(service.settings, "LLM_FALLBACK_PROVIDER_TYPE", "qwen")
+    monkeypatch.setattr(service.settings, "LLM_FALLBACK_MODEL_ID", "fallback-model")
+
+    calls = []
+    primary_up = [False]
+
+    async def fake_generate_structured_json(prompt, json_schema, **kwargs):
+        calls.append(kwargs["model_id"])
+        if kwargs["model_id"] == "primary-model" and not primary_up[0]:
+            return None
+        return {"answer": kwargs["model_id"]}
+
+    monkeypatch.setattr(service.llm, "generate_structured_json", fake_generate_structured_json)
+    schema = {"type": "object", "properties": {"answer": {"type": "string"}}}
+
+    degraded = await service.generate_structured_for_lane("q", schema, schema_name="answer")
+    primary_up[0] = True
+    recovered = await service.generate_structured_for_lane("q", schema, schema_name="answer")
+    cached = await service.generate_structured_for_lane("q", schema, schema_name="answer")
+
+    assert degraded == {"answer": "fallback-model"}
+    assert recovered == cached == {"answer": "primary-model"}
+    assert calls == ["primary-model", "fallback-model", "primary-model"]
+
+
+@pytest.mark.asyncio
+async def test_in_memory_response_cache_evicts_lru_and_expired_entries(monkeypatch):
+    from app.services import llm_response_cache as response_cache_module
+    from app.services.llm_response_cache import InMemoryResponseCacheBackend
+
+    now = [1000.0]
+    monkeypatch.setattr(response_cache_module.time, "monotonic", lambda: now[0])
+    backend = InMemoryResponseCacheBackend(max_entries=2)
+
+    await backend.set("a", {"v": 1}, ttl_seconds=60, route_key="r", schema_name="s")
+    await backend.set("b", {"v": 2}, ttl_seconds=60, route_key="r", schema_name="s")
+    assert await backend.get("a") == {"v": 1}
+    await backend.set("c", {"v": 3}, ttl_seconds=5, route_key="r", schema_name="s")
+
+    assert await backend.get("b") is None
+    assert await backend.get("a") == {"v": 1}
+
+    now[0] += 10
+    assert await backend.get("c") is None
+    assert await backend.size() == 1
+
+
+@pytest.mark.asyncio
+async def test_database_response_cache_round_trips_and_expires():
+    from app.services.llm_response_cache import DatabaseResponseCacheBackend
+
+    backend = DatabaseResponseCacheBackend(max_entries=10)
+
+    await backend.set("k1", ["step"], ttl_seconds=60, route_key="1|qwen|m", schema_name="learning_path")
+    await backend.set("k2", {"x": 1}, ttl_seconds=-1, route_key="1|qwen|m", schema_name="model_card")
+
+    assert await backend.get("k1") == ["step"]
+    assert await backend.get("k2") is None
+    assert await backend.size() == 1
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_lane_calls_share_one_upstream_request(monkeypatch):
+    import asyncio
+
+    service = ModelOSService()
+    release = asyncio.Event()
+    calls = []
+
+    async def fake_generate(prompt, provider_type=None, model_id=None, **kwargs):
+        calls.append(prompt)
+        await release.wait()
+        return f"answer to {prompt}"
+
+    monkeypatch.setattr(service.llm, "generate", fake_generate)
+
+    coalesced_before = service.single_flight.coalesced
+    tasks = [
+        asyncio.create_task(service.generate_text_for_lane("Explain recall.", lane="interactive"))
+        for _ in range(3)
+    ]
+    other = asyncio.create_task(service.generate_text_for_lane("Explain precision.", lane="interactive"))
+    while service.single_flight.coalesced - coalesced_before < 2 or len(calls) < 2:
+        await asyncio.sleep(0.01)
+    tasks[0].cancel()
+    release.set()
+
+    results = await asyncio.gather(*tasks[1:], other)
+
+    assert results == ["answer to Explain recall."] * 2 + ["answer to Explain precision."]
+    assert sorted(calls) == ["Explain precision.", "Explain recall."]
+    assert service.single_flight.stats()["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_streams_fan_out_one_upstream_stream(monkeypatch):
+    import asyncio
+
+    service = ModelOSService()
+    release = asyncio.Event()
+    starts = []
+
+    async def fake_stream_generate(messages, **kwargs):
+        starts.append(messages[0]["content"])
+        await release.wait()
+        for token in ["Why ", "does ", "recall ", "rise?"]:
+            await asyncio.sleep(0)
+            yield token
+
+    monkeypatch.setattr(service.llm, "stream_generate", fake_stream_generate)
+
+    async def collect():
+        return [
+            token
+            async for token in service.stream_socratic_question(
+                problem_title="Thresholds",
+                problem_description="Precision vs recall",
+                step_concept="Recall",
+                step_description="Define recall",
+                question_kind="probe",
+            )
+        ]
+
+    coalesced_before = service.single_flight.coalesced
+    pending = asyncio.gather(collect(), collect())
+    while service.single_flight.coalesced == coalesced_before:
+        await asyncio.sleep(0.01)
+    release.set()
+    first, second = await pending
+
+    assert first == second == ["Why ", "does ", "recall ", "rise?"]
+    assert len(starts) == 1
+    assert service.single_flight.stats()["inflight_streams"] == 0
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_skips_primary_route_until_probe_succeeds(monkeypatch, client, db_session):
+    from app.core.security import create_access_token
+    from app.models.entities.user import User
+    from app.services import llm_circuit_breaker as breaker_module
+
+    service = ModelOSService()
+    monkeypatch.setattr(service.settings, "LLM_INTERACTIVE_PROVIDER_TYPE", "openai")
+    monkeypatch.setattr(service.settings, "LLM_INTERACTIVE_MODEL_ID", "primary-model")
+    monkeypatch.setattr(service.settings, "LLM_FALLBACK_PROVIDER_TYPE", "qwen")
+    monkeypatch.setattr(service.settings, "LLM_FALLBACK_MODEL_ID", "fallback-model")
+    monkeypatch.setattr(service.settings, "LLM_BREAKER_MIN_REQUESTS", 2)
+    monkeypatch.setattr(service.settings, "LLM_BREAKER_OPEN_SECONDS", 30)
+
+    now = [1000.0]
+    monkeypatch.setattr(breaker_module.time, "monotonic", lambda: now[0])
+    primary_healthy = [False]
+    calls = []
+
+    async def fake_generate(prompt, provider_type=None, model_id=None, **kwargs):
+        calls.append(model_id)
+        if model_id == "primary-model" and not primary_healthy[0]:
+            return "Error: upstream unavailable"
+        return f"answer from {model_id}"
+
+    monkeypatch.setattr(service.llm, "generate", fake_generate)
+
+    for index in range(2):
+        assert await service.generate_text_for_lane(f"q{index}") == "answer from fallback-model"
+    assert calls == ["primary-model", "fallback-model"] * 2
+
+    calls.clear()
+    assert await service.generate_text_for_lane("q-open") == "answer from fallback-model"
+    assert calls == ["fallback-model"]
+
+    now[0] += 31
+    primary_healthy[0] = True
+    calls.clear()
+    assert await service.generate_text_for_lane("q-probe") == "answer from primary-model"
+    assert calls == ["primary-model"]
+
+    admin = User(email="breaker@example.com", username="breaker-admin", hashed_password="x", role="admin")
+    db_session.add(admin)
+    await db_session.commit()
+    response = await client.get(
+        "/api/admin/llm-config/routes/health",
+        headers={"Authorization": f"Bearer {create_access_token({'sub': admin.id})}"},
+    )
+
+    assert response.status_code == 200
+    payload = response.json()
+    primary_state = next(item for item in payload["routes"] if item["route"] == "|openai|primary-model")
+    assert primary_state["state"] == "closed"
+    assert [event["to_state"] for event in payload["events"]] == ["open", "half_open", "closed"]
+
+
+@pytest.mark.asyncio
+async def test_hedged_interactive_lane_returns_first_good_answer(monkeypatch):
+    import asyncio
+
+    service = ModelOSService()
+    monkeypatch.setattr(service.settings, "LLM_INTERACTIVE_PROVIDER_TYPE", "openai")
+    monkeypatch.setattr(service.settings, "LLM_INTERACTIVE_MODEL_ID", "slow-primary")
+    monkeypatch.setattr(service.settings, "LLM_FALLBACK_PROVIDER_TYPE", "qwen")
+    monkeypatch.setattr(service.settings, "LLM_FALLBACK_MODEL_ID", "fast-fallback")
+    monkeypatch.setattr(service.settings, "LLM_HEDGE_LANES", "interactive")
+    monkeypatch.setattr(service.settings, "LLM_HEDGE_DEFAULT_DELAY_SECONDS", 0.05)
+    monkeypatch.setattr(service.settings, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.01)
+    service.hedging.reset()
+
+    cancelled = []
+
+    async def fake_generate(prompt, provider_type=None, model_id=None, **kwargs):
+        if model_id == "slow-primary":
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(model_id)
+                raise
+            return "late primary answer"
+        return "hedged answer"
+
+    monkeypatch.setattr(service.llm, "generate", fake_generate)
+
+    result = await asyncio.wait_for(service.generate_text_for_lane("Explain recall."), timeout=2)
+
+    assert result == "hedged answer"
+    assert cancelled == ["slow-primary"]
+    assert service.hedging.stats()["lanes"]["interactive"] == {"requests": 1, "fired": 1, "won": 1}
+
+
+@pytest.mark.asyncio
+async def test_hedged_stream_switches_to_fallback_when_first_token_is_late(monkeypatch):
+    import asyncio
+
+    service = ModelOSService()
+    monkeypatch.setattr(service.settings, "LLM_INTERACTIVE_PROVIDER_TYPE", "openai")
+    monkeypatch.setattr(service.settings, "LLM_INTERACTIVE_MODEL_ID", "slow-primary")
+    monkeypatch.setattr(service.settings, "LLM_FALLBACK_PROVIDER_TYPE", "qwen")
+    monkeypatch.setattr(service.settings, "LLM_FALLBACK_MODEL_ID", "fast-fallback")
+    monkeypatch.setattr(service.settings, "LLM_HEDGE_LANES", "interactive")
+    monkeypatch.setattr(service.settings, "LLM_HEDGE_DEFAULT_DELAY_SECONDS", 0.05)
+    monkeypatch.setattr(service.settings, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.01)
+
+    async def fake_stream_generate(messages, model_id=None, **kwargs):
+        if model_id == "slow-primary":
+            await asyncio.sleep(5)
+            yield "late"
+            return
+        for token in ["fast ", "question?"]:
+            yield token
+
+    monkeypatch.setattr(service.llm, "stream_generate", fake_stream_generate)
+
+    tokens = [
+        token
+        async for token in service.stream_socratic_question(
+            problem_title="Thresholds",
+            problem_description="Precision vs recall",
+            step_concept="Recall",
+            step_description="Define recall",
+            question_kind="probe",
+        )
+    ]
+
+    assert tokens == ["fast ", "question?"]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limiter_admits_interactive_lane_before_structured_heavy(monkeypatch):
+    import asyncio
+
+    service = ModelOSService()
+    monkeypatch.setattr(service.settings, "LLM_CONCURRENCY_INITIAL_LIMIT", 1)
+    release_first = asyncio.Event()
+    started = []
+
+    async def fake_generate(prompt, **kwargs):
+        started.append(prompt)
+        if prompt == "first":
+            await release_first.wait()
+        return f"answer to {prompt}"
+
+    monkeypatch.setattr(service.llm, "generate", fake_generate)
+
+    first = asyncio.create_task(service.generate_text_for_lane("first", lane="structured_heavy"))
+    while not started:
+        await asyncio.sleep(0)
+    heavy = asyncio.create_task(service.generate_text_for_lane("heavy", lane="structured_heavy"))
+    while service.concurrency.snapshot()["routes"][0]["queue_depth"] < 1:
+        await asyncio.sleep(0)
+    interactive = asyncio.create_task(service.generate_text_for_lane("interactive", lane="interactive"))
+    while service.concurrency.snapshot()["routes"][0]["queue_depth"] < 2:
+        await asyncio.sleep(0)
+
+    release_first.set()
+    await asyncio.wait_for(asyncio.gather(first, heavy, interactive), timeout=2)
+
+    assert started == ["first", "interactive", "heavy"]
+    snapshot = service.concurrency.snapshot()["routes"][0]
+    assert snapshot["max_queue_depth"] == 2
+    assert snapshot["queued"] == 2
+    assert snapshot["inflight"] == 0
+    assert set(snapshot["lane_wait_ms"]) == {"interactive", "structured_heavy"}
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limiter_backs_off_on_rate_limit_and_honors_retry_after(monkeypatch):
+    from app.services.llm_concurrency import extract_retry_after, format_rate_limit_error, note_rate_limit
+
+    class FakeResponse:
+        status_code = 429
+        headers = {"retry-after": "1.5"}
+
+    class FakeRateLimitError(Exception):
+        response = FakeResponse()
+
+    assert extract_retry_after(FakeRateLimitError()) == 1.5
+    assert extract_retry_after(ValueError("boom")) is None
+
+    service = ModelOSService()
+    monkeypatch.setattr(service.settings, "LLM_CONCURRENCY_INITIAL_LIMIT", 8)
+    outcomes = iter(["rate_limited", "ok", "ok"])
+
+    async def fake_generate(prompt, **kwargs):
+        if next(outcomes) == "rate_limited":
+            note_rate_limit(1.5)
+            return format_rate_limit_error(1.5)
+        return "fine"
+
+    monkeypatch.setattr(service.llm, "generate", fake_generate)
+
+    result = await service.generate_text_for_lane("p1", allow_fallback=False)
+    assert result == "Error: rate limited by provider (retry after 1.5s)"
+    limiter = service.concurrency.get("||")
+    assert limiter.limit == 4
+    assert limiter.rate_limited == 1
+    assert service.concurrency.snapshot()["routes"][0]["blocked_for_seconds"] > 1
+
+    limiter.blocked_until = 0.0
+    assert await service.generate_text_for_lane("p2", allow_fallback=False) == "fine"
+    assert await service.generate_text_for_lane("p3", allow_fallback=False) == "fine"
+    assert limiter.limit == pytest.approx(4.25 + 1 / 4.25)
+
+    # A slot restores the caller's context, so a 429 noted after it closes is
+    # not charged to a call that already finished.
+    from app.services.llm_concurrency import _rate_limit_signals
+
+    monkeypatch.setattr(service.settings, "LLM_CONCURRENCY_ENABLED", True)
+    async with service.concurrency.slot("||", "interactive") as outcome:
+        outcome.succeeded = True
+    assert _rate_limit_signals.get() is None
+
+
+@pytest.mark.asyncio
+async def test_resilient_learning_path_discards_a_stream_cut_short_by_the_deadline(monkeypatch):
+    import asyncio
+
+    from app.services.llm_partial_json import StructuredPartial
+
+    service = ModelOSService()
+    step = {"step": 1, "concept": "Precision", "description": "Define precision", "resources": []}
+
+    async def fake_stream_structured_json(prompt, json_schema, *, schema_name, **kwargs):
+        assert schema_name == "learning_path"
+        yield StructuredPartial([], False)
+        yield StructuredPartial([step], False)
+        yield StructuredPartial([step, {**step, "step": 2, "concept": "Recall"}], False)
+        await asyncio.sleep(10)
+
+    async def unexpected_generate_learning_path(**kwargs):
+        raise AssertionError("no time is left for the non-streamed path")
+
+    monkeypatch.setattr(service.llm, "stream_structured_json", fake_stream_structured_json)
+    monkeypatch.setattr(service, "generate_learning_path", unexpected_generate_learning_path)
+    staged = []
+
+    async def on_partial(steps):
+        staged.append([item["concept"] for item in steps])
+
+    path = await asyncio.wait_for(
+        service.generate_learning_path_resilient(
+            problem_title="Metrics",
+            problem_description="Precision vs recall",
+            existing_knowledge=[],
+            timeout_seconds=1,
+            on_partial=on_partial,
+        ),
+        timeout=3,
+    )
+
+    assert staged == [["Precision"], ["Precision", "Recall"]]
+    assert path == service._build_fallback_learning_path(
+        problem_title="Metrics",
+        problem_description="Precision vs recall",
+        existing_knowledge=[],
+        associated_concepts=None,
+    )
+
+    async def failing_on_partial(steps):
+        raise RuntimeError("staging failed")
+
+    with pytest.raises(RuntimeError, match="staging failed"):
+        await service.generate_learning_path_resilient(
+            problem_title="Metrics",
+            problem_description="Precision vs recall",
+            existing_knowledge=[],
+            timeout_seconds=1,
+            on_partial=failing_on_partial,
+        )
+
+
+@pytest.mark.asyncio
+async def test_streamed_learning_path_is_cached_only_when_complete(monkeypatch):
+    from app.services.llm_partial_json import StructuredPartial
+
+    service = ModelOSService()
+    monkeypatch.setattr(service.settings, "LLM_STRUCTURED_HEAVY_PROVIDER_TYPE", "openai")
+    monkeypatch.setattr(service.settings, "LLM_STRUCTURED_HEAVY_MODEL_ID", "heavy-model")
+    step = {"step": 1, "concept": "Precision", "description": "Define precision", "resources": []}
+    full = [step, {**step, "step": 2, "concept": "Recall"}]
+    streams = []
+
+    async def fake_stream_structured_json(prompt, json_schema, *, schema_name, **kwargs):
+        streams.append(schema_name)
+        yield StructuredPartial([step], False)
+        yield StructuredPartial(full, True)
+
+    async def noop(steps):
+        return None
+
+    monkeypatch.setattr(service.llm, "stream_structured_json", fake_stream_structured_json)
+    kwargs = dict(problem_title="Metrics", problem_description="Precision vs recall", existing_knowledge=[])
+
+    first = await service.generate_learning_path_resilient(**kwargs, on_partial=noop)
+    second = await service.generate_learning_path_resilient(**kwargs, on_partial=noop)
+
+    assert [item["concept"] for item in first] == ["Precision", "Recall"]
+    assert second == first
+    assert streams == ["learning_path"]
+    assert service.breakers.get("|openai|heavy-model").snapshot()["state"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_failing_token_streams_open_the_route_breaker(monkeypatch):
+    service = ModelOSService()
+    monkeypatch.setattr(service.settings, "LLM_INTERACTIVE_PROVIDER_TYPE", "openai")
+    monkeypatch.setattr(service.settings, "LLM_INTERACTIVE_MODEL_ID", "primary-model")
+    monkeypatch.setattr(service.settings, "LLM_BREAKER_MIN_REQUESTS", 2)
+    monkeypatch.setattr(service.settings, "LLM_SINGLE_FLIGHT_ENABLED", False)
+    starts = []
+
+    async def fake_stream_generate_with_context(**kwargs):
+        starts.append(kwargs["model_id"])
+        yield "Error: upstream unavailable"
+
+    monkeypatch.setattr(service.llm, "stream_generate_with_context", fake_stream_generate_with_context)
+
+    for index in range(2):
+        tokens = [token async for token in service.stream_generate_with_context(f"q{index}", [])]
+        assert tokens == ["Error: upstream unavailable"]
+    assert service.breakers.is_open("|openai|primary-model")
+
+    tokens = [token async for token in service.stream_generate_with_context("q-open", [])]
+    assert tokens == ["Error: circuit open for route |openai|primary-model"]
+    assert starts == ["primary-model", "primary-model"]
+
+
+@pytest.mark.asyncio
+async def test_llm_call_metrics_record_usage_and_fallback_and_aggregate_per_lane(monkeypatch, client, db_session):
+    from types import SimpleNamespace
+
+    from app.core.security import create_access_token
+    from app.models.entities.user import User
+
+    service = ModelOSService()
+    monkeypatch.setattr(service.settings, "LLM_INTERACTIVE_PROVIDER_TYPE", "openai")
+    monkeypatch.setattr(service.settings, "LLM_INTERACTIVE_MODEL_ID", "primary-model")
+    monkeypatch.setattr(service.settings, "LLM_FALLBACK_PROVIDER_TYPE", "qwen")
+    monkeypatch.setattr(service.settings, "LLM_FALLBACK_MODEL_ID", "fallback-model")
+    monkeypatch.setattr(
+        service.settings,
+        "LLM_MODEL_PRICES_JSON",
+        '{"fallback-model": {"prompt": 1.0, "completion": 2.0}}',
+    )
+    service.call_metrics.reset()
+
+    async def fake_resolve(provider_type=None, provider_id=None, model_id=None):
+        return SimpleNamespace(id=1 if provider_type == "openai" else 2, provider_type=provider_type, base_url=None), model_id
+
+    class FakeCompletions:
+        async def create(self, model, messages, temperature, timeout):
+            content = "" if model == "primary-model" else "fallback answer"
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+                usage=SimpleNamespace(prompt_tokens=100, completion_tokens=50),
+            )
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    monkeypatch.setattr(service.llm, "generate", type(service.llm).generate.__get__(service.llm))
+    monkeypatch.setattr(service.llm, "_resolve_provider_and_model_cached", fake_resolve)
+    monkeypatch.setattr(service.llm.clients, "get_openai_client", lambda provider, base_url: fake_client)
+
+    assert await service.generate_text_for_lane("Explain recall.") == "fallback answer"
+
+    primary, fallback = service.call_metrics.recent()
+    assert (primary.lane, primary.model_id, primary.status, primary.fallback_reason) == (
+        "interactive",
+        "primary-model",
+        "error",
+        None,
+    )
+    assert (fallback.lane, fallback.model_id, fallback.status, fallback.fallback_reason) == (
+        "interactive",
+        "fallback-model",
+        "ok",
+        "primary_error",
+    )
+    assert (fallback.prompt_tokens, fallback.completion_tokens) == (100, 50)
+    assert fallback.cost_usd == pytest.approx(0.2)
+
+    admin = User(email="metrics@example.com", username="metrics-admin", hashed_password="x", role="admin")
+    db_session.add(admin)
+    await db_session.commit()
+    response = await client.get(
+        "/api/admin/llm-config/metrics/calls",
+        headers={"Authorization": f"Bearer {create_access_token({'sub': admin.id})}"},
+    )
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["buffer"]["pending"] == 0
+    assert payload["buffer"]["flushed"] == 2
+    interactive = payload["lanes"]["interactive"]
+    assert interactive["calls"] == 2
+    assert interactive["errors"] == 1
+    assert interactive["fallbacks"] == 1
+    assert interactive["total_tokens"] == 300
+    assert interactive["cost_usd"] == pytest.approx(0.2)
+    assert interactive["latency_ms"]["p99"] is not None
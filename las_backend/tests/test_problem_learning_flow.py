@@ -37,6 +37,53 @@ async def create_problem(client, headers, title="Learning Loop", description="Ne
     return response.json()
 
 
+@pytest.mark.asyncio
+async def test_problem_creation_persists_streamed_learning_path_prefix_before_generation_finishes(client, monkeypatch):
+    from app.core.database import AsyncSessionLocal
+    from app.models.entities.user import LearningPath
+    from app.services.llm_partial_json import StructuredPartial
+    from app.services.model_os_service import model_os_service
+
+    tokens = await register_and_login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    steps = [
+        {"step": index, "concept": concept, "description": f"Learn {concept}", "resources": []}
+        for index, concept in enumerate(["precision", "recall", "threshold"], start=1)
+    ]
+    seen_mid_stream = []
+
+    async def persisted_concepts():
+        async with AsyncSessionLocal() as session:
+            paths = (await session.execute(select(LearningPath))).scalars().all()
+            return [[step["concept"] for step in path.path_data] for path in paths]
+
+    async def fake_stream_structured_json(prompt, json_schema, *, schema_name, **kwargs):
+        for count in range(1, len(steps) + 1):
+            yield StructuredPartial(steps[:count], False)
+            # Give the route a moment to commit before the stream moves on.
+            for _ in range(50):
+                persisted = await persisted_concepts()
+                if persisted and len(persisted[0]) == count - 1:
+                    break
+                await asyncio.sleep(0.01)
+            seen_mid_stream.append(persisted)
+        yield StructuredPartial(steps, True)
+
+    async def fixed_problem_concepts(*args, **kwargs):
+        return ["precision", "recall"]
+
+    monkeypatch.setattr(model_os_service.llm, "stream_structured_json", fake_stream_structured_json)
+    monkeypatch.setattr(model_os_service, "build_problem_concepts_resilient", fixed_problem_concepts)
+
+    problem = await create_problem(client, headers, title="Streamed Path")
+
+    # Finished steps are committed while the last one is still streaming.
+    assert seen_mid_stream == [[], [["precision"]], [["precision", "recall"]]]
+    assert await persisted_concepts() == [["precision", "recall", "threshold"]]
+    path_response = await client.get(f"/api/problems/{problem['id']}/learning-path", headers=headers)
+    assert [step["concept"] for step in path_response.json()["path_data"]] == ["precision", "recall", "threshold"]
+
+
 @pytest.mark.asyncio
 async def test_problem_creation_fallback_learning_path_prioritizes_associated_concepts(client, monkeypatch):
     from app.services.model_os_service import model_os_service
@@ -87,6 +134,7 @@ async def test_problem_creation_fallback_learning_path_prioritizes_associated_co
 @pytest.mark.asyncio
 async def test_problem_response_records_mastery_and_events(client, db_session):
     from app.models.entities.user import LearningEvent, ProblemMasteryEvent
+    from app.services.event_sink import learning_event_sink
 
     tokens = await register_and_login(client)
     headers = {"Authorization": f"Bearer {tokens['access_token']}"}
@@ -114,6 +162,7 @@ async def test_problem_response_records_mastery_and_events(client, db_session):
     assert len(mastery_events) == 1
     assert mastery_events[0].mastery_score >= 0
 
+    await learning_event_sink.flush()
     event_result = await db_session.execute(
         select(LearningEvent).where(
             LearningEvent.problem_id == problem["id"],
@@ -1100,6 +1149,7 @@ async def test_problem_concept_candidates_accept_and_rollback(client, monkeypatc
 @pytest.mark.asyncio
 async def test_problem_ask_updates_candidates_and_logs_event(client, db_session, monkeypatch):
     from app.models.entities.user import LearningEvent
+    from app.services.event_sink import learning_event_sink
     from app.services.model_os_service import model_os_service
 
     tokens = await register_and_login(client)
@@ -1128,6 +1178,7 @@ async def test_problem_ask_updates_candidates_and_logs_event(client, db_session,
         or "Clarifying Question Pattern" in ask_body["accepted_concepts"]
     )
 
+    await learning_event_sink.flush()
     events_result = await db_session.execute(
         select(LearningEvent).where(
             LearningEvent.problem_id == problem["id"],
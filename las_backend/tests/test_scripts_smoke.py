@@ -66,6 +66,45 @@ async def test_backfill_embeddings_script_populates_all_supported_entities(db_se
     assert len(resource.embedding) == 64
 
 
+@pytest.mark.asyncio
+async def test_backfill_embeddings_script_upgrades_stale_cjk_embeddings(db_session):
+    from app.services.model_os_service import model_os_service
+
+    user = User(
+        email="reembed@example.com",
+        username="reembedder",
+        hashed_password="hashed",
+    )
+    db_session.add(user)
+    await db_session.flush()
+
+    english = ModelCard(user_id=user.id, title="Vector Search", user_notes="semantic retrieval", examples=[])
+    await model_os_service.refresh_card_embedding(english)
+    chinese = ModelCard(
+        user_id=user.id,
+        title="向量检索",
+        user_notes="语义搜索的原理",
+        examples=[],
+        embedding=[0.0] * 64,
+    )
+    db_session.add_all([english, chinese])
+    await db_session.commit()
+    english_updated_at = english.updated_at
+
+    module = load_module(
+        "backfill_model_card_embeddings",
+        Path(__file__).resolve().parents[1] / "scripts" / "backfill_model_card_embeddings.py",
+    )
+    counts = await module.main(chunk_size=1)
+
+    assert counts == {"model_card": 1, "problem": 0, "resource": 0}
+    await db_session.refresh(english)
+    await db_session.refresh(chinese)
+
+    assert any(chinese.embedding)
+    assert english.updated_at == english_updated_at
+
+
 @pytest.mark.asyncio
 async def test_sqlite_migration_script_copies_core_rows(tmp_path, monkeypatch):
     source_db = tmp_path / "source.db"
@@ -214,7 +214,8 @@ def test_build_concept_evidence_snippet_preserves_long_answers_without_mid_sente
     assert not snippet.endswith("...")
 
 
-def test_model_os_rank_model_cards_prefers_direct_match():
+@pytest.mark.asyncio
+async def test_model_os_rank_model_cards_prefers_direct_match():
     from app.services.model_os_service import model_os_service
 
     now = datetime.utcnow()
@@ -258,7 +259,7 @@ def test_model_os_rank_model_cards_prefers_direct_match():
         },
     )()
 
-    ranked = model_os_service.rank_model_cards(
+    ranked = await model_os_service.rank_model_cards(
         [unrelated, partial, direct],
         "vector threshold",
     )
@@ -268,6 +269,177 @@ def test_model_os_rank_model_cards_prefers_direct_match():
     assert all(card.title != "SQL Basics" for card in ranked)
 
 
+@pytest.mark.asyncio
+async def test_cjk_tokenizer_feeds_embeddings_and_chinese_ranking():
+    from app.models.entities.user import ModelCard
+    from app.services.model_os_service import model_os_service
+    from app.services.model_os_structured_support import tokenize_embedding_text, tokenize_text
+
+    assert tokenize_text("PID 控制器") == ["pid", "控制", "制器"]
+    assert tokenize_embedding_text("控制器") == ["控制", "制器", "控制器"]
+    assert tokenize_text("向") == ["向"]
+    assert any(await model_os_service.generate_embedding("向量检索的原理"))
+    assert model_os_service._hint_similarity("先调比例增益", "先调比例") > 0.5
+
+    cards = [
+        ModelCard(id="sql", user_id="u", title="SQL 基础", user_notes="连接与过滤", examples=[]),
+        ModelCard(id="vector", user_id="u", title="向量检索", user_notes="语义搜索的原理", examples=[]),
+    ]
+    ranked = await model_os_service.rank_model_cards(cards, "语义检索")
+    assert [card.id for card in ranked] == ["vector"]
+
+
+@pytest.mark.asyncio
+async def test_openai_embedding_provider_batches_and_caches_by_content(monkeypatch):
+    import json
+
+    import httpx
+
+    from app.models.entities.user import ModelCard
+    from app.services.embedding_providers import Embedder, OpenAICompatibleEmbeddingProvider
+    from app.services.llm_client_pool import llm_client_pool
+    from app.services.model_os_service import model_os_service
+
+    requests = []
+
+    def handler(request):
+        payload = json.loads(request.content)
+        requests.append(payload)
+        if payload["input"] == ["boom"]:
+            return httpx.Response(503)
+        return httpx.Response(
+            200,
+            json={
+                "data": [
+                    {"index": index, "embedding": [float(len(text)), 1.0, 0.0, 0.0]}
+                    for index, text in enumerate(payload["input"])
+                ]
+            },
+        )
+
+    provider = OpenAICompatibleEmbeddingProvider(
+        4,
+        base_url="https://embeddings.example/v1/",
+        api_key="sk-test",
+        model="text-embedding-3-small",
+        batch_size=2,
+    )
+    provider._client = httpx.Client(transport=httpx.MockTransport(handler))
+    embedder = Embedder(provider)
+
+    vectors = embedder.embed_many(["alpha", "beta", "alpha", "gamma"])
+    assert [payload["input"] for payload in requests] == [["alpha", "beta"], ["gamma"]]
+    assert requests[0]["dimensions"] == 4 and requests[0]["model"] == "text-embedding-3-small"
+    assert vectors[0] == vectors[2]
+    assert abs(sum(value * value for value in vectors[1]) - 1.0) < 1e-6
+
+    embedder.embed_many(["beta", "gamma"])
+    assert len(requests) == 2
+    assert embedder.stats()["cache"]["hits"] == 2
+
+    # Request handlers go through the pooled async client.
+    async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(llm_client_pool, "get_embedding_client", lambda *args: async_client)
+    assert (await embedder.aembed_many(["delta", "alpha"]))[1] == vectors[0]
+    assert requests[-1]["input"] == ["delta"]
+
+    monkeypatch.setattr(model_os_service, "embedder", embedder)
+    assert await model_os_service.generate_embedding("boom") == [0.0] * model_os_service.embedding_dimensions
+    card = ModelCard(title="boom", examples=[], counter_examples=[])
+    monkeypatch.setattr(model_os_service, "card_embedding_text", lambda item: "boom")
+    assert await model_os_service.refresh_card_embedding(card) is None
+    assert card.embedding_model is None
+
+    monkeypatch.setattr(model_os_service, "card_embedding_text", lambda item: "alpha")
+    await model_os_service.refresh_card_embedding(card)
+    assert card.embedding_model == "openai:text-embedding-3-small:4"
+    await async_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_vectorized_ranking_matches_scalar_ranking(monkeypatch):
+    from app.services.model_os_service import model_os_service
+
+    now = datetime.utcnow()
+    topics = ["vector threshold", "recall boundary", "向量检索 语义", "SQL joins", "threshold sweep notes"]
+    cards = []
+    for index in range(40):
+        topic = topics[index % len(topics)]
+        card = type("Card", (), {})()
+        card.title = f"{topic} {index}"
+        card.user_notes = f"notes about {topics[(index * 3) % len(topics)]}"
+        card.examples = [topic]
+        card.counter_examples = []
+        card.embedding = await model_os_service.generate_embedding(card.title) if index % 2 else None
+        card.updated_at = now - timedelta(minutes=index)
+        card.created_at = card.updated_at
+        cards.append(card)
+
+    for query in ("vector threshold", "向量检索", "boundary"):
+        monkeypatch.setattr(model_os_service.settings, "MODEL_OS_VECTORIZED_SCORING_ENABLED", False)
+        scalar = await model_os_service.rank_model_cards(cards, query)
+        monkeypatch.setattr(model_os_service.settings, "MODEL_OS_VECTORIZED_SCORING_ENABLED", True)
+        vectorized = await model_os_service.rank_model_cards(cards, query)
+        assert scalar
+        assert [card.title for card in vectorized] == [card.title for card in scalar]
+
+    texts = [model_os_service.build_embedding_text(card.title, card.user_notes, card.examples) for card in cards]
+    query_embedding = await model_os_service.generate_embedding("vector threshold")
+    embeddings = await model_os_service.embedding_lookup(texts)
+    scores = model_os_service.vector_scorer.score(
+        texts, [card.embedding for card in cards], "vector threshold", query_embedding, embeddings
+    )
+    for card, score in zip(cards, scores):
+        expected = model_os_service.score_model_card(card, "vector threshold", query_embedding, embeddings)
+        assert score == pytest.approx(expected, abs=1e-6)
+
+
+@pytest.mark.asyncio
+async def test_ranking_mixed_embedded_and_unembedded_cards_matches_per_row_embedding(monkeypatch):
+    from app.services import model_os_embedding_support as embedding_support
+    from app.services.model_os_service import model_os_service
+
+    now = datetime.utcnow()
+    topics = ["vector threshold", "recall boundary", "向量检索 语义", "SQL joins", "threshold sweep notes"]
+    cards = []
+    for index in range(30):
+        topic = topics[index % len(topics)]
+        card = type("Card", (), {})()
+        card.title = f"{topic} {index}"
+        card.user_notes = f"notes about {topics[(index * 2) % len(topics)]}"
+        card.examples = [topic]
+        card.counter_examples = []
+        card.updated_at = now - timedelta(minutes=index)
+        card.created_at = card.updated_at
+        text = model_os_service.card_embedding_text(card)
+        card.embedding = await model_os_service.generate_embedding(text) if index % 3 == 0 else None
+        cards.append(card)
+
+    batches = []
+    original = model_os_service.embedder.aembed_many
+
+    async def recording_embed(texts):
+        batches.append(list(texts))
+        return await original(texts)
+
+    monkeypatch.setattr(model_os_service.embedder, "aembed_many", recording_embed)
+    for query in ("vector threshold", "向量检索", "boundary"):
+        # Before vectorized scoring, every row without a stored embedding was
+        # embedded on the fly while it was scored.
+        expected = embedding_support.rank_model_cards(
+            cards,
+            query,
+            tokenize_text=model_os_service._tokenize_text,
+            generate_embedding_fn=model_os_service.embedder.embed,
+        )
+        for vectorized in (False, True):
+            monkeypatch.setattr(model_os_service.settings, "MODEL_OS_VECTORIZED_SCORING_ENABLED", vectorized)
+            batches.clear()
+            ranked = await model_os_service.rank_model_cards(cards, query)
+            assert [card.title for card in ranked] == [card.title for card in expected]
+            assert len(batches) == 1
+
+
 @pytest.mark.asyncio
 async def test_srs_service_schedule_calculation():
     """Test SRS interval calculation"""
@@ -336,12 +508,12 @@ async def test_llm_service_generate_respects_wait_for_with_blocking_provider(mon
     default_model = type("Model", (), {"model_id": "qwen-plus"})()
 
     class SlowOpenAI:
-        def __init__(self, api_key, base_url=None):
+        def __init__(self, api_key, base_url=None, **kwargs):
             self.chat = self
             self.completions = self
 
-        def create(self, model, messages, temperature, timeout):
-            time.sleep(0.2)
+        async def create(self, model, messages, temperature, timeout):
+            await asyncio.sleep(0.2)
             message = type("Message", (), {"content": "late"})()
             choice = type("Choice", (), {"message": message})()
             return type("Response", (), {"choices": [choice]})()
@@ -352,10 +524,11 @@ async def test_llm_service_generate_respects_wait_for_with_blocking_provider(mon
     async def fake_get_default_model(db, provider_id):
         return default_model
 
+    await llm_service.clients.invalidate()
     # tests/conftest.py autouse-stubs model_os_service.llm.generate; restore the real
     # implementation here so this regression actually exercises wait_for cancellation.
     monkeypatch.setattr(llm_service, "generate", LLMService.generate.__get__(llm_service, LLMService))
-    monkeypatch.setattr(openai, "OpenAI", SlowOpenAI)
+    monkeypatch.setattr(openai, "AsyncOpenAI", SlowOpenAI)
     monkeypatch.setattr(llm_service, "_get_active_provider", fake_get_active_provider)
     monkeypatch.setattr(llm_service, "_get_default_model", fake_get_default_model)
 
@@ -384,11 +557,11 @@ async def test_llm_service_generate_structured_json_uses_openai_json_schema(monk
     default_model = type("Model", (), {"model_id": "qwen-plus"})()
 
     class StructuredOpenAI:
-        def __init__(self, api_key, base_url=None):
+        def __init__(self, api_key, base_url=None, **kwargs):
             self.chat = self
             self.completions = self
 
-        def create(self, model, messages, temperature, response_format, timeout):
+        async def create(self, model, messages, temperature, response_format, timeout):
             assert model == "qwen-plus"
             assert temperature == 0
             assert response_format["type"] == "json_schema"
@@ -404,8 +577,9 @@ async def test_llm_service_generate_structured_json_uses_openai_json_schema(monk
     async def fake_get_default_model(db, provider_id):
         return default_model
 
+    await llm_service.clients.invalidate()
     monkeypatch.setattr(llm_service, "generate_structured_json", LLMService.generate_structured_json.__get__(llm_service, LLMService))
-    monkeypatch.setattr(openai, "OpenAI", StructuredOpenAI)
+    monkeypatch.setattr(openai, "AsyncOpenAI", StructuredOpenAI)
     monkeypatch.setattr(llm_service, "_get_active_provider", fake_get_active_provider)
     monkeypatch.setattr(llm_service, "_get_default_model", fake_get_default_model)
 
@@ -417,3 +591,271 @@ async def test_llm_service_generate_structured_json_uses_openai_json_schema(monk
     )
 
     assert result == {"correctness": "correct"}
+
+
+@pytest.mark.asyncio
+async def test_llm_client_pool_reuses_clients_until_provider_invalidated(monkeypatch):
+    from app.services.llm_client_pool import LLMClientPool
+    import openai
+
+    created = []
+
+    class FakeAsyncOpenAI:
+        def __init__(self, api_key, base_url=None, **kwargs):
+            created.append((api_key, base_url))
+            self.closed = False
+
+        async def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(openai, "AsyncOpenAI", FakeAsyncOpenAI)
+    pool = LLMClientPool()
+    provider = type("Provider", (), {"id": 7, "provider_type": "qwen", "api_key": "k1", "base_url": None})()
+    other = type("Provider", (), {"id": 8, "provider_type": "openai", "api_key": "k2", "base_url": None})()
+
+    first = pool.get_openai_client(provider, "https://example.test/v1")
+    second = pool.get_openai_client(provider, "https://example.test/v1")
+    other_client = pool.get_openai_client(other, None)
+
+    assert first is second
+    assert len(created) == 2
+
+    assert await pool.invalidate(7) == 1
+    assert first.closed is True
+    assert other_client.closed is False
+
+    third = pool.get_openai_client(provider, "https://example.test/v1")
+    assert third is not first
+    assert len(created) == 3
+
+    # A client from another loop is replaced and closed, not leaked.
+    idle_loop = asyncio.new_event_loop()
+    next(entry for entry in pool._clients.values() if entry.client is third).loop = idle_loop
+    fourth = pool.get_openai_client(provider, "https://example.test/v1")
+    assert fourth is not third
+    await asyncio.sleep(0)
+    assert third.closed is True
+    idle_loop.close()
+
+    import threading
+
+    running_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=running_loop.run_forever, daemon=True)
+    thread.start()
+    next(entry for entry in pool._clients.values() if entry.client is fourth).loop = running_loop
+    fifth = pool.get_openai_client(provider, "https://example.test/v1")
+    assert fifth is not fourth
+    for _ in range(50):
+        if fourth.closed:
+            break
+        await asyncio.sleep(0.01)
+    assert fourth.closed is True
+    running_loop.call_soon_threadsafe(running_loop.stop)
+    thread.join()
+    running_loop.close()
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_llm_service_streams_ollama_chat_and_partial_structured_json(monkeypatch):
+    import json
+    import httpx
+    from app.services.llm_service import llm_service
+
+    provider = type("Provider", (), {"id": 3, "provider_type": "ollama", "api_key": None, "base_url": None})()
+    requests = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        requests.append(body)
+        if "format" in body:
+            pieces = ['[{"step": 1, "concept": "Precision", ', '"description": "d", "resources": []}, ', '{"step": 2, "con', 'cept": "Recall", "description": "d", "resources": []}]']
+        else:
+            pieces = ["Hello", " there"]
+        lines = [json.dumps({"message": {"content": piece}, "done": False}) for piece in pieces]
+        lines.append(json.dumps({"message": {"content": ""}, "done": True}))
+        return httpx.Response(200, text="\n".join(lines) + "\n")
+
+    client = httpx.AsyncClient(base_url="http://ollama.test", transport=httpx.MockTransport(handler))
+
+    async def fake_resolve(provider_type=None, provider_id=None, model_id=None):
+        return provider, "llama3"
+
+    monkeypatch.setattr(llm_service, "_resolve_provider_and_model_cached", fake_resolve)
+    monkeypatch.setattr(llm_service.clients, "get_ollama_client", lambda _provider: client)
+
+    tokens = [token async for token in llm_service.stream_generate([{"role": "user", "content": "hi"}])]
+    assert tokens == ["Hello", " there"]
+    assert requests[0]["stream"] is True
+    assert requests[0]["messages"] == [{"role": "user", "content": "hi"}]
+
+    partials = [
+        partial
+        async for partial in llm_service.stream_structured_json("path please", {"type": "array"}, schema_name="learning_path")
+    ]
+    assert [[step["concept"] for step in partial.value] for partial in partials] == [[], ["Precision"], ["Precision", "Recall"]]
+    assert [partial.complete for partial in partials] == [False, False, True]
+    assert requests[1]["format"] == {"type": "array"}
+    await client.aclose()
+
+
+def test_context_budget_keeps_recent_turns_summarizes_older_and_caps_retrieval(monkeypatch):
+    from app.services.llm_context_budget import (
+        ContextBudgetBuilder,
+        RetrievalContext,
+        RetrievalSection,
+        estimate_tokens,
+    )
+
+    builder = ContextBudgetBuilder()
+    monkeypatch.setattr(builder.settings, "LLM_CONTEXT_RECENT_TURNS", 2)
+    monkeypatch.setattr(builder.settings, "LLM_CONTEXT_RETRIEVAL_MAX_TOKENS", 30)
+
+    assert estimate_tokens("向量检索") == 4
+    assert estimate_tokens("abcdefgh") == 2
+
+    history = [
+        {"role": "user" if index % 2 == 0 else "assistant", "content": f"Turn {index} says something. More detail."}
+        for index in range(8)
+    ]
+    retrieval = RetrievalContext(
+        "low\n\nhigh",
+        sections=[
+            RetrievalSection(text="[Problem] low " + "x" * 150, score=0.1),
+            RetrievalSection(text="[Model Card] high", score=0.9),
+        ],
+    )
+
+    built = builder.build("What next?", history, retrieval, language_instruction="Answer in English.")
+
+    assert built.recent_turns == 2
+    assert built.summarized_turns == 6
+    assert "user: Turn 6 says something. More detail." in built.prompt
+    assert "Earlier conversation (summary):\nuser: Turn 0 says something." in built.prompt
+    assert "More detail" not in built.prompt.split("Earlier conversation (summary):")[1].split("user: Turn 6")[0]
+    assert "[Model Card] high" in built.prompt
+    assert "[Problem] low" not in built.prompt
+    assert built.dropped_retrieval_sections == 1
+    assert built.token_counts["retrieval"] == estimate_tokens("[Model Card] high")
+    assert set(built.token_counts) >= {"summary", "recent_turns", "retrieval", "question", "total"}
+
+    # The next turn only folds the newly aged-out turns onto the cached summary.
+    builder.build("And then?", history + [{"role": "user", "content": "And then?"}], None)
+    assert builder.summary_cache_hits == 1
+    assert builder.stats()["builds"] == 2
+
+
+def test_vector_index_switches_to_ivf_and_keeps_recall(monkeypatch):
+    import numpy as np
+
+    from app.services.vector_index import IVFVectorIndex, VectorIndexRegistry
+
+    registry = VectorIndexRegistry()
+    monkeypatch.setattr(registry.settings, "VECTOR_INDEX_IVF_THRESHOLD", 300)
+    monkeypatch.setattr(registry.settings, "VECTOR_INDEX_IVF_PROBES", 6)
+    rng = np.random.default_rng(7)
+    vectors = {f"item-{index}": rng.normal(size=64).tolist() for index in range(400)}
+
+    collection = registry.sync("user-1", "model_card", ((key, 1, key) for key in vectors), vectors.get)
+    assert isinstance(collection.index, IVFVectorIndex)
+
+    query = (np.asarray(vectors["item-42"]) + rng.normal(scale=0.05, size=64)).tolist()
+    hits = registry.search("user-1", "model_card", query, 5)
+    assert hits[0][0] == "item-42"
+
+    registry.remove("user-1", "model_card", "item-42")
+    assert all(item_id != "item-42" for item_id, _ in registry.search("user-1", "model_card", query, 5))
+    registry.upsert("user-1", "model_card", "item-new", vectors["item-42"], 2)
+    assert registry.search("user-1", "model_card", query, 1)[0][0] == "item-new"
+
+
+@pytest.mark.asyncio
+async def test_postgres_vector_search_pushes_top_k_into_sql_and_ranks_only_the_shortlist(monkeypatch):
+    from types import SimpleNamespace
+
+    from sqlalchemy import select
+    from sqlalchemy.dialects import postgresql
+
+    from app.api.routes.vector_search_support import rank_with_vector_backend
+    from app.models.entities.user import ModelCard
+    from app.services.model_os_service import model_os_service
+
+    monkeypatch.setattr(model_os_service.settings, "LEXICAL_INDEX_ENABLED", False)
+    now = datetime.utcnow()
+    near = ModelCard(id="near", user_id="u1", title="Vector Search", examples=[], counter_examples=[], updated_at=now)
+    bare = ModelCard(id="bare", user_id="u1", title="Vector notes", examples=[], counter_examples=[], updated_at=now)
+    statements = []
+    results = [[near], [bare]]
+
+    class FakeResult:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def scalars(self):
+            return SimpleNamespace(all=lambda: self.rows)
+
+    class FakeSession:
+        def get_bind(self):
+            return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+
+        async def execute(self, statement):
+            statements.append(str(statement.compile(dialect=postgresql.dialect())))
+            return FakeResult(results.pop(0) if not statements[-1].startswith("SET") else [])
+
+    ranked_inputs = []
+
+    async def rank_fallback(items, query):
+        ranked_inputs.extend(items)
+        return list(reversed(items))
+
+    ranked = await rank_with_vector_backend(
+        FakeSession(),
+        select(ModelCard).where(ModelCard.user_id == "u1").order_by(ModelCard.updated_at.desc()),
+        ModelCard,
+        kind="model_card",
+        user_id="u1",
+        query="vector search",
+        limit=7,
+        rank_fallback=rank_fallback,
+    )
+
+    assert [card.id for card in ranked] == ["near", "bare"]
+    assert [card.id for card in ranked_inputs] == ["near", "bare"]
+    assert statements[0] == "SET LOCAL hnsw.ef_search = 100"
+    ann_sql = statements[1]
+    assert "model_cards.embedding <=> CAST(%(query_embedding)s AS vector)" in ann_sql
+    assert "LIMIT %(param_1)s" in ann_sql
+    assert "updated_at DESC" not in ann_sql
+    assert "model_cards.embedding IS NULL" in statements[2]
+
+
+@pytest.mark.asyncio
+async def test_iterative_scan_is_only_set_on_pgvector_versions_that_support_it(monkeypatch):
+    from types import SimpleNamespace
+
+    from app.api.routes import vector_search_support
+
+    monkeypatch.setattr(vector_search_support.get_settings(), "PGVECTOR_ITERATIVE_SCAN", "strict_order")
+    monkeypatch.setattr(vector_search_support, "_iterative_scan_support", {})
+
+    class FakeSession:
+        def __init__(self, url, version):
+            self.url = url
+            self.version = version
+            self.statements = []
+
+        def get_bind(self):
+            return SimpleNamespace(url=self.url)
+
+        async def execute(self, statement):
+            self.statements.append(str(statement))
+            return SimpleNamespace(scalar=lambda: self.version)
+
+    old = FakeSession("postgresql://old", "0.7.4")
+    new = FakeSession("postgresql://new", "0.8.0")
+    for session in (old, old, new, new):
+        await vector_search_support._configure_ann_scan(session, 10)
+
+    assert not any("iterative_scan" in statement for statement in old.statements)
+    assert new.statements.count("SET LOCAL hnsw.iterative_scan = strict_order") == 2
+    assert sum("pg_extension" in statement for statement in old.statements + new.statements) == 2